@@ -0,0 +1,159 @@
+import asyncio
+from datetime import (
+    UTC,
+    datetime,
+)
+from itertools import islice
+
+import pytest
+
+from toolrack.aio.cron import (
+    CronSchedule,
+    InvalidCronExpression,
+)
+from toolrack.aio.periodic import TimedCall
+
+
+def next_times(expression, start, count=3):
+    schedule = CronSchedule(expression)
+    times = []
+    dt = datetime.fromisoformat(start)
+    for _ in range(count):
+        dt = schedule.next_after(dt)
+        times.append(dt.isoformat(sep=" ", timespec="minutes"))
+    return times
+
+
+class TestCronSchedule:
+    @pytest.mark.parametrize(
+        "expression",
+        [
+            "* * * *",
+            "* * * * * *",
+            "60 * * * *",
+            "* 24 * * *",
+            "* * 0 * *",
+            "* * * 13 *",
+            "* * * * 8",
+            "*/0 * * * *",
+            "5-1 * * * *",
+            "foo * * * *",
+            "* * * foo *",
+            "@never",
+        ],
+    )
+    def test_invalid(self, expression):
+        """Invalid expressions raise an error."""
+        with pytest.raises(InvalidCronExpression) as error:
+            CronSchedule(expression)
+        assert error.value.expression == expression
+        assert str(error.value) == f"Invalid cron expression: {expression}"
+
+    @pytest.mark.parametrize(
+        "expression,start,times",
+        [
+            (
+                "* * * * *",
+                "2025-01-01 10:00:30",
+                ["2025-01-01 10:01", "2025-01-01 10:02", "2025-01-01 10:03"],
+            ),
+            (
+                "*/20 * * * *",
+                "2025-01-01 10:50",
+                ["2025-01-01 11:00", "2025-01-01 11:20", "2025-01-01 11:40"],
+            ),
+            (
+                "5/20 * * * *",
+                "2025-01-01 10:50",
+                ["2025-01-01 11:05", "2025-01-01 11:25", "2025-01-01 11:45"],
+            ),
+            (
+                "0,30 9-10 * * *",
+                "2025-01-01 10:45",
+                ["2025-01-02 09:00", "2025-01-02 09:30", "2025-01-02 10:00"],
+            ),
+            (
+                "0 0 31 * *",
+                "2025-01-31 00:00",
+                ["2025-03-31 00:00", "2025-05-31 00:00", "2025-07-31 00:00"],
+            ),
+            (
+                "0 12 * * mon-fri",
+                "2025-01-03 13:00",  # Friday
+                ["2025-01-06 12:00", "2025-01-07 12:00", "2025-01-08 12:00"],
+            ),
+            (
+                "0 0 * * 7",
+                "2025-01-01 00:00",
+                ["2025-01-05 00:00", "2025-01-12 00:00", "2025-01-19 00:00"],
+            ),
+            (
+                "0 0 1 * sun",
+                "2025-01-01 00:00",
+                ["2025-01-05 00:00", "2025-01-12 00:00", "2025-01-19 00:00"],
+            ),
+            (
+                "0 0 13 * fri",
+                "2025-06-01 00:00",
+                ["2025-06-06 00:00", "2025-06-13 00:00", "2025-06-20 00:00"],
+            ),
+            (
+                "30 6 29 feb *",
+                "2025-01-01 00:00",
+                ["2028-02-29 06:30", "2032-02-29 06:30", "2036-02-29 06:30"],
+            ),
+            (
+                "0 0 1 DEC,Jan *",
+                "2025-06-01 00:00",
+                ["2025-12-01 00:00", "2026-01-01 00:00", "2026-12-01 00:00"],
+            ),
+            (
+                "@hourly",
+                "2025-12-31 22:30",
+                ["2025-12-31 23:00", "2026-01-01 00:00", "2026-01-01 01:00"],
+            ),
+            (
+                "@monthly",
+                "2025-11-15 00:00",
+                ["2025-12-01 00:00", "2026-01-01 00:00", "2026-02-01 00:00"],
+            ),
+        ],
+    )
+    def test_next_after(self, expression, start, times):
+        """The next matching times are returned."""
+        assert next_times(expression, start) == times
+
+    def test_next_after_timezone(self):
+        """Timezone-aware datetimes are preserved."""
+        schedule = CronSchedule("@daily")
+        dt = schedule.next_after(datetime(2025, 1, 1, 10, tzinfo=UTC))
+        assert dt == datetime(2025, 1, 2, tzinfo=UTC)
+
+    def test_next_after_impossible(self):
+        """An error is raised if the expression never matches."""
+        schedule = CronSchedule("0 0 30 feb *")
+        with pytest.raises(InvalidCronExpression):
+            schedule.next_after(datetime(2025, 1, 1))
+
+    async def test_times(self, advance_time, mocker):
+        """Times are converted to loop times."""
+        now = datetime(2025, 1, 1, 10, 0, 30, tzinfo=UTC).timestamp()
+        mocker.patch("toolrack.aio.cron.time", return_value=now)
+        times = CronSchedule("*/5 * * * *").times(tz=UTC)
+        assert list(islice(times, 3)) == [270.0, 570.0, 870.0]
+
+    async def test_timed_call(self, advance_time, mocker):
+        """Times can be used with a TimedCall."""
+        clock = advance_time.__self__
+        start = datetime(2025, 1, 1, 10, tzinfo=UTC).timestamp()
+        mocker.patch(
+            "toolrack.aio.cron.time", side_effect=lambda: start + clock.time
+        )
+        calls = []
+        call = TimedCall(
+            lambda: calls.append(asyncio.get_running_loop().time())
+        )
+        call.start(CronSchedule("0 * * * *").times(tz=UTC))
+        await advance_time(3 * 3600 + 1)
+        assert calls == [3600, 7200, 10800]
+        await call.stop()
@@ -0,0 +1,305 @@
+import json
+import re
+
+import pytest
+
+from toolrack.aio.framing import (
+    Framer,
+    InvalidFrame,
+    JSONLinesFramer,
+    LengthPrefixFramer,
+    NetstringFramer,
+    RegexFramer,
+    SeparatorFramer,
+    _DelimitedFramer,
+    _SizedFramer,
+)
+
+
+def feed_all(framer, *chunks):
+    """Feed chunks to a framer, returning frames as bytes."""
+    frames = []
+    for chunk in chunks:
+        frames.extend(bytes(frame) for frame in framer.feed(chunk))
+    return frames
+
+
+class TestFramer:
+    def test_feed_not_implemented(self):
+        """Subclasses must implement feed."""
+        with pytest.raises(NotImplementedError):
+            Framer().feed(b"data")
+
+    def test_flush(self):
+        """By default, no frames are returned on flush."""
+        assert list(Framer().flush()) == []
+
+
+class TestSeparatorFramer:
+    def test_empty_separator(self):
+        """The separator can't be empty."""
+        with pytest.raises(ValueError):
+            SeparatorFramer(b"")
+
+    @pytest.mark.parametrize(
+        "chunks,frames",
+        [
+            ((b"a\nb\n",), [b"a", b"b"]),
+            ((b"a\nb", b"c\n"), [b"a", b"bc"]),
+            ((b"a", b"b", b"\n\n"), [b"ab", b""]),
+        ],
+    )
+    def test_feed(self, chunks, frames):
+        """Data are split on the separator."""
+        assert feed_all(SeparatorFramer(), *chunks) == frames
+
+    def test_nul_separator(self):
+        """NUL-separated records are split."""
+        framer = SeparatorFramer(b"\0")
+        assert feed_all(framer, b"a b\0c", b"\0") == [b"a b", b"c"]
+
+    def test_multibyte_separator_across_chunks(self):
+        """Separators split across chunks are found."""
+        framer = SeparatorFramer(b"\r\n")
+        assert feed_all(framer, b"a\r", b"\nb\r", b"\n") == [b"a", b"b"]
+
+    def test_flush(self):
+        """Partial data are returned on flush."""
+        framer = SeparatorFramer()
+        assert feed_all(framer, b"a\nb") == [b"a"]
+        assert list(framer.flush()) == [b"b"]
+        assert list(framer.flush()) == []
+
+    def test_frames_released(self):
+        """Frames are released when the next one is requested."""
+        frames = list(SeparatorFramer().feed(b"a\nb\n"))
+        with pytest.raises(ValueError):
+            bytes(frames[0])
+
+    def test_interrupted_feed(self):
+        """Frames left when a feed is interrupted are returned later."""
+        framer = SeparatorFramer()
+        frames = framer.feed(b"a\nb\nc")
+        assert bytes(next(frames)) == b"a"
+        frames.close()
+        assert feed_all(framer, b"\nd\n") == [b"b", b"c", b"d"]
+
+    def test_interrupted_feed_partial(self):
+        """Frames in partial data are kept when a feed is interrupted."""
+        framer = SeparatorFramer()
+        assert feed_all(framer, b"a") == []
+        frames = framer.feed(b"\nb\nc\n")
+        assert bytes(next(frames)) == b"a"
+        frames.close()
+        assert feed_all(framer, b"") == [b"b", b"c"]
+
+    def test_interrupted_flush(self):
+        """Frames left when a feed is interrupted are returned on flush."""
+        framer = SeparatorFramer()
+        frames = framer.feed(b"a\nb\nc")
+        assert bytes(next(frames)) == b"a"
+        frames.close()
+        assert list(framer.flush()) == [b"b", b"c"]
+
+
+class TestDelimitedFramer:
+    def test_separators_not_implemented(self):
+        """Subclasses must implement finding separators."""
+        with pytest.raises(NotImplementedError):
+            feed_all(_DelimitedFramer(), b"data")
+
+
+class TestRegexFramer:
+    @pytest.mark.parametrize(
+        "pattern",
+        [rb"\r?\n", r"\r?\n", re.compile(rb"\r?\n"), re.compile(r"\r?\n")],
+    )
+    def test_pattern_types(self, pattern):
+        """Patterns can be strings, bytes or compiled expressions."""
+        framer = RegexFramer(pattern)
+        assert framer.pattern.pattern == rb"\r?\n"
+        assert feed_all(framer, b"a\r\nb\nc") == [b"a", b"b"]
+
+    def test_pattern_flags(self):
+        """Flags from compiled string patterns are preserved."""
+        framer = RegexFramer(re.compile("end", re.IGNORECASE))
+        assert feed_all(framer, b"aENDb", b"end") == [b"a", b"b"]
+
+    def test_pattern_encoding(self):
+        """String patterns are encoded with the specified encoding."""
+        framer = RegexFramer("\u00a7", encoding="latin-1")
+        assert feed_all(framer, b"a\xa7b\xa7") == [b"a", b"b"]
+
+    def test_empty_match(self):
+        """The pattern can't match an empty string."""
+        with pytest.raises(ValueError):
+            RegexFramer(rb"\n*")
+
+    def test_invalid_max_separator_size(self):
+        """The maximum separator size must be at least 1."""
+        with pytest.raises(ValueError):
+            RegexFramer(rb"\n", max_separator_size=0)
+
+    def test_separator_across_chunks(self):
+        """Separators split across chunks are matched."""
+        framer = RegexFramer(rb"\r?\n")
+        assert feed_all(framer, b"a\r", b"\nb\r", b"\n") == [b"a", b"b"]
+
+    def test_progress_bar(self):
+        """Carriage returns can be used as separators."""
+        framer = RegexFramer(rb"\r\n|\r|\n")
+        assert feed_all(framer, b"10%\r50%\r100%\r\ndone\n") == [
+            b"10%",
+            b"50%",
+            b"100%",
+            b"done",
+        ]
+
+    def test_max_separator_size(self):
+        """Only the tail of partial data is scanned for separators."""
+        framer = RegexFramer(rb"xy", max_separator_size=2)
+        assert framer.max_separator_size == 2
+        assert feed_all(framer, b"ax", b"yb", b"x") == [b"a"]
+        # longer separators split across chunks are not matched
+        framer = RegexFramer(rb"xyz", max_separator_size=2)
+        assert feed_all(framer, b"axy", b"zb", b"x") == []
+        assert list(framer.flush()) == [b"axyzbx"]
+
+    def test_extendable_separator_across_chunks(self):
+        """Separators are matched on available data."""
+        framer = RegexFramer(rb"-+")
+        assert feed_all(framer, b"a--", b"-b") == [b"a", b""]
+
+    def test_flush(self):
+        """Partial data are returned on flush."""
+        framer = RegexFramer(rb"\n")
+        assert feed_all(framer, b"a\nb") == [b"a"]
+        assert list(framer.flush()) == [b"b"]
+        assert list(framer.flush()) == []
+
+
+class TestJSONLinesFramer:
+    def test_feed(self):
+        """JSON objects are decoded from lines."""
+        framer = JSONLinesFramer()
+        objects = list(framer.feed(b'{"a": 1}\n[1, 2]\n"x'))
+        objects.extend(framer.feed(b'yz"\nnull\n'))
+        assert objects == [{"a": 1}, [1, 2], "xyz", None]
+
+    def test_blank_lines(self):
+        """Blank lines are skipped."""
+        framer = JSONLinesFramer()
+        assert list(framer.feed(b"1\n\n  \r\n2\n")) == [1, 2]
+
+    def test_flush(self):
+        """An object in the last line is decoded on flush."""
+        framer = JSONLinesFramer()
+        assert list(framer.feed(b"1\nnull")) == [1]
+        assert list(framer.flush()) == [None]
+
+    def test_flush_blank(self):
+        """No object is returned for a blank partial line."""
+        framer = JSONLinesFramer()
+        assert list(framer.feed(b"1\n ")) == [1]
+        assert list(framer.flush()) == []
+
+    def test_invalid(self):
+        """Invalid JSON raises an error."""
+        with pytest.raises(json.JSONDecodeError):
+            list(JSONLinesFramer().feed(b"{\n"))
+
+    def test_invalid_line_dropped(self):
+        """Only the invalid line is dropped, following ones are decoded."""
+        framer = JSONLinesFramer()
+        objects = []
+        with pytest.raises(json.JSONDecodeError):
+            objects.extend(framer.feed(b'1\nbad\n{"a": 2}\n3'))
+        assert objects == [1]
+        objects.extend(framer.feed(b"\n"))
+        assert objects == [1, {"a": 2}, 3]
+
+
+class TestSizedFramer:
+    def test_parse_header_not_implemented(self):
+        """Subclasses must implement header parsing."""
+        with pytest.raises(NotImplementedError):
+            feed_all(_SizedFramer(), b"data")
+
+
+class TestLengthPrefixFramer:
+    @pytest.mark.parametrize("kwargs", [{"size": 0}, {"byteorder": "middle"}])
+    def test_invalid_params(self, kwargs):
+        """Prefix size and byte order must be valid."""
+        with pytest.raises(ValueError):
+            LengthPrefixFramer(**kwargs)
+
+    def test_feed(self):
+        """Frames are split based on the length prefix."""
+        framer = LengthPrefixFramer()
+        data = b"\0\0\0\x03abc\0\0\0\0\0\0\0\x02de"
+        assert feed_all(framer, data) == [b"abc", b"", b"de"]
+
+    def test_feed_chunks(self):
+        """Frames and prefixes can be split across chunks."""
+        framer = LengthPrefixFramer(size=2, byteorder="little")
+        assert feed_all(framer, b"\x05", b"\0ab", b"c", b"", b"de\x01\0f") == [
+            b"abcde",
+            b"f",
+        ]
+
+    def test_wait_full_frame(self):
+        """Headers are not parsed again until the full frame is received."""
+        framer = LengthPrefixFramer()
+        assert feed_all(framer, b"\0\0\0\x0a12345") == []
+        assert framer._needed == 14
+        assert feed_all(framer, b"6789") == []
+        assert feed_all(framer, b"0") == [b"1234567890"]
+        assert framer._needed == 0
+
+    def test_interrupted_feed(self):
+        """Frames left when a feed is interrupted are returned later."""
+        framer = LengthPrefixFramer(size=1)
+        frames = framer.feed(b"\x01a\x01b\x01")
+        assert bytes(next(frames)) == b"a"
+        frames.close()
+        assert feed_all(framer, b"c") == [b"b", b"c"]
+
+    def test_flush(self):
+        """Incomplete frames are dropped at the end of the stream."""
+        framer = LengthPrefixFramer()
+        assert feed_all(framer, b"\0\0\0\x0a12345") == []
+        assert list(framer.flush()) == []
+
+
+class TestNetstringFramer:
+    def test_feed(self):
+        """Netstrings are parsed."""
+        framer = NetstringFramer()
+        assert feed_all(framer, b"3:abc,0:,", b"12:hello", b" world!,") == [
+            b"abc",
+            b"",
+            b"hello world!",
+        ]
+
+    def test_feed_split_length(self):
+        """The length can be split across chunks."""
+        framer = NetstringFramer()
+        assert feed_all(framer, b"1", b"0", b":0123456789,") == [b"0123456789"]
+
+    def test_invalid_trailer(self):
+        """Netstrings must end with a comma."""
+        with pytest.raises(InvalidFrame):
+            feed_all(NetstringFramer(), b"3:abc;")
+
+    @pytest.mark.parametrize("data", [b":abc,", b"a3:abc,", b"-3:abc,"])
+    def test_invalid_length(self, data):
+        """The length must be a number."""
+        with pytest.raises(InvalidFrame):
+            feed_all(NetstringFramer(), data)
+
+    def test_length_too_long(self):
+        """The length can't be longer than the maximum digits."""
+        framer = NetstringFramer(max_digits=3)
+        assert feed_all(framer, b"123") == []
+        with pytest.raises(InvalidFrame):
+            feed_all(framer, b"4")
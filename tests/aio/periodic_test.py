@@ -1,13 +1,23 @@
 import asyncio
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+import threading
 
 import pytest
 
 from toolrack.aio.periodic import (
     AlreadyRunning,
+    CatchUpPolicy,
     NotRunning,
+    OverlapPolicy,
     PeriodicCall,
     TimedCall,
+    _phase_offset,
 )
+from toolrack.aio.state import FileScheduleState
+from toolrack.aio.stats import CallStats
 
 
 @pytest.fixture
@@ -46,6 +56,16 @@ def periodic_call(sync_func):
     yield PeriodicCall(sync_func)
 
 
+@pytest.fixture
+def wall_time(advance_time, mocker):
+    """Make wall clock time follow the loop time, with an offset."""
+    clock = advance_time.__self__
+    mocker.patch(
+        "toolrack.aio.periodic.wall_time",
+        side_effect=lambda: 1000 + clock.time,
+    )
+
+
 @pytest.fixture
 def time_intervals():
     return [1.0, 5.0]
@@ -63,7 +83,7 @@ def times_iter(time_intervals):
 
 
 class TestTimedCall:
-    def test_running(self, timed_call, times_iter):
+    async def test_running(self, timed_call, times_iter):
         """The TimedCall is not running by default."""
         assert not timed_call.running
         timed_call.start(times_iter())
@@ -76,7 +96,18 @@ class TestTimedCall:
         await advance_time(2)
         assert calls == [1.0]
 
-    def test_start_already_running(self, timed_call, times_iter):
+    def test_create_without_loop(self, sync_func):
+        """A TimedCall can be created without a running loop."""
+        call = TimedCall(sync_func)
+        assert not call.running
+
+    def test_start_without_loop(self, sync_func):
+        """Starting a TimedCall requires a running loop."""
+        call = TimedCall(sync_func)
+        with pytest.raises(RuntimeError):
+            call.start(iter([1.0]))
+
+    async def test_start_already_running(self, timed_call, times_iter):
         """Starting an already started TimedCall raises an error."""
         timed_call.start(times_iter())
         with pytest.raises(AlreadyRunning):
@@ -183,3 +214,398 @@ class TestPeriodicCall:
         periodic_call.start(5, now=False)
         await advance_time(6)
         assert calls == [5.0]
+
+    async def test_jitter(self, advance_time, periodic_call, calls, mocker):
+        """Calls are delayed by a random jitter, without drift."""
+        uniform = mocker.patch("toolrack.aio.periodic.uniform")
+        uniform.return_value = 1.5
+        periodic_call.start(5, jitter=2)
+        await advance_time(12)
+        assert calls == [1.5, 6.5, 11.5]
+        uniform.assert_called_with(0, 2)
+
+    @pytest.mark.parametrize("jitter", [-1, 6])
+    async def test_jitter_invalid(self, advance_time, periodic_call, jitter):
+        """Jitter must be between zero and the interval."""
+        with pytest.raises(ValueError):
+            periodic_call.start(5, jitter=jitter)
+
+    async def test_phase_key(self, advance_time, periodic_call, calls):
+        """Calls are made at an offset within the interval from the key."""
+        offset = _phase_offset("foo", 10)
+        assert 0 < offset < 10
+        periodic_call.start(10, phase_key="foo")
+        await advance_time(30)
+        assert calls == pytest.approx([offset, offset + 10, offset + 20])
+
+    async def test_phase_key_next_interval(
+        self, advance_time, periodic_call, calls
+    ):
+        """If the offset already passed, the first call is the next one."""
+        offset = _phase_offset("foo", 10)
+        await advance_time(offset + 1)
+        periodic_call.start(10, phase_key="foo")
+        await advance_time(20)
+        assert calls == pytest.approx([offset + 10, offset + 20])
+
+    async def test_phase_key_spread(self):
+        """Different keys are spread across the interval."""
+        offsets = [_phase_offset(f"key-{i}", 10) for i in range(1000)]
+        buckets = [0] * 10
+        for offset in offsets:
+            buckets[int(offset)] += 1
+        assert all(70 < count < 130 for count in buckets)
+
+    async def test_state_requires_name(self, periodic_call, tmp_path):
+        """A name is required to store schedule state."""
+        state = FileScheduleState(tmp_path / "state")
+        with pytest.raises(ValueError):
+            periodic_call.start(5, state=state)
+
+    async def test_state_store(
+        self, advance_time, periodic_call, calls, tmp_path, wall_time
+    ):
+        """Call times are stored in the state."""
+        state = FileScheduleState(tmp_path / "state")
+        periodic_call.start(5, state=state, name="foo")
+        assert state.get("foo") == (None, 1000.0)
+        await advance_time(1)
+        assert state.get("foo") == (1000.0, 1005.0)
+        await advance_time(5)
+        assert state.get("foo") == (1005.0, 1010.0)
+
+    async def test_state_resume(
+        self, advance_time, periodic_call, calls, tmp_path, wall_time
+    ):
+        """The schedule is resumed from the stored next time."""
+        state = FileScheduleState(tmp_path / "state")
+        state.set("foo", 997.0, 1002.0)
+        periodic_call.start(5, state=state, name="foo")
+        assert state.get("foo") == (997.0, 1002.0)
+        await advance_time(8)
+        assert calls == [2.0, 7.0]
+
+    async def test_state_resume_past(
+        self, advance_time, periodic_call, calls, tmp_path, wall_time
+    ):
+        """If the stored next time is past, the first call is immediate."""
+        state = FileScheduleState(tmp_path / "state")
+        state.set("foo", 980.0, 985.0)
+        periodic_call.start(5, now=False, state=state, name="foo")
+        await advance_time(6)
+        assert calls == [0, 5.0]
+        assert state.get("foo") == (1005.0, 1010.0)
+
+    async def test_state_resume_past_phase_key(
+        self, advance_time, periodic_call, calls, tmp_path, wall_time
+    ):
+        """Overdue calls with a phase key resume at the next phase time."""
+        offset = _phase_offset("foo", 10)
+        state = FileScheduleState(tmp_path / "state")
+        state.set("foo", 970.0, 980.0)
+        periodic_call.start(10, state=state, name="foo", phase_key="foo")
+        await advance_time(20)
+        assert calls == pytest.approx([offset, offset + 10])
+
+
+async def stop(advance_time, *timed_calls):
+    """Stop calls, advancing time until running calls complete."""
+    stops = asyncio.gather(*(call.stop() for call in timed_calls))
+    await advance_time(10)
+    await stops
+
+
+@pytest.fixture
+def slow_func(calls):
+    async def func():
+        calls.append(("start", loop_time()))
+        await asyncio.sleep(3)
+        calls.append(("end", loop_time()))
+
+    yield func
+
+
+@pytest.mark.asyncio
+class TestTimedCallOverlap:
+    async def test_allow(self, advance_time, slow_func, calls):
+        """By default, calls can overlap."""
+        call = PeriodicCall(slow_func)
+        call.start(2)
+        await advance_time(3)
+        await stop(advance_time, call)
+        assert calls == [
+            ("start", 0),
+            ("start", 2),
+            ("end", 3),
+            ("end", 5),
+        ]
+
+    async def test_skip(self, advance_time, slow_func, calls):
+        """With the skip policy, overlapping calls are skipped."""
+        call = PeriodicCall(slow_func, overlap="skip")
+        call.start(2)
+        await advance_time(5)
+        await stop(advance_time, call)
+        assert calls == [("start", 0), ("end", 3), ("start", 4), ("end", 7)]
+
+    async def test_queue(self, advance_time, slow_func, calls):
+        """With the queue policy, overlapping calls are run in sequence."""
+        call = PeriodicCall(slow_func, overlap=OverlapPolicy.QUEUE)
+        call.start(2)
+        await advance_time(7)
+        await stop(advance_time, call)
+        assert calls == [
+            ("start", 0),
+            ("end", 3),
+            ("start", 3),
+            ("end", 6),
+            ("start", 6),
+            ("end", 9),
+        ]
+
+    async def test_queue_limit(self, advance_time, slow_func, calls):
+        """Calls beyond the queue limit are skipped."""
+        call = PeriodicCall(slow_func, overlap="queue", max_queued=1)
+        call.start(1)
+        await advance_time(3.5)
+        await stop(advance_time, call)
+        # calls at 1 and 2 overlap the first one, only one is queued
+        assert calls == [("start", 0), ("end", 3), ("start", 3), ("end", 6)]
+
+    async def test_stop_drops_queued(self, advance_time, slow_func, calls):
+        """Stopping the call doesn't run queued calls."""
+        call = PeriodicCall(slow_func, overlap="queue")
+        call.start(2)
+        await advance_time(2.5)
+        await stop(advance_time, call)
+        assert calls == [("start", 0), ("end", 3)]
+
+    async def test_cancel(self, advance_time, slow_func, calls):
+        """With the cancel policy, the previous call is cancelled."""
+        call = PeriodicCall(slow_func, overlap="cancel")
+        call.start(2)
+        await advance_time(3)
+        await stop(advance_time, call)
+        assert calls == [("start", 0), ("start", 2), ("end", 5)]
+
+    async def test_invalid_policy(self, sync_func):
+        """An error is raised for an unknown policy."""
+        with pytest.raises(ValueError):
+            TimedCall(sync_func, overlap="unknown")
+
+    async def test_stop_raises_exception(self, advance_time, times_iter):
+        """Stopping the call raises the exception of a running call."""
+
+        async def fail():
+            await asyncio.sleep(1)
+            raise Exception("fail!")
+
+        call = TimedCall(fail)
+        call.start(times_iter())
+        await advance_time(1.5)
+        with pytest.raises(Exception, match="fail!"):
+            await stop(advance_time, call)
+
+    async def test_semaphore(self, advance_time, slow_func, calls):
+        """A shared semaphore limits concurrent calls."""
+        semaphore = asyncio.Semaphore(1)
+        call1 = PeriodicCall(slow_func, semaphore=semaphore)
+        call2 = PeriodicCall(slow_func, semaphore=semaphore)
+        call1.start(10)
+        call2.start(10)
+        await advance_time(4)
+        await stop(advance_time, call1, call2)
+        assert calls == [
+            ("start", 0),
+            ("end", 3),
+            ("start", 3),
+            ("end", 6),
+        ]
+
+
+@pytest.fixture
+def stall_loop(advance_time):
+    """Move the loop clock forward without running scheduled callbacks."""
+
+    async def stall(until):
+        advance_time.__self__.time = until
+        await advance_time(0)
+
+    yield stall
+
+
+@pytest.mark.asyncio
+class TestTimedCallCatchUp:
+    async def test_lag(self, advance_time, stall_loop, periodic_call):
+        """The lag of the last call is tracked."""
+        periodic_call.start(5)
+        await advance_time(1)
+        assert periodic_call.lag == 0
+        await stall_loop(7)
+        assert periodic_call.lag == 2
+
+    async def test_skip(self, advance_time, stall_loop, periodic_call, calls):
+        """By default, missed calls are skipped."""
+        periodic_call.start(5)
+        await advance_time(1)
+        await stall_loop(13)
+        assert calls == [0, 13]
+        assert periodic_call.missed == 1
+        await advance_time(3)
+        assert calls == [0, 13, 15]
+
+    async def test_burst(self, advance_time, stall_loop, calls):
+        """With the burst policy, missed calls are replayed."""
+        call = PeriodicCall(
+            lambda: calls.append(loop_time()), catch_up="burst"
+        )
+        call.start(5)
+        await advance_time(1)
+        await stall_loop(13)
+        assert calls == [0, 13, 13]
+        assert call.missed == 0
+        await advance_time(3)
+        assert calls == [0, 13, 13, 15]
+        await call.stop()
+
+    async def test_burst_limit(self, advance_time, stall_loop, calls):
+        """Missed calls beyond the burst limit are skipped."""
+        call = PeriodicCall(
+            lambda: calls.append(loop_time()),
+            catch_up=CatchUpPolicy.BURST,
+            max_burst=1,
+        )
+        call.start(5)
+        await advance_time(1)
+        await stall_loop(23)
+        assert calls == [0, 23, 23]
+        assert call.missed == 2
+        await advance_time(3)
+        assert calls == [0, 23, 23, 25]
+        await call.stop()
+
+    async def test_coalesce(self, advance_time, stall_loop, calls):
+        """With the coalesce policy, the count of missed calls is passed."""
+        call = PeriodicCall(
+            lambda missed: calls.append((loop_time(), missed)),
+            catch_up="coalesce",
+        )
+        call.start(5)
+        await advance_time(1)
+        await stall_loop(18)
+        assert calls == [(0, 0), (18, 2)]
+        assert call.missed == 2
+        await call.stop()
+
+    async def test_coalesce_async(self, advance_time, stall_loop, calls):
+        """The count of missed calls is passed to async functions."""
+
+        async def func(missed):
+            calls.append(missed)
+
+        call = PeriodicCall(func, catch_up="coalesce")
+        call.start(5)
+        await advance_time(1)
+        await stall_loop(13)
+        assert calls == [0, 1]
+        await call.stop()
+
+
+@pytest.mark.asyncio
+class TestTimedCallStats:
+    async def test_active(self, advance_time, sync_func, times_iter):
+        """The number of active calls is tracked."""
+        stats = CallStats()
+        call1 = PeriodicCall(sync_func, stats=stats)
+        call2 = TimedCall(sync_func, stats=stats)
+        call1.start(5)
+        call2.start(times_iter())
+        assert stats.active == 2
+        await call1.stop()
+        assert stats.active == 1
+        # the time iterator exhausts
+        await advance_time(10)
+        assert stats.active == 0
+
+    async def test_calls(self, advance_time, stall_loop, slow_func):
+        """Calls, lag, duration and overlaps are tracked."""
+        stats = CallStats()
+        call = PeriodicCall(slow_func, stats=stats)
+        call.start(2)
+        await advance_time(1)
+        await stall_loop(5)
+        await stop(advance_time, call)
+        assert stats.calls == 2
+        assert stats.overlaps == 1
+        assert stats.missed == 1
+        assert stats.running == 0
+        assert stats.lag.count == 2
+        assert stats.lag.max == 3
+        assert stats.duration.count == 2
+        # the first call is also delayed by the loop stall
+        assert stats.duration.max == 5
+        assert stats.duration.mean == 4
+
+    async def test_errors(self, advance_time, times_iter):
+        """Errors from calls are tracked."""
+        stats = CallStats()
+        exception = Exception("fail!")
+
+        def fail():
+            raise exception
+
+        call = TimedCall(fail, stats=stats)
+        call.start(times_iter())
+        await advance_time(2)
+        assert stats.errors == 1
+        assert stats.last_error is exception
+        assert stats.running == 0
+
+
+def square(value):
+    return value * value
+
+
+@pytest.mark.asyncio
+class TestTimedCallExecutor:
+    async def test_thread_pool(self, advance_time, times_iter, calls):
+        """Synchronous functions can be run in an executor."""
+        with ThreadPoolExecutor() as executor:
+            call = TimedCall(
+                lambda: calls.append(threading.current_thread()),
+                executor=executor,
+            )
+            call.start(times_iter())
+            await advance_time(2)
+            await call.stop()
+        assert len(calls) == 1
+        assert calls[0] is not threading.current_thread()
+
+    async def test_process_pool(self, advance_time, times_iter):
+        """Functions can be run in a process pool."""
+        stats = CallStats()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            call = TimedCall(square, 3, executor=executor, stats=stats)
+            call.start(times_iter())
+            await advance_time(2)
+            await call.stop()
+        assert stats.errors == 0
+
+    async def test_exception(self, advance_time, times_iter):
+        """Exceptions from functions run in an executor are raised."""
+
+        def fail():
+            raise Exception("fail!")
+
+        with ThreadPoolExecutor() as executor:
+            call = TimedCall(fail, executor=executor)
+            call.start(times_iter())
+            await advance_time(2)
+            with pytest.raises(Exception, match="fail!"):
+                await call.stop()
+
+    async def test_async_function(self, async_func):
+        """An executor can't be used with async functions."""
+        with ThreadPoolExecutor() as executor:
+            with pytest.raises(ValueError):
+                TimedCall(async_func, executor=executor)
@@ -0,0 +1,206 @@
+import asyncio
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from toolrack.aio.pool import (
+    ProcessPool,
+    ProcessResult,
+)
+
+
+@pytest.fixture
+def make_executable(tmp_path):
+    def make(name, content):
+        executable = Path(tmp_path / name)
+        executable.write_text(dedent(content))
+        executable.chmod(0o755)
+        return str(executable)
+
+    yield make
+
+
+class TestProcessResult:
+    def test_repr(self):
+        """The repr includes the command and exit status."""
+        result = ProcessResult(("ls", "-l"), 0, "", "")
+        assert repr(result) == (
+            "ProcessResult(command=('ls', '-l'), returncode=0, "
+            "timed_out=False)"
+        )
+
+
+class TestProcessPool:
+    def test_invalid_concurrency(self):
+        """Concurrency must be at least 1."""
+        with pytest.raises(ValueError):
+            ProcessPool(concurrency=0)
+
+    def test_default_concurrency(self, mocker):
+        """Concurrency defaults to the number of CPUs."""
+        mocker.patch("os.cpu_count", return_value=3)
+        assert ProcessPool().concurrency == 3
+
+    async def test_run(self, make_executable):
+        """A command is run and its output returned."""
+        command = make_executable(
+            "exe",
+            """#!/bin/sh
+            echo out $1
+            echo err >&2
+            exit 3
+            """,
+        )
+        pool = ProcessPool()
+        result = await pool.run(command, "arg")
+        assert result.command == (command, "arg")
+        assert result.returncode == 3
+        assert result.stdout == "out arg\n"
+        assert result.stderr == "err\n"
+        assert not result.timed_out
+        assert pool.running == 0
+
+    async def test_run_protocol_kwargs(self, make_executable):
+        """Keyword arguments are passed to the protocol."""
+        command = make_executable("exe", "#!/bin/sh\necho out\n")
+        pool = ProcessPool(encoding=None)
+        result = await pool.run(command)
+        assert result.stdout == b"out\n"
+
+    async def test_run_usage(self, make_executable):
+        """Process resource usage is included if requested."""
+        command = make_executable("exe", "#!/bin/sh\necho out\n")
+        result = await ProcessPool(usage=True).run(command)
+        assert result.stdout == "out\n"
+        assert result.usage.returncode == 0
+        assert result.usage.stdout_bytes == 4
+
+    async def test_run_no_usage(self, make_executable):
+        """Process resource usage is not included by default."""
+        command = make_executable("exe", "#!/bin/sh\necho out\n")
+        result = await ProcessPool().run(command)
+        assert result.usage is None
+
+    async def test_run_stdin(self, make_executable):
+        """Process standard input is closed."""
+        command = make_executable("exe", "#!/bin/sh\ncat\necho done\n")
+        result = await ProcessPool().run(command)
+        assert result.stdout == "done\n"
+
+    async def test_run_timeout(self, make_executable):
+        """Processes are terminated on timeout."""
+        command = make_executable("exe", "#!/bin/sh\nexec sleep 10\n")
+        pool = ProcessPool(timeout=10)
+        result = await pool.run(command, timeout=0.1)
+        assert result.timed_out
+        assert result.returncode == -15
+
+    async def test_run_timeout_kill(self, make_executable):
+        """Processes are killed if they don't exit after termination."""
+        command = make_executable(
+            "exe",
+            """#!/bin/sh
+            trap '' TERM
+            exec sleep 10
+            """,
+        )
+        pool = ProcessPool(timeout=0.1, kill_timeout=0.1)
+        result = await pool.run(command)
+        assert result.timed_out
+        assert result.returncode == -9
+
+    async def test_run_timeout_child_holds_pipes(self, make_executable):
+        """Pipes held open by child processes don't block the timeout."""
+        command = make_executable(
+            "exe",
+            """#!/bin/sh
+            trap '' TERM
+            echo out
+            sleep 3
+            """,
+        )
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pool = ProcessPool(timeout=0.2, kill_timeout=0.2)
+        result = await pool.run(command)
+        assert loop.time() - start < 2
+        assert result.timed_out
+        assert result.returncode == -9
+        assert result.stdout == "out\n"
+
+    async def test_run_cancel(self, make_executable, tmp_path):
+        """The process is killed if the run is cancelled."""
+        command = make_executable(
+            "exe",
+            """#!/bin/sh
+            echo $$ > pid
+            exec sleep 10
+            """,
+        )
+        pool = ProcessPool()
+        task = asyncio.create_task(pool.run(command, cwd=tmp_path))
+        pid_file = tmp_path / "pid"
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert pool.running == 0
+
+    async def test_run_all(self, make_executable):
+        """Results are returned in completion order."""
+        slow = make_executable("slow", "#!/bin/sh\nsleep 0.3\necho slow\n")
+        fast = make_executable("fast", "#!/bin/sh\necho fast\n")
+        pool = ProcessPool(concurrency=2)
+        results = [result async for result in pool.run_all([[slow], [fast]])]
+        assert [result.stdout for result in results] == ["fast\n", "slow\n"]
+
+    async def test_run_all_concurrency(self, make_executable, tmp_path):
+        """At most the specified number of processes run concurrently."""
+        log = tmp_path / "log"
+        command = make_executable(
+            "exe",
+            f"""#!/bin/sh
+            echo start $1 >> {log}
+            sleep 0.05
+            echo end $1 >> {log}
+            """,
+        )
+        pool = ProcessPool(concurrency=1)
+        commands = ([command, str(i)] for i in range(3))
+        results = [result async for result in pool.run_all(commands)]
+        assert len(results) == 3
+        assert log.read_text().split("\n") == [
+            "start 0",
+            "end 0",
+            "start 1",
+            "end 1",
+            "start 2",
+            "end 2",
+            "",
+        ]
+
+    async def test_run_all_kwargs(self, make_executable):
+        """Keyword arguments are passed to each run."""
+        command = make_executable("exe", "#!/bin/sh\nexec sleep 10\n")
+        pool = ProcessPool()
+        results = [
+            result
+            async for result in pool.run_all([[command]] * 2, timeout=0.1)
+        ]
+        assert all(result.timed_out for result in results)
+
+    async def test_run_all_error(self, make_executable, tmp_path):
+        """Errors are raised, and pending commands cancelled."""
+        command = make_executable("exe", "#!/bin/sh\nexec sleep 10\n")
+        pool = ProcessPool(concurrency=2)
+        commands = [[command], [str(tmp_path / "missing")], [command]]
+        with pytest.raises(FileNotFoundError):
+            async for _ in pool.run_all(commands):
+                pass
+        assert pool.running == 0
+
+    async def test_run_all_empty(self):
+        """No results are returned if there are no commands."""
+        assert [result async for result in ProcessPool().run_all([])] == []
@@ -1,11 +1,22 @@
 import asyncio
+import io
 from pathlib import Path
+import re
+import sys
 from textwrap import dedent
+from types import SimpleNamespace
 
 import pytest
 
+from toolrack.aio.framing import (
+    JSONLinesFramer,
+    NetstringFramer,
+)
 from toolrack.aio.process import (
+    BufferRetention,
+    OutputLog,
     ProcessParserProtocol,
+    ProcessUsage,
     StreamHelper,
 )
 
@@ -34,6 +45,14 @@ def exec_process(executable):
 
 @pytest.mark.asyncio
 class TestProcessParserProtocol:
+    async def test_create_without_loop(self, executable, exec_process):
+        """The protocol can be created before the loop is running."""
+        executable.write_text("#!/bin/sh\necho out\n")
+        protocol = await asyncio.to_thread(ProcessParserProtocol)
+        out, err = await exec_process(protocol_factory=lambda: protocol)
+        assert out == "out\n"
+        assert err == ""
+
     async def test_result(self, executable, exec_process):
         """When the process ends, stdout and stderr are returned."""
         executable.write_text(
@@ -124,6 +143,454 @@ class TestProcessParserProtocol:
         )
         assert lines == ["line 1", "line 2"]
 
+    async def test_no_encoding(self, executable, exec_process):
+        """If no encoding is specified, output is returned as bytes."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                echo out
+                echo err >&2
+                """
+            )
+        )
+
+        out, err = await exec_process(
+            protocol_factory=lambda: ProcessParserProtocol(encoding=None)
+        )
+        assert out == b"out\n"
+        assert err == b"err\n"
+
+    async def test_batch(self, executable, exec_process):
+        """Options are passed to the stream helpers."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                printf 'line 1\\nline 2\\n'
+                """
+            )
+        )
+
+        batches = []
+        await exec_process(
+            protocol_factory=lambda: ProcessParserProtocol(
+                out_parser=batches.append, batch=True
+            )
+        )
+        assert batches == [["line 1", "line 2"]]
+
+    async def test_usage(self, executable, exec_process):
+        """Process resource usage can be included in the result."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                echo out
+                echo error >&2
+                i=0
+                while [ $i -lt 20000 ]; do i=$((i + 1)); done
+                exit 2
+                """
+            )
+        )
+
+        out, err, usage = await exec_process(
+            protocol_factory=lambda: ProcessParserProtocol(usage=True)
+        )
+        assert out == "out\n"
+        assert err == "error\n"
+        assert usage.returncode == 2
+        assert usage.wall_time > 0
+        assert usage.user_time + usage.system_time > 0
+        assert usage.max_rss is None or usage.max_rss > 0
+        assert usage.stdout_bytes == 4
+        assert usage.stderr_bytes == 6
+
+    async def test_usage_concurrent(self, executable, exec_process):
+        """CPU and memory usage are not reported for overlapping processes."""
+        executable.write_text("#!/bin/sh\nsleep 0.1\n")
+        results = await asyncio.gather(
+            *(
+                exec_process(
+                    protocol_factory=lambda: ProcessParserProtocol(usage=True)
+                )
+                for _ in range(2)
+            )
+        )
+        for _, _, usage in results:
+            assert usage.returncode == 0
+            assert usage.wall_time > 0
+            assert usage.user_time is None
+            assert usage.system_time is None
+            assert usage.max_rss is None
+
+    async def test_usage_no_resource(self, executable, exec_process, mocker):
+        """CPU and memory usage are not reported if not supported."""
+        mocker.patch.dict(sys.modules, {"resource": None})
+        executable.write_text("#!/bin/sh\necho out\n")
+        _, _, usage = await exec_process(
+            protocol_factory=lambda: ProcessParserProtocol(usage=True)
+        )
+        assert usage.returncode == 0
+        assert usage.stdout_bytes == 4
+        assert usage.user_time is None
+        assert usage.max_rss is None
+
+    async def test_log(self, executable, exec_process):
+        """Lines from both streams can be recorded in order in a log."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                echo out 1
+                sleep 0.01
+                echo err 1 >&2
+                sleep 0.01
+                echo out 2
+                """
+            )
+        )
+
+        log = OutputLog()
+        result = await exec_process(
+            protocol_factory=lambda: ProcessParserProtocol(log=log)
+        )
+        assert result == (None, None)
+        entries = list(log)
+        assert [(fd, line) for _, fd, line in entries] == [
+            (1, "out 1"),
+            (2, "err 1"),
+            (1, "out 2"),
+        ]
+        times = [time for time, _, _ in entries]
+        assert times == sorted(times)
+
+    async def test_framer_per_stream(self):
+        """Each stream uses its own copy of the framer."""
+        framer = JSONLinesFramer()
+        out, err = [], []
+        protocol = ProcessParserProtocol(out.append, err.append, framer=framer)
+        protocol.pipe_data_received(1, b'{"a":')
+        protocol.pipe_data_received(2, b'{"e": 1}\n')
+        protocol.pipe_data_received(1, b" 1}\n")
+        assert out == [{"a": 1}]
+        assert err == [{"e": 1}]
+        assert not framer._partial
+
+    async def test_log_with_parser(self):
+        """Lines are logged and passed to parsers."""
+        log = OutputLog()
+        lines = []
+        protocol = ProcessParserProtocol(out_parser=lines.append, log=log)
+        protocol.pipe_data_received(1, b"foo\nbar\n")
+        assert lines == ["foo", "bar"]
+        assert [line for _, _, line in log] == ["foo", "bar"]
+
+    async def test_log_objects(self):
+        """Records that are not text are logged as their repr."""
+        log = OutputLog()
+        objects = []
+        protocol = ProcessParserProtocol(
+            out_parser=objects.append, log=log, framer=JSONLinesFramer()
+        )
+        protocol.pipe_data_received(1, b'{"a": 1}\n')
+        assert objects == [{"a": 1}]
+        assert [line for _, _, line in log] == ["{'a': 1}"]
+
+    async def test_log_batch(self, advance_time):
+        """Lines are logged individually in batch mode."""
+        log = OutputLog()
+        batches = []
+        protocol = ProcessParserProtocol(
+            out_parser=batches.append, log=log, batch=True
+        )
+        await advance_time(5)
+        protocol.pipe_data_received(1, b"foo\nbar\n")
+        assert batches == [["foo", "bar"]]
+        assert list(log) == [(5.0, 1, "foo"), (5.0, 1, "bar")]
+
+    async def test_log_queue(self):
+        """Lines are logged and queued."""
+        log = OutputLog()
+        protocol = ProcessParserProtocol(queue_size=10, log=log)
+        protocol.pipe_data_received(2, b"foo\n")
+        protocol.pipe_connection_lost(2, None)
+        assert [line async for line in protocol.stderr_lines()] == ["foo"]
+        assert [line for _, _, line in log] == ["foo"]
+
+    async def test_pause_reading(self, executable):
+        """Reading output can be paused and resumed."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                read line
+                echo out
+                echo err >&2
+                """
+            )
+        )
+
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.subprocess_exec(
+            ProcessParserProtocol, str(executable)
+        )
+        protocol.pause_reading()
+        for fd in (1, 2):
+            assert not transport.get_pipe_transport(fd).is_reading()
+        protocol.resume_reading(1)
+        assert transport.get_pipe_transport(1).is_reading()
+        assert not transport.get_pipe_transport(2).is_reading()
+        protocol.resume_reading()
+        transport.get_pipe_transport(0).write(b"\n")
+        result = await protocol.done
+        transport.close()
+        assert result == ("out\n", "err\n")
+        # pipes are closed
+        protocol.pause_reading()
+
+    async def test_pause_reading_not_connected(self):
+        """Pausing reading has no effect if the protocol is not connected."""
+        protocol = ProcessParserProtocol()
+        protocol.pause_reading()
+        protocol.resume_reading()
+
+    async def test_invalid_queue_size(self):
+        """The queue size must be at least 1."""
+        with pytest.raises(ValueError):
+            ProcessParserProtocol(queue_size=0)
+
+    async def test_lines(self, executable):
+        """Output lines can be iterated when queues are enabled."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                for i in $(seq 50); do
+                    echo out $i
+                    echo err $i >&2
+                done
+                """
+            )
+        )
+
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.subprocess_exec(
+            lambda: ProcessParserProtocol(queue_size=2), str(executable)
+        )
+        out = [line async for line in protocol.stdout_lines()]
+        err = [line async for line in protocol.stderr_lines()]
+        result = await protocol.done
+        transport.close()
+        assert out == [f"out {i}" for i in range(1, 51)]
+        assert err == [f"err {i}" for i in range(1, 51)]
+        assert result == (None, None)
+
+    async def test_lines_with_parser(self, executable):
+        """Queues are only used for streams without a parser."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                echo out
+                echo err >&2
+                """
+            )
+        )
+
+        err = []
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.subprocess_exec(
+            lambda: ProcessParserProtocol(err_parser=err.append, queue_size=2),
+            str(executable),
+        )
+        out = [line async for line in protocol.stdout_lines()]
+        await protocol.done
+        transport.close()
+        assert out == ["out"]
+        assert err == ["err"]
+        with pytest.raises(RuntimeError):
+            await anext(protocol.stderr_lines())
+
+    async def test_lines_backpressure(self, mocker):
+        """Reading is paused when the queue is full, and resumed on drain."""
+        pipe = mocker.Mock()
+        transport = mocker.Mock()
+        transport.get_pipe_transport.return_value = pipe
+        protocol = ProcessParserProtocol(queue_size=2)
+        protocol.connection_made(transport)
+        lines = protocol.stdout_lines()
+        protocol.pipe_data_received(1, b"a\n")
+        pipe.pause_reading.assert_not_called()
+        protocol.pipe_data_received(1, b"b\nc\n")
+        pipe.pause_reading.assert_called_once_with()
+        transport.get_pipe_transport.assert_called_with(1)
+        protocol.pipe_data_received(1, b"d\n")
+        # already paused
+        pipe.pause_reading.assert_called_once_with()
+        assert await anext(lines) == "a"
+        assert await anext(lines) == "b"
+        pipe.resume_reading.assert_not_called()
+        assert await anext(lines) == "c"
+        pipe.resume_reading.assert_called_once_with()
+        assert await anext(lines) == "d"
+        pipe.resume_reading.assert_called_once_with()
+
+    async def test_lines_not_consumed_not_paused(self, mocker):
+        """Reading is not paused for streams whose lines are not iterated."""
+        pipe = mocker.Mock()
+        transport = mocker.Mock()
+        transport.get_pipe_transport.return_value = pipe
+        protocol = ProcessParserProtocol(queue_size=2)
+        protocol.connection_made(transport)
+        protocol.pipe_data_received(2, b"a\nb\nc\n")
+        pipe.pause_reading.assert_not_called()
+
+    async def test_lines_stdout_only(self, executable):
+        """The process completes if only stdout lines are iterated."""
+        executable.write_text(
+            dedent(
+                """#!/bin/sh
+                for i in $(seq 50); do
+                    echo out $i
+                    echo err $i >&2
+                done
+                """
+            )
+        )
+
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.subprocess_exec(
+            lambda: ProcessParserProtocol(queue_size=2), str(executable)
+        )
+        out = [line async for line in protocol.stdout_lines()]
+        result = await asyncio.wait_for(protocol.done, 5)
+        transport.close()
+        assert out == [f"out {i}" for i in range(1, 51)]
+        assert result == (None, None)
+
+    async def test_lines_end(self):
+        """Iteration ends when the stream is closed."""
+        protocol = ProcessParserProtocol(queue_size=2)
+        protocol.pipe_data_received(1, b"a\nb")
+        protocol.pipe_connection_lost(1, None)
+        assert [line async for line in protocol.stdout_lines()] == ["a", "b"]
+        # further iterations end too
+        assert [line async for line in protocol.stdout_lines()] == []
+
+    async def test_lines_error(self):
+        """If the stream errors, the exception is raised by the iterator."""
+        protocol = ProcessParserProtocol(queue_size=2)
+        exception = Exception("fail!")
+        protocol.pipe_data_received(1, b"a\n")
+        protocol.pipe_connection_lost(1, exception)
+        lines = protocol.stdout_lines()
+        assert await anext(lines) == "a"
+        with pytest.raises(Exception) as error:
+            await anext(lines)
+        assert error.value is exception
+
+
+class TestProcessUsage:
+    def test_add_bytes(self):
+        """Bytes are counted per stream."""
+        usage = ProcessUsage()
+        usage.add_bytes(1, 10)
+        usage.add_bytes(2, 5)
+        usage.add_bytes(1, 3)
+        usage.add_bytes(3, 100)
+        assert usage.stdout_bytes == 13
+        assert usage.stderr_bytes == 5
+
+    def test_set_rusage(self):
+        """CPU times are the difference between resource usages."""
+        usage = ProcessUsage()
+        usage.set_rusage(
+            SimpleNamespace(ru_utime=1.0, ru_stime=0.5, ru_maxrss=100),
+            SimpleNamespace(ru_utime=3.0, ru_stime=1.5, ru_maxrss=200),
+        )
+        assert usage.user_time == 2.0
+        assert usage.system_time == 1.0
+        assert usage.max_rss == 200
+
+    def test_set_rusage_max_rss_not_raised(self):
+        """The maximum RSS is not reported if the process didn't raise it."""
+        usage = ProcessUsage()
+        usage.set_rusage(
+            SimpleNamespace(ru_utime=1.0, ru_stime=0.5, ru_maxrss=200),
+            SimpleNamespace(ru_utime=3.0, ru_stime=1.5, ru_maxrss=200),
+        )
+        assert usage.user_time == 2.0
+        assert usage.max_rss is None
+
+    def test_repr(self):
+        """The repr includes usage details."""
+        usage = ProcessUsage()
+        usage.returncode = 0
+        usage.wall_time = 1.5
+        assert repr(usage) == (
+            "ProcessUsage(returncode=0, wall_time=1.500, user_time=None, "
+            "system_time=None, max_rss=None, stdout_bytes=0, stderr_bytes=0)"
+        )
+        usage.user_time = 0.25
+        usage.system_time = 0.5
+        assert "user_time=0.250, system_time=0.500" in repr(usage)
+
+
+class TestOutputLog:
+    async def test_add(self, advance_time):
+        """Entries are added with the current time by default."""
+        log = OutputLog()
+        await advance_time(3)
+        log.add(1, "foo")
+        log.add(2, b"bar", time=1.5)
+        assert len(log) == 2
+        assert list(log) == [(3.0, 1, "foo"), (1.5, 2, "bar")]
+
+    def test_add_invalid(self):
+        """Only text and binary lines can be added."""
+        with pytest.raises(TypeError):
+            OutputLog().add(1, {"foo": "bar"}, time=0)
+
+    def test_add_while_iterating(self):
+        """Entries can be added while iterating over the log."""
+        log = OutputLog()
+        log.add(1, "foo", time=0)
+        entries = iter(log)
+        assert next(entries) == (0.0, 1, "foo")
+        log.add(2, "bar", time=1)
+        assert list(entries) == [(1.0, 2, "bar")]
+
+    def test_no_encoding(self):
+        """Lines are returned as bytes if no encoding is set."""
+        log = OutputLog(encoding=None)
+        log.add(1, "caf\u00e9", time=0)
+        log.add(1, b"", time=1)
+        assert list(log) == [(0.0, 1, "caf\u00e9".encode()), (1.0, 1, b"")]
+
+    def test_arrays(self):
+        """Times and file descriptors are exposed as read-only views."""
+        log = OutputLog()
+        log.add(1, "foo", time=1.0)
+        log.add(2, "bar", time=2.0)
+        assert log.times.tolist() == [1.0, 2.0]
+        assert log.fds.tolist() == [1, 2]
+        with pytest.raises(TypeError):
+            log.times[0] = 3.0
+
+    def test_write(self):
+        """Entries can be written to a text file."""
+        log = OutputLog()
+        log.add(1, "caf\u00e9", time=1.0)
+        log.add(2, "bar", time=2.5)
+        file = io.StringIO()
+        log.write(file)
+        assert file.getvalue() == (
+            "1.000000\t1\tcaf\u00e9\n2.500000\t2\tbar\n"
+        )
+
+    def test_write_binary(self):
+        """Entries can be written to a binary file."""
+        log = OutputLog(encoding=None)
+        log.add(1, b"foo", time=1.0)
+        file = io.BytesIO()
+        log.write(file)
+        assert file.getvalue() == b"1.000000\t1\tfoo\n"
+
 
 class TestStreamHelper:
     @pytest.mark.parametrize(
@@ -163,3 +630,206 @@ class TestStreamHelper:
         helper = StreamHelper(callback=lines.append, separator="X")
         helper.receive_data("fooXbarX")
         assert lines == ["foo", "bar"]
+
+    def test_receive_bytes(self):
+        """Data can be passed as bytes."""
+        lines = []
+        helper = StreamHelper(callback=lines.append)
+        helper.receive_data(b"foo\nbar")
+        helper.receive_data(b"baz\n")
+        assert lines == ["foo", "barbaz"]
+
+    def test_split_multibyte_character(self):
+        """Multi-byte characters split across chunks are decoded."""
+        lines = []
+        helper = StreamHelper(callback=lines.append)
+        data = "café\nnaïve\n".encode()
+        for i in range(len(data)):
+            helper.receive_data(data[i : i + 1])
+        assert lines == ["café", "naïve"]
+
+    def test_split_multibyte_character_no_callback(self):
+        """Multi-byte characters split across chunks are returned."""
+        helper = StreamHelper()
+        data = "café\n".encode()
+        helper.receive_data(data[:4])
+        helper.receive_data(data[4:])
+        assert helper.get_data() == "café\n"
+
+    def test_no_encoding(self):
+        """If no encoding is specified, lines are returned as bytes."""
+        lines = []
+        helper = StreamHelper(callback=lines.append, encoding=None)
+        helper.receive_data(b"foo\nbar")
+        helper.flush_partial()
+        assert lines == [b"foo", b"bar"]
+
+    def test_no_encoding_no_callback(self):
+        """If no encoding is specified, data are returned as bytes."""
+        helper = StreamHelper(encoding=None)
+        helper.receive_data(b"foo\nbar")
+        assert helper.get_data() == b"foo\nbar"
+
+    def test_decode_errors(self):
+        """The error handling scheme for decoding can be specified."""
+        lines = []
+        helper = StreamHelper(callback=lines.append, errors="replace")
+        helper.receive_data(b"foo\xff\n")
+        assert lines == ["foo�"]
+
+    def test_flush_partial_empty(self):
+        """If there's no partial line, the callback is not called."""
+        lines = []
+        helper = StreamHelper(callback=lines.append)
+        helper.receive_data("foo\n")
+        helper.flush_partial()
+        assert lines == ["foo"]
+
+    def test_bytes_separator(self):
+        """The separator can be passed as bytes."""
+        lines = []
+        helper = StreamHelper(callback=lines.append, separator=b"\r\n")
+        helper.receive_data(b"foo\r\nbar\r\n")
+        assert lines == ["foo", "bar"]
+
+    def test_framer(self):
+        """Objects from a framer are passed to the callback."""
+        objects = []
+        helper = StreamHelper(
+            callback=objects.append, framer=JSONLinesFramer()
+        )
+        helper.receive_data(b'{"a": 1}\n{"b"')
+        helper.receive_data(b": 2}")
+        helper.flush_partial()
+        assert objects == [{"a": 1}, {"b": 2}]
+
+    def test_framer_binary_frames(self):
+        """Binary frames from a framer are decoded."""
+        lines = []
+        helper = StreamHelper(callback=lines.append, framer=NetstringFramer())
+        helper.receive_data("5:caf\u00e9,".encode())
+        assert lines == ["caf\u00e9"]
+
+    def test_regex_separator(self):
+        """Data can be split on a regular expression."""
+        lines = []
+        helper = StreamHelper(
+            callback=lines.append, separator=re.compile(r"\r?\n|\r")
+        )
+        helper.receive_data(b"foo\r\nbar\r")
+        helper.receive_data(b"baz\n")
+        assert lines == ["foo", "bar", "baz"]
+
+    def test_nul_separator(self):
+        """Data can be split on NUL bytes."""
+        lines = []
+        helper = StreamHelper(callback=lines.append, separator="\0")
+        helper.receive_data(b"foo\0bar baz\0")
+        assert lines == ["foo", "bar baz"]
+
+    def test_invalid_batch_size(self):
+        """The batch size must be at least 1."""
+        with pytest.raises(ValueError):
+            StreamHelper(callback=print, batch=True, batch_size=0)
+
+    def test_batch(self):
+        """With batch, the callback is called with lines for each chunk."""
+        batches = []
+        helper = StreamHelper(callback=batches.append, batch=True)
+        helper.receive_data("foo\nbar\nba")
+        helper.receive_data("z")
+        helper.receive_data("\nqux")
+        helper.flush_partial()
+        assert batches == [["foo", "bar"], ["baz"], ["qux"]]
+
+    def test_batch_size(self):
+        """Batches are split if longer than the batch size."""
+        batches = []
+        helper = StreamHelper(
+            callback=batches.append, batch=True, batch_size=2
+        )
+        helper.receive_data("a\nb\nc\nd\ne\n")
+        assert batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    async def test_batch_interval(self, advance_time):
+        """With an interval, lines are collected across chunks."""
+        batches = []
+        helper = StreamHelper(
+            callback=batches.append, batch=True, batch_interval=1.0
+        )
+        helper.receive_data("a\nb\n")
+        await advance_time(0.5)
+        helper.receive_data("c\n")
+        assert batches == []
+        await advance_time(0.6)
+        assert batches == [["a", "b", "c"]]
+        helper.receive_data("d\n")
+        await advance_time(1.1)
+        assert batches == [["a", "b", "c"], ["d"]]
+
+    async def test_batch_interval_size(self, advance_time):
+        """With an interval, batches are passed when reaching the size."""
+        batches = []
+        helper = StreamHelper(
+            callback=batches.append,
+            batch=True,
+            batch_size=2,
+            batch_interval=1.0,
+        )
+        helper.receive_data("a\nb\nc\n")
+        assert batches == [["a", "b"]]
+        helper.flush_partial()
+        assert batches == [["a", "b"], ["c"]]
+        await advance_time(2)
+        assert batches == [["a", "b"], ["c"]]
+
+    def test_max_size_and_spool_size(self):
+        """Max size and spool size can't be both set."""
+        with pytest.raises(ValueError):
+            StreamHelper(max_size=10, spool_size=10)
+
+    @pytest.mark.parametrize(
+        "retention,output",
+        [
+            ("tail", "qrstuvwxyz"),
+            (BufferRetention.HEAD, "abcdefghij"),
+            ("both", "abcdevwxyz"),
+        ],
+    )
+    def test_max_size(self, retention, output):
+        """With a max size, only part of data is kept."""
+        helper = StreamHelper(max_size=10, retention=retention)
+        data = "abcdefghijklmnopqrstuvwxyz"
+        for i in range(0, len(data), 3):
+            helper.receive_data(data[i : i + 3])
+        assert helper.get_data() == output
+        assert helper.truncated == 16
+
+    def test_max_size_not_reached(self):
+        """If data is within max size, all is kept."""
+        helper = StreamHelper(max_size=10, retention="both")
+        helper.receive_data("foo\n")
+        assert helper.get_data() == "foo\n"
+        assert helper.truncated == 0
+
+    def test_max_size_partial_characters(self):
+        """Partial characters in truncated data are replaced."""
+        helper = StreamHelper(max_size=2)
+        helper.receive_data("aèb".encode())
+        assert helper.get_data() == "�b"
+
+    def test_max_size_errors(self):
+        """The error handling scheme for truncated data can be specified."""
+        helper = StreamHelper(max_size=2, errors="ignore")
+        helper.receive_data("aèb".encode())
+        assert helper.get_data() == "b"
+
+    def test_spool_size(self):
+        """With a spool size, data are stored in a temporary file."""
+        helper = StreamHelper(spool_size=4)
+        helper.receive_data("foo\n")
+        helper.receive_data("bar\n")
+        data = helper.get_data()
+        assert data.read() == b"foo\nbar\n"
+        assert data._rolled
+        assert helper.truncated == 0
@@ -0,0 +1,230 @@
+import asyncio
+
+import pytest
+
+from toolrack.aio.ratelimit import (
+    LeakyBucket,
+    TokenBucket,
+)
+
+
+def loop_time():
+    return asyncio.get_running_loop().time()
+
+
+@pytest.fixture
+def calls():
+    yield []
+
+
+@pytest.fixture
+def acquire_all(calls):
+    """Acquire from a bucket concurrently, recording acquire times."""
+
+    async def acquire_all(bucket, *amounts):
+        async def acquire(n):
+            await bucket.acquire(n)
+            calls.append((n, loop_time()))
+
+        return asyncio.gather(*(acquire(n) for n in amounts))
+
+    yield acquire_all
+
+
+class TestTokenBucket:
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"rate": 0}, {"rate": 1, "capacity": 0}],
+    )
+    def test_invalid_params(self, kwargs):
+        """Rate and capacity must be positive."""
+        with pytest.raises(ValueError):
+            TokenBucket(**kwargs)
+
+    @pytest.mark.parametrize("rate,capacity", [(10, 10), (0.5, 1), (2, 2)])
+    def test_default_capacity(self, rate, capacity):
+        """Capacity defaults to the rate, or 1 if lower."""
+        assert TokenBucket(rate).capacity == capacity
+
+    async def test_initially_full(self):
+        """The bucket is initially full."""
+        bucket = TokenBucket(10, capacity=20)
+        assert bucket.tokens == 20
+
+    async def test_try_acquire(self, advance_time):
+        """Tokens are acquired if available."""
+        bucket = TokenBucket(10)
+        assert bucket.try_acquire(8)
+        assert not bucket.try_acquire(3)
+        assert bucket.tokens == 2
+
+    @pytest.mark.parametrize("amount", [0, 11])
+    async def test_try_acquire_invalid_amount(self, amount):
+        """The amount must be positive and within capacity."""
+        bucket = TokenBucket(10)
+        with pytest.raises(ValueError):
+            bucket.try_acquire(amount)
+
+    async def test_refill(self, advance_time):
+        """Tokens are refilled over time, up to capacity."""
+        bucket = TokenBucket(10)
+        bucket.try_acquire(10)
+        await advance_time(0.5)
+        assert bucket.tokens == 5
+        await advance_time(5)
+        assert bucket.tokens == 10
+
+    async def test_acquire_immediate(self, advance_time, acquire_all, calls):
+        """Acquire returns immediately if tokens are available."""
+        bucket = TokenBucket(10)
+        await (await acquire_all(bucket, 5))
+        assert calls == [(5, 0)]
+
+    async def test_acquire_wait(self, advance_time, acquire_all, calls):
+        """Acquire waits for tokens, serving callers in order."""
+        bucket = TokenBucket(10)
+        task = await acquire_all(bucket, 10, 5, 10, 1)
+        await advance_time(3)
+        await task
+        assert calls == [(10, 0), (5, 0.5), (10, 1.5), (1, 1.6)]
+
+    async def test_try_acquire_with_waiters(self, advance_time, acquire_all):
+        """Tokens can't be acquired without waiting if others are waiting."""
+        bucket = TokenBucket(10)
+        task = await acquire_all(bucket, 10, 10)
+        await advance_time(0.5)
+        assert bucket.tokens == 5
+        assert not bucket.try_acquire(1)
+        await advance_time(1)
+        await task
+
+
+class TestLeakyBucket:
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"rate": 0}, {"rate": 1, "capacity": 0}],
+    )
+    def test_invalid_params(self, kwargs):
+        """Rate and capacity must be positive."""
+        with pytest.raises(ValueError):
+            LeakyBucket(**kwargs)
+
+    async def test_try_acquire(self, advance_time):
+        """Units are acquired if they can leak immediately."""
+        bucket = LeakyBucket(10)
+        assert bucket.try_acquire(2)
+        assert not bucket.try_acquire()
+        await advance_time(0.2)
+        assert bucket.try_acquire()
+
+    async def test_acquire_spaced(self, advance_time, acquire_all, calls):
+        """Acquired units are spaced at a constant rate."""
+        bucket = LeakyBucket(2)
+        task = await acquire_all(bucket, 1, 1, 2, 1)
+        await advance_time(3)
+        await task
+        assert calls == [(1, 0), (1, 0.5), (2, 1.0), (1, 2.0)]
+
+    async def test_level(self, advance_time, acquire_all):
+        """The level reports the units waiting to leak."""
+        bucket = LeakyBucket(2)
+        assert bucket.level == 0
+        task = await acquire_all(bucket, 1, 1, 1)
+        await advance_time(0)
+        assert bucket.level == 3
+        await advance_time(1)
+        assert bucket.level == 1
+        await advance_time(1)
+        await task
+        assert bucket.level == 0
+
+    @pytest.mark.parametrize("amount", [0, -1])
+    async def test_invalid_amount(self, advance_time, amount):
+        """Amounts must be positive."""
+        bucket = LeakyBucket(1)
+        with pytest.raises(ValueError):
+            bucket.try_acquire(amount)
+        with pytest.raises(ValueError):
+            await bucket.acquire(amount)
+
+    async def test_try_acquire_capacity(self, advance_time):
+        """Units are not acquired if they exceed the capacity."""
+        bucket = LeakyBucket(1, capacity=2)
+        assert not bucket.try_acquire(3)
+        assert bucket.try_acquire(2)
+
+    async def test_acquire_cancelled(self, advance_time):
+        """Time reserved by cancelled callers is released."""
+        bucket = LeakyBucket(1)
+        await bucket.acquire()
+        waiters = [asyncio.ensure_future(bucket.acquire()) for _ in range(5)]
+        await advance_time(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        task = asyncio.ensure_future(bucket.acquire())
+        await advance_time(1.1)
+        assert task.done()
+
+    async def test_acquire_cancelled_queued_after(
+        self, advance_time, acquire_all, calls
+    ):
+        """Time is not released while later callers are waiting."""
+        bucket = LeakyBucket(1)
+        await bucket.acquire()
+        cancelled = asyncio.ensure_future(bucket.acquire())
+        queued = await acquire_all(bucket, 1)
+        await advance_time(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        task = await acquire_all(bucket, 1)
+        await advance_time(4)
+        await queued
+        await task
+        assert calls == [(1, 2.0), (1, 3.0)]
+
+    async def test_acquire_cancelled_released_later(self, advance_time):
+        """Released time is given back once later callers are cancelled."""
+        bucket = LeakyBucket(1)
+        await bucket.acquire()
+        first = asyncio.ensure_future(bucket.acquire())
+        second = asyncio.ensure_future(bucket.acquire())
+        await advance_time(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert bucket.level == 3
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        assert bucket.level == 1
+        assert bucket._released == {}
+
+    async def test_released_cleared_when_idle(self, advance_time):
+        """Released reservations are dropped once past."""
+        bucket = LeakyBucket(1)
+        await bucket.acquire()
+        cancelled = asyncio.ensure_future(bucket.acquire())
+        waiter = asyncio.ensure_future(bucket.acquire())
+        await advance_time(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        await advance_time(5)
+        await waiter
+        assert bucket._released
+        await bucket.acquire()
+        assert bucket._released == {}
+        bucket._released[1.0] = 0.0
+        assert bucket.try_acquire() is False
+        await advance_time(2)
+        assert bucket.try_acquire()
+        assert bucket._released == {}
+
+    async def test_capacity(self, advance_time):
+        """An error is raised if the capacity is exceeded."""
+        bucket = LeakyBucket(1, capacity=2)
+        await bucket.acquire()
+        waiter = asyncio.ensure_future(bucket.acquire())
+        await advance_time(0)
+        with pytest.raises(OverflowError):
+            await bucket.acquire()
+        await advance_time(1)
+        await waiter
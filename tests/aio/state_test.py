@@ -0,0 +1,101 @@
+import pytest
+
+from toolrack.aio.state import (
+    FileScheduleState,
+    ScheduleState,
+    SQLiteScheduleState,
+)
+
+
+class TestScheduleState:
+    def test_load(self):
+        """Subclasses must implement _load."""
+        with pytest.raises(NotImplementedError):
+            ScheduleState().get("foo")
+
+    def test_store(self):
+        """Subclasses must implement _store."""
+        with pytest.raises(NotImplementedError):
+            ScheduleState().set("foo", None, 10.0)
+
+
+@pytest.fixture(params=[FileScheduleState, SQLiteScheduleState])
+def state_class(request):
+    yield request.param
+
+
+class TestScheduleStateBackends:
+    def test_get_unknown(self, tmp_path, state_class):
+        """None is returned for unknown names."""
+        state = state_class(tmp_path / "state")
+        assert state.get("foo") is None
+
+    def test_set(self, tmp_path, state_class):
+        """Times are stored by name."""
+        state = state_class(tmp_path / "state")
+        state.set("foo", None, 10.0)
+        state.set("bar", 5.0, 15.0)
+        assert state.get("foo") == (None, 10.0)
+        assert state.get("bar") == (5.0, 15.0)
+
+    def test_update(self, tmp_path, state_class):
+        """Times are replaced."""
+        state = state_class(tmp_path / "state")
+        state.set("foo", None, 10.0)
+        state.set("foo", 10.0, 20.0)
+        assert state.get("foo") == (10.0, 20.0)
+
+    def test_persistent(self, tmp_path, state_class):
+        """Times are persisted."""
+        state = state_class(tmp_path / "state")
+        state.set("foo", 5.0, 10.0)
+        state = state_class(tmp_path / "state")
+        assert state.get("foo") == (5.0, 10.0)
+
+    async def test_batched_writes(self, tmp_path, state_class, advance_time):
+        """With a running loop, changes are written after the flush delay."""
+        state = state_class(tmp_path / "state", flush_delay=5)
+        state.set("foo", None, 10.0)
+        state.set("bar", 5.0, 15.0)
+        assert state.get("foo") == (None, 10.0)
+        assert state_class(tmp_path / "state").get("foo") is None
+        await advance_time(6)
+        other = state_class(tmp_path / "state")
+        assert other.get("foo") == (None, 10.0)
+        assert other.get("bar") == (5.0, 15.0)
+
+    async def test_flush(self, tmp_path, state_class, advance_time):
+        """Pending changes can be written right away."""
+        state = state_class(tmp_path / "state", flush_delay=5)
+        state.set("foo", None, 10.0)
+        state.flush()
+        assert state_class(tmp_path / "state").get("foo") == (None, 10.0)
+        await advance_time(6)
+        assert state.get("foo") == (None, 10.0)
+
+
+class TestFileScheduleState:
+    def test_file_content(self, tmp_path):
+        """Times are stored as JSON."""
+        path = tmp_path / "state.json"
+        state = FileScheduleState(path)
+        state.set("foo", 5.0, 10.0)
+        assert path.read_text() == '{"foo": [5.0, 10.0]}'
+        assert [entry.name for entry in tmp_path.iterdir()] == ["state.json"]
+
+
+class TestSQLiteScheduleState:
+    def test_close(self, tmp_path):
+        """The database can be closed."""
+        state = SQLiteScheduleState(tmp_path / "state.db")
+        state.close()
+        with pytest.raises(Exception):
+            state.get("foo")
+
+    async def test_close_flush(self, tmp_path):
+        """Pending changes are written when closing."""
+        state = SQLiteScheduleState(tmp_path / "state.db")
+        state.set("foo", 5.0, 10.0)
+        state.close()
+        state = SQLiteScheduleState(tmp_path / "state.db")
+        assert state.get("foo") == (5.0, 10.0)
@@ -0,0 +1,45 @@
+from toolrack.aio.stats import (
+    CallStats,
+    Histogram,
+)
+
+
+class TestHistogram:
+    def test_empty(self):
+        """An empty histogram has no values."""
+        histogram = Histogram(bounds=[1, 2])
+        assert histogram.count == 0
+        assert histogram.mean == 0.0
+        assert histogram.buckets() == [(1, 0), (2, 0), (float("inf"), 0)]
+
+    def test_add(self):
+        """Values are added to buckets."""
+        histogram = Histogram(bounds=[2, 1])
+        for value in (0.5, 1, 1.5, 3):
+            histogram.add(value)
+        assert histogram.buckets() == [(1, 2), (2, 1), (float("inf"), 1)]
+        assert histogram.count == 4
+        assert histogram.sum == 6.0
+        assert histogram.mean == 1.5
+        assert histogram.max == 3
+
+
+class TestCallStats:
+    def test_defaults(self):
+        """Stats are initially empty."""
+        stats = CallStats()
+        assert stats.active == 0
+        assert stats.running == 0
+        assert stats.calls == 0
+        assert stats.overlaps == 0
+        assert stats.missed == 0
+        assert stats.errors == 0
+        assert stats.last_error is None
+        assert stats.lag.count == 0
+        assert stats.duration.count == 0
+
+    def test_bounds(self):
+        """Bounds for histograms can be specified."""
+        stats = CallStats(bounds=[1, 2])
+        assert stats.lag.bounds == (1, 2)
+        assert stats.duration.bounds == (1, 2)
@@ -0,0 +1,250 @@
+import asyncio
+
+import pytest
+
+from toolrack.aio.periodic import PeriodicCall
+from toolrack.aio.wheel import TimerWheel
+
+
+@pytest.fixture
+def calls():
+    yield []
+
+
+def loop_time():
+    return asyncio.get_running_loop().time()
+
+
+@pytest.fixture
+def record(calls):
+    def record(*args):
+        calls.append((loop_time(), *args))
+
+    yield record
+
+
+class TestTimerWheel:
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"resolution": 0}, {"slot_bits": 0}, {"levels": 0}],
+    )
+    def test_invalid_params(self, kwargs):
+        """Invalid wheel parameters raise an error."""
+        with pytest.raises(ValueError):
+            TimerWheel(**kwargs)
+
+    async def test_call_later(self, advance_time, record, calls):
+        """Callbacks are called after the delay."""
+        wheel = TimerWheel(resolution=1)
+        wheel.call_later(3, record, "foo")
+        await advance_time(2)
+        assert calls == []
+        await advance_time(2)
+        assert calls == [(3, "foo")]
+
+    async def test_call_at(self, advance_time, record, calls):
+        """Callbacks are called at the specified time."""
+        wheel = TimerWheel(resolution=1)
+        handle = wheel.call_at(5, record)
+        assert handle.when() == 5
+        await advance_time(10)
+        assert calls == [(5,)]
+
+    async def test_round_up_to_tick(self, advance_time, record, calls):
+        """Callbacks are called at the first tick after their time."""
+        wheel = TimerWheel(resolution=1)
+        wheel.call_at(2.5, record)
+        await advance_time(10)
+        assert calls == [(3,)]
+
+    async def test_call_in_the_past(self, advance_time, record, calls):
+        """Callbacks for times in the past are called at the next tick."""
+        await advance_time(10)
+        wheel = TimerWheel(resolution=1)
+        wheel.call_at(2, record)
+        await advance_time(2)
+        assert calls == [(11,)]
+
+    async def test_batch(self, advance_time, record, calls):
+        """Callbacks due in the same tick are run with a single timer."""
+        wheel = TimerWheel(resolution=1)
+        for i in range(100):
+            wheel.call_later(2, record, i)
+        assert len(asyncio.get_running_loop()._scheduled) == 1
+        assert len(wheel) == 100
+        await advance_time(3)
+        assert calls == [(2, i) for i in range(100)]
+        assert len(wheel) == 0
+
+    async def test_cancel(self, advance_time, record, calls):
+        """Cancelled callbacks are not called."""
+        wheel = TimerWheel(resolution=1)
+        handle = wheel.call_later(2, record, "cancelled")
+        wheel.call_later(2, record, "called")
+        handle.cancel()
+        assert handle.cancelled()
+        assert len(wheel) == 1
+        await advance_time(3)
+        assert calls == [(2, "called")]
+
+    async def test_cancel_stops_timer(self, advance_time, record):
+        """When all callbacks are cancelled, the loop timer is cancelled."""
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(resolution=1)
+        handle = wheel.call_later(2, record)
+        handle.cancel()
+        assert all(timer.cancelled() for timer in loop._scheduled)
+
+    async def test_cancel_twice(self, advance_time, record):
+        """Cancelling a handle twice has no effect."""
+        wheel = TimerWheel(resolution=1)
+        handle = wheel.call_later(2, record)
+        wheel.call_later(2, record)
+        handle.cancel()
+        handle.cancel()
+        assert len(wheel) == 1
+
+    async def test_cancel_after_run(self, advance_time, record):
+        """Cancelling a handle that already ran has no effect."""
+        wheel = TimerWheel(resolution=1)
+        handle = wheel.call_later(2, record)
+        await advance_time(3)
+        handle.cancel()
+        assert not handle.cancelled()
+
+    async def test_reuse_after_cancel(self, advance_time, record, calls):
+        """The wheel can be reused after all callbacks have been cancelled."""
+        wheel = TimerWheel(resolution=1, slot_bits=2, levels=2)
+        wheel.call_later(50, record, "cancelled").cancel()
+        await advance_time(10)
+        wheel.call_later(2, record, "called")
+        await advance_time(60)
+        assert calls == [(12, "called")]
+
+    async def test_cancel_from_callback(self, advance_time, record, calls):
+        """A callback can cancel another one due in the same tick."""
+        wheel = TimerWheel(resolution=1)
+        wheel.call_later(2, lambda: handle.cancel())
+        handle = wheel.call_later(2, record)
+        await advance_time(3)
+        assert calls == []
+        assert len(wheel) == 0
+
+    async def test_higher_levels(self, advance_time, record, calls):
+        """Callbacks are cascaded through wheel levels."""
+        wheel = TimerWheel(resolution=1, slot_bits=2, levels=3)
+        times = [1, 3, 4, 5, 15, 16, 17, 40, 63]
+        for time in reversed(times):
+            wheel.call_at(time, record)
+        await advance_time(70)
+        assert calls == [(time,) for time in times]
+
+    async def test_overflow(self, advance_time, record, calls):
+        """Callbacks beyond the wheel range are called at the right time."""
+        wheel = TimerWheel(resolution=1, slot_bits=1, levels=2)
+        wheel.call_at(3, record)
+        wheel.call_at(10, record)
+        wheel.call_at(21, record)
+        await advance_time(30)
+        assert calls == [(3,), (10,), (21,)]
+
+    async def test_cancelled_in_higher_levels(
+        self, advance_time, record, calls
+    ):
+        """Cancelled callbacks are dropped when cascading."""
+        wheel = TimerWheel(resolution=1, slot_bits=1, levels=2)
+        wheel.call_at(11, record, "called")
+        wheel.call_at(3, record, "cancelled").cancel()
+        wheel.call_at(10, record, "cancelled").cancel()
+        await advance_time(30)
+        assert calls == [(11, "called")]
+
+    async def test_reschedule_from_callback(self, advance_time, calls):
+        """Callbacks can schedule new callbacks."""
+        wheel = TimerWheel(resolution=1)
+
+        def callback():
+            calls.append(loop_time())
+            if len(calls) < 3:
+                wheel.call_later(2, callback)
+
+        wheel.call_later(2, callback)
+        await advance_time(10)
+        assert calls == [2, 4, 6]
+
+    async def test_reschedule_with_cancelled_in_batch(
+        self, advance_time, record, calls
+    ):
+        """Cancelled callbacks are accounted for when rescheduling."""
+        wheel = TimerWheel(resolution=1)
+
+        def callback():
+            wheel.call_later(2, record, "rescheduled")
+
+        wheel.call_later(2, callback)
+        wheel.call_later(2, record, "cancelled").cancel()
+        await advance_time(3)
+        assert wheel._dead == 0
+        await advance_time(3)
+        assert calls == [(4, "rescheduled")]
+        assert wheel._dead == 0
+
+    async def test_loop_stall(self, advance_time, record, calls, mocker):
+        """If the loop stalls, all due callbacks are called."""
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(resolution=1)
+        wheel.call_at(2, record, "a")
+        wheel.call_at(4, record, "b")
+        wheel.call_at(8, record, "c")
+        mocker.patch.object(loop, "time", return_value=5)
+        wheel._on_tick()
+        assert [args for _, *args in calls] == [["a"], ["b"]]
+        assert len(wheel) == 1
+
+    async def test_exception(self, advance_time, record, calls):
+        """Exceptions in callbacks are passed to the loop handler."""
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(
+            lambda loop, context: errors.append(context)
+        )
+        wheel = TimerWheel(resolution=1)
+        exception = Exception("fail!")
+
+        def fail():
+            raise exception
+
+        wheel.call_later(1, fail)
+        wheel.call_later(1, record)
+        await advance_time(2)
+        assert errors[0]["exception"] is exception
+        assert calls == [(1,)]
+
+
+class TestPeriodicCallWithWheel:
+    async def test_periodic(self, advance_time, calls):
+        """PeriodicCalls can be scheduled through a TimerWheel."""
+        wheel = TimerWheel(resolution=1)
+        call = PeriodicCall(lambda: calls.append(loop_time()), scheduler=wheel)
+        call.start(5)
+        await advance_time(11)
+        assert calls == [0, 5, 10]
+        assert len(wheel) == 1
+        await call.stop()
+        assert len(wheel) == 0
+
+    async def test_single_loop_timer(self, advance_time, calls):
+        """Many PeriodicCalls share the same loop timer."""
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(resolution=1)
+        periodic_calls = [
+            PeriodicCall(calls.append, i, scheduler=wheel) for i in range(500)
+        ]
+        for call in periodic_calls:
+            call.start(3)
+        await advance_time(4)
+        assert len(calls) == 1000
+        assert len(wheel) == 500
+        assert len([t for t in loop._scheduled if not t.cancelled()]) == 1
+        for call in periodic_calls:
+            await call.stop()
@@ -1,16 +1,42 @@
+from enum import StrEnum
+from functools import partial
+import gc
+import json
 from operator import attrgetter
+import os
+from pathlib import Path
+import pickle
+from textwrap import dedent
+import weakref
 
 import pytest
 
+from toolrack.aio import PeriodicCall
 from toolrack.config import (
     Config,
+    ConfigFileCache,
     ConfigKey,
     ConfigKeyTypes,
+    ConfigWatcher,
+    EnvironSource,
     InvalidConfigValue,
+    LayeredConfig,
     MissingConfigKey,
+    ParseResults,
+    get_loader,
+    load_config_file,
+    load_dotenv,
+    load_ini,
+    load_json,
+    load_toml,
 )
 
 
+class SampleEnum(StrEnum):
+    FOO = "foo"
+    BAR = "bar"
+
+
 class TestConfigKeyTypes:
     def test_get_converter_unknown_type(self):
         """An error is raised if type is unknown."""
@@ -61,11 +87,137 @@ class TestConfigKeyTypes:
         converter = ConfigKeyTypes().get_converter("int[]")
         assert converter("1 2") == [1, 2]
 
+    def test_get_converter_cached(self):
+        """Converters are cached per type."""
+        types = ConfigKeyTypes()
+        converter = types.get_converter("int[]")
+        assert types.get_converter("int[]") is converter
+
     def test_list_of_unknown(self):
         """An error is raised if a list of unknown type is requested."""
         with pytest.raises(TypeError):
             ConfigKeyTypes().get_converter("unknown[]")
 
+    def test_get_converter_unknown_object(self):
+        """An error is raised if type is not a name, Enum or Config."""
+        with pytest.raises(TypeError):
+            ConfigKeyTypes().get_converter(object())
+
+    @pytest.mark.parametrize(
+        "value,result",
+        [
+            ("30s", 30.0),
+            ("1.5m", 90.0),
+            ("1h30m", 5400.0),
+            (" 2d 1h ", 176400.0),
+            ("1w", 604800.0),
+            ("250ms", 0.25),
+            ("500us", 0.0005),
+            (".5s", 0.5),
+            (10, 10.0),
+            (2.5, 2.5),
+            ("30", 30.0),
+            (" 1.5 ", 1.5),
+        ],
+    )
+    def test_duration(self, value, result):
+        """Durations are converted to seconds."""
+        converter = ConfigKeyTypes().get_converter("duration")
+        assert converter(value) == pytest.approx(result)
+
+    @pytest.mark.parametrize("value", ["", "10 5", "5 minutes", "1h-30m", "s"])
+    def test_duration_invalid(self, value):
+        """An error is raised for invalid durations."""
+        converter = ConfigKeyTypes().get_converter("duration")
+        with pytest.raises(ValueError):
+            converter(value)
+
+    @pytest.mark.parametrize(
+        "value,result",
+        [
+            ("100", 100),
+            ("100B", 100),
+            ("2KiB", 2048),
+            ("512 mib", 512 * 1024**2),
+            ("1.5GiB", 1536 * 1024**2),
+            (4096, 4096),
+        ],
+    )
+    def test_bytesize(self, value, result):
+        """Byte sizes are converted to bytes."""
+        converter = ConfigKeyTypes().get_converter("bytesize")
+        assert converter(value) == result
+
+    @pytest.mark.parametrize("value", ["", "MiB", "10 KB", "1..2MiB"])
+    def test_bytesize_invalid(self, value):
+        """An error is raised for invalid byte sizes."""
+        converter = ConfigKeyTypes().get_converter("bytesize")
+        with pytest.raises(ValueError):
+            converter(value)
+
+    def test_list_of_durations(self):
+        """Rich types can be used in lists."""
+        converter = ConfigKeyTypes().get_converter("duration[]")
+        assert converter("1s 1m") == [1.0, 60.0]
+
+    @pytest.mark.parametrize(
+        "value", [SampleEnum.FOO, "foo", "FOO", "BAR", "bar"]
+    )
+    def test_enum(self, value):
+        """Enum values are converted by value or name."""
+        converter = ConfigKeyTypes().get_converter(SampleEnum)
+        assert converter(value) == SampleEnum(str(value).lower())
+
+    @pytest.mark.parametrize("value", ["baz", ["foo"]])
+    def test_enum_invalid(self, value):
+        """An error is raised for invalid enum values."""
+        converter = ConfigKeyTypes().get_converter(SampleEnum)
+        with pytest.raises(ValueError):
+            converter(value)
+
+    def test_enum_and_config_not_cached(self):
+        """Converters for enums and nested configs are not cached."""
+        types = ConfigKeyTypes()
+        types.get_converter(SampleEnum)
+        types.get_converter(Config())
+        assert types._converters == {}
+
+    def test_config_not_kept_alive(self):
+        """Nested configs are released with the keys using them."""
+        nested = Config(ConfigKey("port", "int"))
+        ref = weakref.ref(nested)
+        key = ConfigKey("db", nested)
+        assert key.parse({"port": "80"}) == {"port": 80}
+        del nested, key
+        gc.collect()
+        assert ref() is None
+
+    def test_config(self):
+        """Nested configurations are parsed."""
+        nested = Config(
+            ConfigKey("host", "str", required=True),
+            ConfigKey("port", "int", default=80),
+        )
+        converter = ConfigKeyTypes().get_converter(nested)
+        assert converter({"host": "example.com"}) == {
+            "host": "example.com",
+            "port": 80,
+        }
+
+    def test_config_none(self):
+        """A None nested configuration gets default values."""
+        nested = Config(ConfigKey("port", "int", default=80))
+        converter = ConfigKeyTypes().get_converter(nested)
+        assert converter(None) == {"port": 80}
+
+    @pytest.mark.parametrize("value", ["foo", {"port": "foo"}, {}])
+    def test_config_invalid(self, value):
+        """An error is raised for invalid nested configurations."""
+        nested = Config(ConfigKey("port", "int", required=True))
+        converter = ConfigKeyTypes().get_converter(nested)
+        with pytest.raises(ValueError):
+            converter(value)
+
 
 class TestConfigKey:
     def test_instantiate(self):
@@ -128,6 +280,54 @@ class TestConfigKey:
         with pytest.raises(InvalidConfigValue):
             config_key.parse("value")
 
+    def test_parse_with_valid_value(self):
+        """If validators succeed, the converted value is returned."""
+        values = []
+
+        class ValidatedConfigKey(ConfigKey):
+            def validate(self, value):
+                values.append(("validate", value))
+
+        config_key = ValidatedConfigKey(
+            "key", "int", validator=lambda value: values.append(value)
+        )
+        assert config_key.parse("3") == 3
+        assert values == [("validate", 3), 3]
+
+    def test_compile(self):
+        """ConfigKey.compile returns a function to parse values."""
+        config_key = ConfigKey("key", "int[]")
+        parse = config_key.compile()
+        assert parse("1 2") == [1, 2]
+        with pytest.raises(InvalidConfigValue):
+            parse("a")
+
+    def test_compile_overridden_parse(self):
+        """If parse is overridden, ConfigKey.compile returns it."""
+
+        class UpperConfigKey(ConfigKey):
+            def parse(self, value):
+                return super().parse(value).upper()
+
+        config_key = UpperConfigKey("key", "str")
+        assert config_key.compile() == config_key.parse
+        assert config_key.compile()("x") == "X"
+
+    def test_compile_cached(self):
+        """The parse function is only computed once."""
+        config_key = ConfigKey("key", "int")
+        config_key.parse("1")
+        parser = config_key._parser
+        config_key.parse("2")
+        assert config_key._parser is parser
+
+    def test_shared_types(self):
+        """Type converters are shared among keys."""
+        assert (
+            ConfigKey("foo", "int")._config_types
+            is ConfigKey("bar", "str")._config_types
+        )
+
     def test_parse_with_validate(self):
         """If the ConfigKey.validate method fails, an error is raised."""
 
@@ -164,6 +364,36 @@ class TestConfig:
         parsed = new_config.parse({"foo": "4"})
         assert parsed == {"foo": 4}
 
+    def test_parse_rich_types(self):
+        """Config parses durations, byte sizes, enums and nested configs."""
+        config = Config(
+            ConfigKey("timeout", "duration"),
+            ConfigKey("max_size", "bytesize"),
+            ConfigKey("mode", SampleEnum),
+            ConfigKey("db", Config(ConfigKey("port", "int"))),
+        )
+        parsed = config.parse(
+            {
+                "timeout": "1m30s",
+                "max_size": "1MiB",
+                "mode": "bar",
+                "db": {"port": "5432"},
+            }
+        )
+        assert parsed == {
+            "timeout": 90.0,
+            "max_size": 1024**2,
+            "mode": SampleEnum.BAR,
+            "db": {"port": 5432},
+        }
+
+    def test_parse_invalid_nested(self):
+        """An invalid nested config is reported for the outer key."""
+        config = Config(ConfigKey("db", Config(ConfigKey("port", "int"))))
+        with pytest.raises(InvalidConfigValue) as error:
+            config.parse({"db": {"port": "foo"}})
+        assert error.value.key == "db"
+
     def test_parse_empty(self):
         """If not config options are present, an empty dict is returned."""
         config = Config()
@@ -198,6 +428,40 @@ class TestConfig:
         with pytest.raises(InvalidConfigValue):
             config.parse({"foo": "33", "bar": "invalid!"})
 
+    def test_compile(self):
+        """Config.compile returns the plan for parsing configurations."""
+        config = Config(
+            ConfigKey("foo", "int", required=True),
+            ConfigKey("bar", "str", default="baz"),
+        )
+        plan = config.compile()
+        assert [step[:3] for step in plan] == [
+            ("foo", True, None),
+            ("bar", False, "baz"),
+        ]
+        assert plan[0][3]("3") == 3
+
+    def test_parse_key_overridden_parse(self):
+        """Keys overriding parse are used when parsing configurations."""
+
+        class UpperConfigKey(ConfigKey):
+            def parse(self, value):
+                return super().parse(value).upper()
+
+        config = Config(UpperConfigKey("foo", "str"))
+        assert config.parse({"foo": "x"}) == {"foo": "X"}
+        assert config.parse_many([{"foo": "x"}]).values == [{"foo": "X"}]
+        assert config.parse_columns({"foo": ["x"]}).values == {"foo": ["X"]}
+        assert config.layered({"foo": "x"})["foo"] == "X"
+
+    def test_parse_reuses_plan(self):
+        """The parsing plan is computed once."""
+        config = Config(ConfigKey("foo", "int"))
+        config.parse({"foo": "1"})
+        plan = config._plan
+        assert config.parse({"foo": "2"}) == {"foo": 2}
+        assert config._plan is plan
+
     def test_parse_includes_defaults(self):
         """If a config key is missing, the default value is returned."""
         config = Config(
@@ -205,3 +469,616 @@ class TestConfig:
         )
         parsed = config.parse({"foo": "Foo"})
         assert parsed == {"foo": "Foo", "bar": 10}
+
+    def test_parse_many(self):
+        """Multiple configurations can be parsed at once."""
+        config = Config(
+            ConfigKey("foo", "int"), ConfigKey("bar", "str", default="x")
+        )
+        results = config.parse_many([{"foo": "1"}, None, {"bar": 2}])
+        assert isinstance(results, ParseResults)
+        assert results.values == [
+            {"foo": 1, "bar": "x"},
+            {"foo": None, "bar": "x"},
+            {"foo": None, "bar": "2"},
+        ]
+        assert results.errors == {}
+
+    def test_parse_many_iterable(self):
+        """Configurations can be passed as any iterable."""
+        config = Config(ConfigKey("foo", "int"))
+        results = config.parse_many({"foo": str(i)} for i in range(3))
+        assert results.values == [{"foo": 0}, {"foo": 1}, {"foo": 2}]
+
+    def test_parse_many_errors(self):
+        """Errors are returned for each invalid configuration."""
+        config = Config(
+            ConfigKey("foo", "int", required=True), ConfigKey("bar", "float")
+        )
+        results = config.parse_many(
+            [
+                {"foo": "1", "bar": "1.5"},
+                {"bar": "2.5"},
+                {"foo": "a", "bar": "b"},
+                {"foo": "4"},
+            ]
+        )
+        assert results.values == [
+            {"foo": 1, "bar": 1.5},
+            None,
+            None,
+            {"foo": 4, "bar": None},
+        ]
+        assert list(results.errors) == [1, 2]
+        [missing] = results.errors[1]
+        assert isinstance(missing, MissingConfigKey)
+        assert missing.key == "foo"
+        invalid_foo, invalid_bar = results.errors[2]
+        assert isinstance(invalid_foo, InvalidConfigValue)
+        assert invalid_foo.key == "foo"
+        assert isinstance(invalid_bar, InvalidConfigValue)
+        assert invalid_bar.key == "bar"
+
+    def test_parse_many_none_value(self):
+        """None values for typed keys are reported as invalid."""
+        config = Config(ConfigKey("port", "int"))
+        results = config.parse_many([{"port": None}, {"port": "80"}])
+        assert results.values == [None, {"port": 80}]
+        [error] = results.errors[0]
+        assert isinstance(error, InvalidConfigValue)
+        assert error.key == "port"
+
+    def test_parse_columns_none_value(self):
+        """None values in columns are reported as invalid."""
+        config = Config(ConfigKey("port", "int"))
+        results = config.parse_columns({"port": ["80", None]})
+        assert results.values == {"port": [80, None]}
+        assert list(results.errors) == [1]
+
+    def test_parse_many_no_keys(self):
+        """Configurations with no keys are parsed as empty dicts."""
+        results = Config().parse_many([{"foo": "bar"}, {}])
+        assert results.values == [{}, {}]
+
+    def test_parse_many_empty(self):
+        """No values are returned if there are no configurations."""
+        results = Config(ConfigKey("foo", "int")).parse_many([])
+        assert results.values == []
+        assert results.errors == {}
+
+    def test_parse_columns(self):
+        """Column-oriented configurations can be parsed."""
+        config = Config(
+            ConfigKey("foo", "int", required=True),
+            ConfigKey("bar", "bool", default=True),
+        )
+        results = config.parse_columns({"foo": ["1", "2"], "baz": [1, 2]})
+        assert results.values == {"foo": [1, 2], "bar": [True, True]}
+        assert results.errors == {}
+
+    def test_parse_columns_errors(self):
+        """Errors are returned for each invalid record."""
+        config = Config(
+            ConfigKey("foo", "int"), ConfigKey("bar", "str", required=True)
+        )
+        results = config.parse_columns({"foo": ("1", "a", "3")})
+        assert results.values == {
+            "foo": [1, None, 3],
+            "bar": [None, None, None],
+        }
+        assert sorted(results.errors) == [0, 1, 2]
+        assert [type(error) for error in results.errors[1]] == [
+            InvalidConfigValue,
+            MissingConfigKey,
+        ]
+
+    def test_parse_columns_different_lengths(self):
+        """Columns must have the same length."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        with pytest.raises(ValueError):
+            config.parse_columns({"foo": [1, 2], "bar": [1]})
+
+    def test_parse_columns_empty(self):
+        """No values are returned if there are no columns."""
+        results = Config(ConfigKey("foo", "int")).parse_columns({})
+        assert results.values == {"foo": []}
+
+
+class CountingSource(dict):
+    """A dict source recording key lookups."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = []
+
+    def __getitem__(self, name):
+        self.lookups.append(name)
+        return super().__getitem__(name)
+
+
+class TestLayeredConfig:
+    def test_layered(self):
+        """Config.layered returns a LayeredConfig for the sources."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "str"))
+        layered = config.layered({"foo": "3"})
+        assert isinstance(layered, LayeredConfig)
+        assert layered["foo"] == 3
+        assert layered["bar"] is None
+
+    def test_sources_precedence(self):
+        """Earlier sources take precedence."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        layered = config.layered({"foo": "1"}, {"foo": "2", "bar": "3"})
+        assert layered["foo"] == 1
+        assert layered["bar"] == 3
+
+    def test_lazy(self):
+        """Sources are only read for accessed keys."""
+        source = CountingSource(foo="1", bar="2")
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        layered = config.layered(source)
+        assert layered["foo"] == 1
+        assert source.lookups == ["foo"]
+
+    def test_cached(self):
+        """Values are looked up and converted once."""
+        calls = []
+        source = CountingSource(foo="1")
+        config = Config(
+            ConfigKey("foo", "int", validator=calls.append),
+        )
+        layered = config.layered(source)
+        assert layered["foo"] == 1
+        assert layered["foo"] == 1
+        assert source.lookups == ["foo"]
+        assert calls == [1]
+
+    def test_contains(self):
+        """Keys are in the configuration if defined, without lookups."""
+        source = CountingSource()
+        config = Config(ConfigKey("foo", "int", required=True))
+        layered = config.layered(source)
+        assert "foo" in layered
+        assert "bar" not in layered
+        assert source.lookups == []
+
+    def test_get(self):
+        """get returns values, or the default if not defined or missing."""
+        config = Config(
+            ConfigKey("foo", "int"), ConfigKey("bar", "int", required=True)
+        )
+        layered = config.layered({"foo": "1"})
+        assert layered.get("foo") == 1
+        assert layered.get("bar") is None
+        assert layered.get("bar", 5) == 5
+        assert layered.get("baz", 6) == 6
+
+    def test_get_invalid(self):
+        """get raises an error for invalid values."""
+        config = Config(ConfigKey("foo", "int"))
+        with pytest.raises(InvalidConfigValue):
+            config.layered({"foo": "bar"}).get("foo")
+
+    def test_default(self):
+        """Default values are returned for keys not in sources."""
+        config = Config(ConfigKey("foo", "int", default=10))
+        assert config.layered({})["foo"] == 10
+
+    def test_missing_required(self):
+        """An error is raised if a required key is not in sources."""
+        config = Config(ConfigKey("foo", "int", required=True))
+        with pytest.raises(MissingConfigKey):
+            config.layered({"bar": 1})["foo"]
+
+    def test_invalid_value(self):
+        """An error is raised if a value is invalid."""
+        config = Config(ConfigKey("foo", "int"))
+        with pytest.raises(InvalidConfigValue):
+            config.layered({"foo": "bar"})["foo"]
+
+    def test_unknown_key(self):
+        """KeyError is raised for unknown keys."""
+        layered = Config(ConfigKey("foo", "int")).layered({"bar": "1"})
+        with pytest.raises(KeyError):
+            layered["bar"]
+        assert layered.get("bar") is None
+
+    def test_mapping(self):
+        """LayeredConfig is a mapping of all keys."""
+        config = Config(
+            ConfigKey("foo", "int"), ConfigKey("bar", "str", default="x")
+        )
+        layered = config.layered({"foo": "1", "baz": 2})
+        assert len(layered) == 2
+        assert dict(layered) == {"foo": 1, "bar": "x"}
+
+    def test_overlay(self):
+        """Overlays add sources with higher precedence."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        layered = config.layered({"foo": "1", "bar": "2"})
+        assert layered["foo"] == 1
+        overlay = layered.overlay({"foo": "10"})
+        assert overlay["foo"] == 10
+        assert overlay["bar"] == 2
+        assert layered["foo"] == 1
+
+    def test_extend(self):
+        """Extending adds keys without copying existing ones."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        layered = config.layered({"foo": "1", "bar": "2", "baz": "3"})
+        extended = layered.extend(
+            ConfigKey("baz", "int"), ConfigKey("bar", "str")
+        )
+        assert extended._keys.parents.maps[0] is config._config_keys
+        assert dict(extended) == {"foo": 1, "bar": "2", "baz": 3}
+        assert "baz" not in layered
+
+
+class TestEnvironSource:
+    def test_getitem(self):
+        """Options are read from prefixed, upper-case variables."""
+        source = EnvironSource(
+            prefix="APP_", environ={"APP_FOO_BAR": "1", "FOO": "2"}
+        )
+        assert source["foo-bar"] == "1"
+        assert source["foo.bar"] == "1"
+        with pytest.raises(KeyError):
+            source["foo"]
+
+    def test_iter(self):
+        """Options are listed from variables with the prefix."""
+        source = EnvironSource(
+            prefix="APP_", environ={"APP_FOO": "1", "APP_BAR": "2", "X": "3"}
+        )
+        assert sorted(source) == ["bar", "foo"]
+        assert len(source) == 2
+
+    def test_default_environ(self, monkeypatch):
+        """The process environment is used by default."""
+        monkeypatch.setenv("TEST_TOOLRACK_FOO", "bar")
+        assert EnvironSource(prefix="TEST_TOOLRACK_")["foo"] == "bar"
+
+    def test_layered(self):
+        """The source can be used for layered configs."""
+        config = Config(ConfigKey("foo", "int"), ConfigKey("bar", "int"))
+        layered = config.layered(
+            EnvironSource(prefix="APP_", environ={"APP_FOO": "3"}),
+            {"foo": "1", "bar": "2"},
+        )
+        assert dict(layered) == {"foo": 3, "bar": 2}
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"foo": "1", "bar": "a"}))
+    yield path
+
+
+def update_file(path: Path, content: dict) -> None:
+    """Update a file, making sure the modification time changes."""
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_text(json.dumps(content))
+    os.utime(path, ns=(mtime_ns + 1000, mtime_ns + 1000))
+
+
+class TestConfigWatcher:
+    @pytest.fixture
+    def config(self):
+        yield Config(
+            ConfigKey("foo", "int"),
+            ConfigKey("bar", "str"),
+            ConfigKey("baz", "int", default=5),
+        )
+
+    def test_initial_load(self, config, config_file):
+        """The configuration is loaded when the watcher is created."""
+        watcher = ConfigWatcher(config, config_file)
+        assert watcher.values == {"foo": 1, "bar": "a", "baz": 5}
+
+    def test_loader_from_extension(self, config, tmp_path):
+        """The loader is based on the file extension by default."""
+        config_file = tmp_path / "config.toml"
+        config_file.write_text('foo = "3"\n')
+        watcher = ConfigWatcher(config, config_file)
+        assert watcher.values["foo"] == 3
+
+    def test_check_unchanged(self, mocker, config, config_file):
+        """The file is not read if it's not changed."""
+        watcher = ConfigWatcher(config, config_file)
+        read_bytes = mocker.spy(Path, "read_bytes")
+        assert watcher.check() == {}
+        read_bytes.assert_not_called()
+
+    def test_check_same_content(self, config, config_file):
+        """The file is not parsed if its content is the same."""
+        loads = []
+
+        def loader(content):
+            loads.append(content)
+            return json.loads(content)
+
+        watcher = ConfigWatcher(config, config_file, loader=loader)
+        update_file(config_file, {"foo": "1", "bar": "a"})
+        assert watcher.check() == {}
+        assert len(loads) == 1
+
+    def test_check_changed(self, config, config_file):
+        """Changed keys are returned with old and new values."""
+        watcher = ConfigWatcher(config, config_file)
+        update_file(config_file, {"foo": "2", "bar": "a", "baz": "6"})
+        assert watcher.check() == {"foo": (1, 2), "baz": (5, 6)}
+        assert watcher.values == {"foo": 2, "bar": "a", "baz": 6}
+        # changes are only reported once
+        assert watcher.check() == {}
+
+    def test_check_error(self, config, config_file):
+        """If the new configuration is invalid, current values are kept."""
+        watcher = ConfigWatcher(config, config_file)
+        update_file(config_file, {"foo": "invalid"})
+        with pytest.raises(InvalidConfigValue):
+            watcher.check()
+        assert watcher.values == {"foo": 1, "bar": "a", "baz": 5}
+        update_file(config_file, {"foo": "3", "bar": "a"})
+        assert watcher.check() == {"foo": (1, 3)}
+
+    def test_subscribe(self, config, config_file):
+        """Subscribers are notified of changes."""
+        all_changes = []
+        foo_changes = []
+        baz_changes = []
+        watcher = ConfigWatcher(config, config_file)
+        watcher.subscribe(all_changes.append)
+        watcher.subscribe(foo_changes.append, keys=["foo"])
+        watcher.subscribe(baz_changes.append, keys=["baz"])
+        update_file(config_file, {"foo": "2", "bar": "b"})
+        watcher.check()
+        assert all_changes == [{"foo": (1, 2), "bar": ("a", "b")}]
+        assert foo_changes == [{"foo": (1, 2)}]
+        assert baz_changes == []
+
+    def test_subscribe_no_changes(self, config, config_file):
+        """Subscribers are not called if values don't change."""
+        changes = []
+        watcher = ConfigWatcher(config, config_file)
+        watcher.subscribe(changes.append)
+        update_file(config_file, {"foo": 1, "bar": "a"})
+        assert watcher.check() == {}
+        assert changes == []
+
+    def test_unsubscribe(self, config, config_file):
+        """Subscribers can be removed."""
+        changes = []
+        watcher = ConfigWatcher(config, config_file)
+        watcher.subscribe(changes.append)
+        watcher.unsubscribe(changes.append)
+        update_file(config_file, {"foo": "2"})
+        watcher.check()
+        assert changes == []
+
+    async def test_periodic_call(self, advance_time, config, config_file):
+        """Checks can be run periodically."""
+        changes = []
+        watcher = ConfigWatcher(config, config_file)
+        watcher.subscribe(changes.append)
+        call = PeriodicCall(watcher.check)
+        call.start(5)
+        await advance_time(1)
+        update_file(config_file, {"foo": "2", "bar": "a"})
+        await advance_time(5)
+        await call.stop()
+        assert changes == [{"foo": (1, 2)}]
+
+
+class TestLoaders:
+    def test_load_json(self):
+        """JSON content is loaded."""
+        assert load_json(b'{"foo": [1, 2]}') == {"foo": [1, 2]}
+
+    def test_load_toml(self):
+        """TOML content is loaded."""
+        content = dedent(
+            """\
+            foo = 1
+            [bar]
+            baz = "x"
+            """
+        )
+        assert load_toml(content.encode()) == {"foo": 1, "bar": {"baz": "x"}}
+
+    def test_load_ini(self):
+        """INI content is loaded, with sections as dicts."""
+        content = dedent(
+            """\
+            [DEFAULT]
+            Foo = 1
+            [bar]
+            baz = %(foo)s
+            """
+        )
+        assert load_ini(content.encode()) == {
+            "Foo": "1",
+            "bar": {"Foo": "1", "baz": "%(foo)s"},
+        }
+
+    def test_load_dotenv(self):
+        """Dotenv content is loaded."""
+        content = dedent(
+            """\
+            # a comment
+            FOO=bar
+
+            export BAZ = some value # comment
+            SINGLE='a \\n #b'
+            DOUBLE="a\\tb\\n\\"c\\""
+            EMPTY=
+            """
+        )
+        assert load_dotenv(content.encode()) == {
+            "FOO": "bar",
+            "BAZ": "some value",
+            "SINGLE": "a \\n #b",
+            "DOUBLE": 'a\tb\n"c"',
+            "EMPTY": "",
+        }
+
+    def test_load_dotenv_invalid(self):
+        """An error is raised for invalid dotenv lines."""
+        with pytest.raises(ValueError) as error:
+            load_dotenv(b"FOO=bar\ninvalid line\n")
+        assert str(error.value) == "Invalid dotenv line 2: invalid line"
+
+    @pytest.mark.parametrize(
+        "name,loader",
+        [
+            ("config.json", load_json),
+            ("config.toml", load_toml),
+            ("config.ini", load_ini),
+            ("config.cfg", load_ini),
+            ("config.env", load_dotenv),
+            (".env", load_dotenv),
+        ],
+    )
+    def test_get_loader(self, name, loader):
+        """The loader is returned based on the file extension."""
+        assert get_loader(Path("dir") / name) is loader
+
+    def test_get_loader_unknown(self):
+        """An error is raised for unknown file formats."""
+        with pytest.raises(ValueError):
+            get_loader("config.xml")
+
+    def test_load_config_file(self, tmp_path):
+        """Configuration files are loaded based on their extension."""
+        path = tmp_path / "config.toml"
+        path.write_text("foo = 1\n")
+        assert load_config_file(path) == {"foo": 1}
+
+    def test_load_config_file_loader(self, tmp_path):
+        """A custom loader can be used."""
+        path = tmp_path / "config"
+        path.write_text("foo=1\n")
+        assert load_config_file(path, loader=load_dotenv) == {"foo": "1"}
+
+    def test_parse_file(self, tmp_path):
+        """Config.parse_file parses a configuration file."""
+        path = tmp_path / "config.json"
+        path.write_text('{"foo": "1"}')
+        config = Config(ConfigKey("foo", "int"))
+        assert config.parse_file(path) == {"foo": 1}
+
+
+class TestConfigFileCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        yield ConfigFileCache(tmp_path / "cache")
+
+    @pytest.fixture
+    def loads(self):
+        yield []
+
+    @pytest.fixture
+    def loader(self, loads):
+        def loader(content):
+            loads.append(content)
+            return json.loads(content)
+
+        yield loader
+
+    def test_create_directory(self, tmp_path):
+        """The cache directory is created."""
+        ConfigFileCache(tmp_path / "cache" / "config")
+        assert (tmp_path / "cache" / "config").is_dir()
+
+    def test_load_cached(self, cache, loader, loads, config_file):
+        """Cached configurations are not loaded again."""
+        assert cache.load(config_file, loader, "counting") == {
+            "foo": "1",
+            "bar": "a",
+        }
+        assert cache.load(config_file, loader, "counting") == {
+            "foo": "1",
+            "bar": "a",
+        }
+        assert len(loads) == 1
+        assert len(list(cache.directory.iterdir())) == 1
+
+    def test_load_changed(self, cache, loader, loads, config_file):
+        """Configurations are loaded again if the file changes."""
+        cache.load(config_file, loader, "counting")
+        update_file(config_file, {"foo": "2"})
+        assert cache.load(config_file, loader, "counting") == {"foo": "2"}
+        assert cache.load(config_file, loader, "counting") == {"foo": "2"}
+        assert len(loads) == 2
+        assert len(list(cache.directory.iterdir())) == 1
+
+    def test_load_other_loader(self, cache, loader, loads, config_file):
+        """Configurations are loaded again with a different loader."""
+        cache.load(config_file, load_json)
+        cache.load(config_file, loader, "counting")
+        assert len(loads) == 1
+
+    def test_load_invalid_entry(self, cache, loader, loads, config_file):
+        """Invalid cache entries are replaced."""
+        cache.load(config_file, loader, "counting")
+        [entry] = cache.directory.iterdir()
+        entry.write_bytes(b"invalid")
+        assert cache.load(config_file, loader, "counting") == {
+            "foo": "1",
+            "bar": "a",
+        }
+        assert cache.load(config_file, loader, "counting") == {
+            "foo": "1",
+            "bar": "a",
+        }
+        assert len(loads) == 2
+
+    def test_load_module_function(self, cache, config_file, mocker):
+        """Module-level loaders are identified by name."""
+        loads = mocker.spy(json, "loads")
+        cache.load(config_file, load_json)
+        cache.load(config_file, load_json)
+        assert loads.call_count == 1
+        [entry] = cache.directory.iterdir()
+        assert pickle.loads(entry.read_bytes())["loader"] == (
+            "toolrack.config.load_json"
+        )
+
+    def test_load_unnamed_loader_not_cached(self, cache, config_file):
+        """Loaders without a stable name are not cached."""
+        cache.load(config_file, lambda content: {"foo": "lambda"})
+        assert cache.load(
+            config_file, partial(lambda tag, content: {"foo": tag}, "partial")
+        ) == {"foo": "partial"}
+        assert cache.load(config_file, lambda content: {"foo": "other"}) == {
+            "foo": "other"
+        }
+        assert list(cache.directory.iterdir()) == []
+
+    def test_load_loader_key(self, cache, config_file):
+        """Loaders without a stable name are cached with a key."""
+        loader = partial(load_json)
+        cache.load(config_file, loader, loader_key="json")
+        cache.load(config_file, loader, loader_key="json")
+        assert len(list(cache.directory.iterdir())) == 1
+        assert cache.load(
+            config_file, lambda content: {"foo": "other"}, loader_key="other"
+        ) == {"foo": "other"}
+
+    def test_parse_file_loader_key(self, cache, config_file):
+        """A loader key can be passed when parsing configuration files."""
+        config = Config(ConfigKey("foo", "int"))
+        assert config.parse_file(
+            config_file,
+            loader=partial(load_json),
+            cache=cache,
+            loader_key="json",
+        ) == {"foo": 1}
+        assert len(list(cache.directory.iterdir())) == 1
+
+    def test_parse_file(self, cache, config_file):
+        """A cache can be used when parsing configuration files."""
+        config = Config(ConfigKey("foo", "int"))
+        assert config.parse_file(config_file, cache=cache) == {"foo": 1}
+        assert config.parse_file(config_file, cache=cache) == {"foo": 1}
+        assert len(list(cache.directory.iterdir())) == 1
@@ -1,21 +1,85 @@
 """Utilities based on the asyncio library."""
 
+from .cron import (
+    CronSchedule,
+    InvalidCronExpression,
+)
+from .framing import (
+    Framer,
+    InvalidFrame,
+    JSONLinesFramer,
+    LengthPrefixFramer,
+    NetstringFramer,
+    RegexFramer,
+    SeparatorFramer,
+)
 from .periodic import (
     AlreadyRunning,
+    CatchUpPolicy,
     NotRunning,
+    OverlapPolicy,
     PeriodicCall,
     TimedCall,
 )
+from .pool import (
+    ProcessPool,
+    ProcessResult,
+)
 from .process import (
+    BufferRetention,
+    OutputLog,
     ProcessParserProtocol,
+    ProcessUsage,
     StreamHelper,
 )
+from .ratelimit import (
+    LeakyBucket,
+    TokenBucket,
+)
+from .state import (
+    FileScheduleState,
+    ScheduleState,
+    SQLiteScheduleState,
+)
+from .stats import (
+    CallStats,
+    Histogram,
+)
+from .wheel import (
+    TimerWheel,
+    WheelHandle,
+)
 
 __all__ = [
     "AlreadyRunning",
+    "BufferRetention",
+    "CallStats",
+    "CatchUpPolicy",
+    "CronSchedule",
+    "FileScheduleState",
+    "Framer",
+    "Histogram",
+    "InvalidCronExpression",
+    "InvalidFrame",
+    "JSONLinesFramer",
+    "LeakyBucket",
+    "LengthPrefixFramer",
+    "NetstringFramer",
     "NotRunning",
+    "OutputLog",
+    "OverlapPolicy",
     "PeriodicCall",
     "ProcessParserProtocol",
+    "ProcessPool",
+    "ProcessResult",
+    "ProcessUsage",
+    "RegexFramer",
+    "SQLiteScheduleState",
+    "ScheduleState",
+    "SeparatorFramer",
     "StreamHelper",
     "TimedCall",
+    "TimerWheel",
+    "TokenBucket",
+    "WheelHandle",
 ]
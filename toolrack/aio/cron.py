@@ -0,0 +1,211 @@
+"""Cron-like schedules for timed calls.
+
+The :class:`CronSchedule` parses a cron expression, and provides an iterator
+of event loop times matching it, which can be passed to
+:meth:`TimedCall.start`::
+
+  call = TimedCall(func)
+  call.start(CronSchedule("*/15 9-17 * * mon-fri").times())
+
+Expressions have the five standard fields (minute, hour, day of month, month
+and day of week), each accepting values, ranges, steps and comma-separated
+lists of those.  Months and days of week can also be specified by their
+three-letter English names.  The ``@yearly``, ``@annually``, ``@monthly``,
+``@weekly``, ``@daily``, ``@midnight`` and ``@hourly`` shortcuts are also
+accepted.
+
+As in standard cron, if both the day of month and the day of week are
+restricted, a day matches if either of them does.
+
+"""
+
+from asyncio import get_running_loop
+from bisect import bisect_left
+from calendar import monthrange
+from collections.abc import Iterator
+from datetime import (
+    datetime,
+    timedelta,
+    tzinfo,
+)
+from time import time
+
+_SHORTCUTS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTHS = ("jan feb mar apr may jun jul aug sep oct nov dec".split(), 1)
+_DAYS_OF_WEEK = ("sun mon tue wed thu fri sat".split(), 0)
+
+# how far in the future to look for a matching time, so that impossible
+# expressions (such as February 30th) don't loop forever
+_MAX_YEARS = 10
+
+
+class InvalidCronExpression(Exception):
+    """The cron expression is invalid."""
+
+    def __init__(self, expression: str):
+        super().__init__(f"Invalid cron expression: {expression}")
+        self.expression = expression
+
+
+class CronSchedule:
+    """A schedule based on a cron expression.
+
+    :param expression: the cron expression.
+
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = _SHORTCUTS.get(expression, expression).split()
+        if len(fields) != 5:
+            raise InvalidCronExpression(expression)
+
+        try:
+            self._minutes = _parse_field(fields[0], 0, 59)
+            self._hours = _parse_field(fields[1], 0, 23)
+            self._days = _parse_field(fields[2], 1, 31)
+            self._months = _parse_field(fields[3], 1, 12, _MONTHS)
+            days_of_week = _parse_field(fields[4], 0, 7, _DAYS_OF_WEEK)
+        except ValueError:
+            raise InvalidCronExpression(expression)
+        # both 0 and 7 are Sunday
+        self._days_of_week = frozenset(day % 7 for day in days_of_week)
+        self._any_day = fields[2] == "*"
+        self._any_day_of_week = fields[4] == "*"
+
+    def next_after(self, dt: datetime) -> datetime:
+        """Return the first matching time after the specified one.
+
+        Timezone-aware datetimes are handled in their timezone, based on wall
+        clock time.
+
+        """
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        max_year = dt.year + _MAX_YEARS
+        while dt.year <= max_year:
+            if dt.month not in self._months:
+                month = _next_value(self._months, dt.month)
+                if month is None:
+                    dt = dt.replace(
+                        year=dt.year + 1, month=self._months[0], day=1
+                    )
+                else:
+                    dt = dt.replace(month=month, day=1)
+                dt = dt.replace(hour=0, minute=0)
+                continue
+
+            if not self._day_matches(dt):
+                dt = self._next_day(dt)
+                continue
+
+            if dt.hour not in self._hours:
+                hour = _next_value(self._hours, dt.hour)
+                if hour is None:
+                    dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                    continue
+                dt = dt.replace(hour=hour, minute=0)
+
+            if dt.minute not in self._minutes:
+                minute = _next_value(self._minutes, dt.minute)
+                if minute is None:
+                    dt = dt.replace(minute=0) + timedelta(hours=1)
+                    continue
+                dt = dt.replace(minute=minute)
+
+            return dt
+
+        raise InvalidCronExpression(self.expression)
+
+    def times(self, tz: tzinfo | None = None) -> Iterator[float]:
+        """Return an iterator of event loop times matching the schedule.
+
+        Each time is converted from wall clock time to event loop time when
+        it's generated, so the iterator follows adjustments of the system
+        clock.
+
+        :param tz: the timezone to match the schedule in.  If not specified,
+          the local timezone is used.
+
+        """
+        loop = get_running_loop()
+        dt = datetime.fromtimestamp(time(), tz)
+        while True:
+            dt = self.next_after(dt)
+            yield loop.time() + dt.timestamp() - time()
+
+    def _next_day(self, dt: datetime) -> datetime:
+        """Return the start of the next candidate day."""
+        dt = dt.replace(hour=0, minute=0)
+        if self._any_day or not self._any_day_of_week:
+            return dt + timedelta(days=1)
+
+        # only the day of month is restricted, jump to the next one
+        day = _next_value(self._days, dt.day)
+        if day is not None and day <= monthrange(dt.year, dt.month)[1]:
+            return dt.replace(day=day)
+        if dt.month == 12:
+            return dt.replace(year=dt.year + 1, month=1, day=1)
+        return dt.replace(month=dt.month + 1, day=1)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_matches = dt.day in self._days
+        day_of_week_matches = (dt.weekday() + 1) % 7 in self._days_of_week
+        if self._any_day:
+            return day_of_week_matches
+        if self._any_day_of_week:
+            return day_matches
+        return day_matches or day_of_week_matches
+
+
+def _parse_field(
+    field: str,
+    low: int,
+    high: int,
+    names: tuple[list[str], int] | None = None,
+) -> tuple[int, ...]:
+    """Parse a cron field, returning a sorted tuple of values."""
+
+    def value(token: str) -> int:
+        if names:
+            labels, offset = names
+            try:
+                return labels.index(token.lower()) + offset
+            except ValueError:
+                pass
+        return int(token)
+
+    values: set[int] = set()
+    for part in field.split(","):
+        step, has_step = 1, "/" in part
+        if has_step:
+            part, step_token = part.split("/", 1)
+            step = int(step_token)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_token, end_token = part.split("-", 1)
+            start, end = value(start_token), value(end_token)
+        else:
+            start = value(part)
+            end = high if has_step else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(field)
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+def _next_value(values: tuple[int, ...], current: int) -> int | None:
+    """Return the first value not lower than the current, if any."""
+    index = bisect_left(values, current)
+    if index == len(values):
+        return None
+    return values[index]
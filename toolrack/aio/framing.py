@@ -0,0 +1,330 @@
+"""Framers to split a stream of bytes into records.
+
+A framer can be passed to a :class:`StreamHelper` to parse records other than
+lines of text::
+
+  stream = StreamHelper(callback=handle_event, framer=JSONLinesFramer())
+
+Framers receive chunks of data via :meth:`Framer.feed`, and yield complete
+frames as soon as they're available.  Each framer only looks at new data,
+and at most a bounded part of the pending one, so large records split
+across many chunks are not scanned repeatedly.
+
+Framers that yield binary frames return :class:`memoryview` objects over
+their internal buffer, which are released when the next frame is requested,
+so they must be copied or decoded right away, as :class:`StreamHelper` does.
+
+"""
+
+from collections.abc import (
+    Generator,
+    Iterator,
+)
+from contextlib import closing
+import json
+import re
+from typing import Any
+
+
+class InvalidFrame(Exception):
+    """Data in the stream don't match the expected framing."""
+
+
+class Framer:
+    """Base class for framers.
+
+    Subclasses must implement :func:`feed`, and :func:`flush` if they keep
+    partial data that can form a valid frame at the end of the stream.
+
+    """
+
+    def feed(self, data: bytes) -> Iterator[Any]:
+        """Receive data, yielding complete frames."""
+        raise NotImplementedError()
+
+    def flush(self) -> Iterator[Any]:
+        """Yield frames from pending data at the end of the stream."""
+        return iter(())
+
+
+class _DelimitedFramer(Framer):
+    """Base class for framers splitting data on separators.
+
+    Subclasses must implement :func:`_separators`.
+
+    """
+
+    # the maximum size of a separator
+    _max_separator_size = 1
+
+    def __init__(self) -> None:
+        self._partial = bytearray()
+        # whether the partial frame might contain separators, if a previous
+        # feed was interrupted
+        self._rescan = False
+
+    def feed(self, data: bytes) -> Generator[memoryview, None, None]:
+        position = 0
+        if self._partial:
+            # only look for separators in new data, plus the tail of the
+            # partial frame in case a separator spans the two chunks
+            if not self._rescan:
+                position = max(
+                    len(self._partial) - self._max_separator_size + 1, 0
+                )
+            self._partial += data
+            buffer: bytes | bytearray = self._partial
+        else:
+            buffer = data
+        self._rescan = False
+
+        start = 0
+        complete = False
+        try:
+            with memoryview(buffer) as view:
+                for end, next_start in self._separators(buffer, position):
+                    frame = view[start:end]
+                    # the frame is consumed even if processing it fails
+                    start = next_start
+                    with frame:
+                        yield frame
+            complete = True
+        finally:
+            if buffer is self._partial:
+                del self._partial[:start]
+            else:
+                self._partial += buffer[start:]
+            self._rescan = not complete
+
+    def flush(self) -> Generator[bytes, None, None]:
+        if self._rescan:
+            yield from (bytes(frame) for frame in self.feed(b""))
+        if self._partial:
+            partial = bytes(self._partial)
+            self._partial.clear()
+            yield partial
+
+    def _separators(
+        self, buffer: bytes | bytearray, position: int
+    ) -> Iterator[tuple[int, int]]:
+        """Yield start and end of separators in the buffer from position."""
+        raise NotImplementedError()
+
+
+class SeparatorFramer(_DelimitedFramer):
+    """Split data on a separator, such as newlines or NUL bytes.
+
+    The separator can be multiple bytes long, and split across chunks.
+
+    :param separator: the separator between frames.
+
+    """
+
+    def __init__(self, separator: bytes = b"\n"):
+        if not separator:
+            raise ValueError("Separator must not be empty")
+        super().__init__()
+        self.separator = separator
+        self._max_separator_size = len(separator)
+
+    def _separators(
+        self, buffer: bytes | bytearray, position: int
+    ) -> Iterator[tuple[int, int]]:
+        separator = self.separator
+        while (start := buffer.find(separator, position)) != -1:
+            position = start + len(separator)
+            yield start, position
+
+
+class RegexFramer(_DelimitedFramer):
+    """Split data on separators matching a regular expression.
+
+    This allows splitting on patterns such as ``\\r?\\n``, or on carriage
+    returns from progress bars.  When new data are received, only those and
+    the last ``max_separator_size - 1`` bytes of the partial frame are
+    scanned, to match separators split across chunks.
+
+    Matches are emitted as soon as they're found, so if a separator could be
+    extended by the following data (as with ``\\r\\n|\\r``), a separator
+    split across chunks can produce an additional empty frame.
+
+    :param pattern: the pattern for the separator, as a string, bytes or
+        compiled regular expression.  String patterns are encoded with
+        ``encoding``.
+    :param max_separator_size: the maximum size of a separator, in bytes.
+    :param encoding: the encoding for string patterns.
+
+    """
+
+    def __init__(
+        self,
+        pattern: str | bytes | re.Pattern,
+        max_separator_size: int = 16,
+        encoding: str = "utf-8",
+    ):
+        if max_separator_size < 1:
+            raise ValueError("Max separator size must be at least 1")
+        if isinstance(pattern, (str, bytes)):
+            pattern = re.compile(pattern)
+        if isinstance(pattern.pattern, str):
+            pattern = re.compile(
+                pattern.pattern.encode(encoding), pattern.flags & ~re.UNICODE
+            )
+        if pattern.match(b""):
+            raise ValueError("Pattern must not match an empty string")
+
+        super().__init__()
+        self.pattern = pattern
+        self._max_separator_size = max_separator_size
+
+    @property
+    def max_separator_size(self) -> int:
+        """The maximum size of a separator, in bytes."""
+        return self._max_separator_size
+
+    def _separators(
+        self, buffer: bytes | bytearray, position: int
+    ) -> Iterator[tuple[int, int]]:
+        for match in self.pattern.finditer(buffer, position):
+            yield match.span()
+
+
+class JSONLinesFramer(SeparatorFramer):
+    """Parse JSON Lines, yielding decoded objects.
+
+    Each line is decoded once, when it's complete.  Blank lines are skipped.
+    If a line is not valid JSON, an error is raised and the line is dropped,
+    while following lines are returned by the next :func:`feed` or
+    :func:`flush` call.
+
+    :param separator: the separator between JSON objects.
+    :raises json.JSONDecodeError: if a line is not valid JSON.
+
+    """
+
+    def feed(self, data: bytes) -> Generator[Any, None, None]:
+        return self._loads(super().feed(data))
+
+    def flush(self) -> Generator[Any, None, None]:
+        return self._loads(super().flush())
+
+    def _loads(
+        self, frames: Generator[bytes | memoryview, None, None]
+    ) -> Generator[Any, None, None]:
+        # close frames right away on errors, so that following lines are
+        # kept for the next feed
+        with closing(frames):
+            for frame in frames:
+                line = str(frame, "utf-8")
+                if line.strip():
+                    yield json.loads(line)
+
+
+class _SizedFramer(Framer):
+    """Base class for framers with a header specifying the frame size.
+
+    Subclasses must implement :func:`_parse_header`.
+
+    """
+
+    # bytes expected after each frame
+    _trailer = b""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        # bytes needed before a full frame is available
+        self._needed = 0
+
+    def feed(self, data: bytes) -> Iterator[memoryview]:
+        buffer = self._buffer
+        buffer += data
+        if len(buffer) < self._needed:
+            return
+
+        trailer = self._trailer
+        start = 0
+        self._needed = 0
+        try:
+            with memoryview(buffer) as view:
+                while header := self._parse_header(buffer, start):
+                    header_size, size = header
+                    frame_start = start + header_size
+                    end = frame_start + size
+                    if len(buffer) < end + len(trailer):
+                        # the header is not parsed again until the whole
+                        # frame is received
+                        self._needed = header_size + size + len(trailer)
+                        break
+                    if buffer[end : end + len(trailer)] != trailer:
+                        raise InvalidFrame("Invalid frame trailer")
+                    frame = view[frame_start:end]
+                    # the frame is consumed even if processing it fails
+                    start = end + len(trailer)
+                    with frame:
+                        yield frame
+        finally:
+            del buffer[:start]
+
+    def _parse_header(
+        self, buffer: bytearray, start: int
+    ) -> tuple[int, int] | None:
+        """Return the header and frame sizes, or None if incomplete."""
+        raise NotImplementedError()
+
+
+class LengthPrefixFramer(_SizedFramer):
+    """Split frames prefixed by their length as a binary integer.
+
+    :param size: the size of the length prefix, in bytes.
+    :param byteorder: the byte order of the length prefix.
+
+    """
+
+    def __init__(self, size: int = 4, byteorder: str = "big"):
+        if size < 1:
+            raise ValueError("Prefix size must be at least 1")
+        if byteorder not in ("big", "little"):
+            raise ValueError("Byte order must be 'big' or 'little'")
+
+        super().__init__()
+        self.size = size
+        self.byteorder = byteorder
+
+    def _parse_header(
+        self, buffer: bytearray, start: int
+    ) -> tuple[int, int] | None:
+        end = start + self.size
+        if len(buffer) < end:
+            return None
+        return self.size, int.from_bytes(
+            buffer[start:end],
+            self.byteorder,  # type: ignore[arg-type]
+        )
+
+
+class NetstringFramer(_SizedFramer):
+    """Parse netstrings, in the ``<length>:<data>,`` format.
+
+    :param max_digits: the maximum number of digits for the length.
+    :raises InvalidFrame: if data are not valid netstrings.
+
+    """
+
+    _trailer = b","
+
+    def __init__(self, max_digits: int = 10):
+        super().__init__()
+        self.max_digits = max_digits
+
+    def _parse_header(
+        self, buffer: bytearray, start: int
+    ) -> tuple[int, int] | None:
+        colon = buffer.find(b":", start, start + self.max_digits + 1)
+        if colon == -1:
+            if len(buffer) - start > self.max_digits:
+                raise InvalidFrame("Netstring length too long")
+            return None
+        length = buffer[start:colon]
+        if not length.isdigit():
+            raise InvalidFrame("Invalid netstring length")
+        return colon - start + 1, int(length)
@@ -6,18 +6,33 @@ timed and periodical tasks execution.
 """
 
 from asyncio import (
+    AbstractEventLoop,
     Handle,
+    Semaphore,
     Task,
-    get_event_loop,
+    get_running_loop,
     iscoroutinefunction,
+    wait,
 )
 from collections.abc import (
     Callable,
     Iterator,
 )
+from concurrent.futures import Executor
+from enum import StrEnum
 from functools import partial
+from hashlib import blake2b
+from random import uniform
+from time import time as wall_time
 from typing import cast
 
+from .state import ScheduleState
+from .stats import CallStats
+from .wheel import (
+    TimerWheel,
+    WheelHandle,
+)
+
 
 class AlreadyRunning(Exception):
     """The TimedCall is already running."""
@@ -36,6 +51,31 @@ class NotRunning(Exception):
 TimesIterator = Iterator[float | int]
 
 
+class OverlapPolicy(StrEnum):
+    """What to do when a call is due while a previous one is still running."""
+
+    #: Run calls concurrently.
+    ALLOW = "allow"
+    #: Skip the new call.
+    SKIP = "skip"
+    #: Queue the new call to run after the current one, up to a limit.
+    QUEUE = "queue"
+    #: Cancel the running call and start the new one.
+    CANCEL = "cancel"
+
+
+class CatchUpPolicy(StrEnum):
+    """What to do with calls that were missed because the loop was late."""
+
+    #: Skip missed calls.
+    SKIP = "skip"
+    #: Replay missed calls immediately, up to a limit.
+    BURST = "burst"
+    #: Skip missed calls, passing the count of missed ones to the next call
+    #: as the ``missed`` keyword argument.
+    COALESCE = "coalesce"
+
+
 class TimedCall:
     """Call a function based on a timer.
 
@@ -43,23 +83,82 @@ class TimedCall:
     :meth:`start()`, the function is scheduled at specified times
     until :meth:`stop()` is called (or the time iterator is exausted).
 
+    The call is bound to the running event loop when it's started, so it
+    can be created before the loop is running.
+
     :param func: the function to call periodically.
     :param args: arguments to pass to the function.
+    :param scheduler: an optional :class:`TimerWheel` to schedule calls
+      with, instead of using a separate event loop timer for each call.
+    :param overlap: the :class:`OverlapPolicy` for calls that are due while
+      a previous one is still running.
+    :param max_queued: the maximum number of calls to queue with the
+      :attr:`OverlapPolicy.QUEUE` policy. Further calls are skipped.
+    :param semaphore: an optional :class:`asyncio.Semaphore` which is
+      acquired for each call.  It can be shared among multiple calls to limit
+      how many of them run at the same time.
+    :param catch_up: the :class:`CatchUpPolicy` for times that are already
+      past when the next call is scheduled.
+    :param max_burst: the maximum number of consecutive missed calls to
+      replay with the :attr:`CatchUpPolicy.BURST` policy.  Further ones are
+      skipped.
+    :param stats: an optional :class:`CallStats` to collect statistics about
+      calls into.
+    :param executor: an optional :class:`concurrent.futures.Executor` to run
+      the function in, instead of the event loop thread. It can only be used
+      with synchronous functions.  With a process pool executor, the
+      function and its arguments must be picklable.
     :param kwargs: keyword arguments to pass to the function.
 
     """
 
-    def __init__(self, func: Callable, *args, **kwargs) -> None:
-        self._func = self._wrap_func(func, *args, **kwargs)
-        self._loop = get_event_loop()
-        self._handle: Handle | None = None
-        self._task: Task | None = None
+    _loop: AbstractEventLoop
+
+    def __init__(
+        self,
+        func: Callable,
+        *args,
+        scheduler: TimerWheel | None = None,
+        overlap: OverlapPolicy | str = OverlapPolicy.ALLOW,
+        max_queued: int = 1,
+        semaphore: Semaphore | None = None,
+        catch_up: CatchUpPolicy | str = CatchUpPolicy.SKIP,
+        max_burst: int = 10,
+        stats: CallStats | None = None,
+        executor: Executor | None = None,
+        **kwargs,
+    ) -> None:
+        self._func = self._wrap_func(func, executor, *args, **kwargs)
+        self._scheduler = scheduler
+        self._overlap = OverlapPolicy(overlap)
+        self._max_queued = max_queued
+        self._semaphore = semaphore
+        self._handle: Handle | WheelHandle | None = None
+        self._tasks: set[Task] = set()
+        self._last_task: Task | None = None
+        self._queued = 0
+        self._catch_up = CatchUpPolicy(catch_up)
+        self._max_burst = max_burst
+        self._bursts = 0
+        self._lag = 0.0
+        self._missed = 0
+        self._stats = stats
 
     @property
     def running(self) -> bool:
         """Whether the PeriodicCall is currently running."""
         return self._handle is not None
 
+    @property
+    def lag(self) -> float:
+        """How late the last call was, in seconds, compared to its time."""
+        return self._lag
+
+    @property
+    def missed(self) -> int:
+        """The total number of calls that were skipped for being late."""
+        return self._missed
+
     def start(self, times_iter: TimesIterator):
         """Start calling the function at specified times.
 
@@ -71,7 +170,10 @@ class TimedCall:
         if self.running:
             raise AlreadyRunning()
 
-        self._run(times_iter, do_call=False)
+        self._loop = get_running_loop()
+        if self._stats is not None:
+            self._stats.active += 1
+        self._schedule_next_run(times_iter)
 
     async def stop(self) -> None:
         """Stop calling the function periodically."""
@@ -80,40 +182,142 @@ class TimedCall:
 
         if self._handle:
             self._handle.cancel()
-            self._handle = None
-        if self._task:
-            await self._task
-            self._task = None
-
-    def _run(self, times_iter: TimesIterator, do_call: bool = True) -> None:
-        if do_call:
-            self._task = self._loop.create_task(self._func())
-        self._schedule_next_run(times_iter)
-
-    def _schedule_next_run(self, times_iter: TimesIterator) -> None:
-        delay = self._get_run_delay(times_iter)
-        if delay is None:
-            self._handle = None
+            self._set_stopped()
+        self._queued = 0
+        tasks = set(self._tasks)
+        if self._last_task:
+            tasks.add(self._last_task)
+            self._last_task = None
+        if not tasks:
+            return
+        done, _ = await wait(tasks)
+        for task in done:
+            if not task.cancelled() and task.exception():
+                raise cast(BaseException, task.exception())
+
+    def _run(self, times_iter: TimesIterator, when: float | int) -> None:
+        self._lag = self._loop.time() - when
+        missed = self._schedule_next_run(times_iter)
+        self._missed += missed
+        if self._stats is not None:
+            self._stats.calls += 1
+            self._stats.missed += missed
+            self._stats.lag.add(self._lag)
+            if self._tasks:
+                self._stats.overlaps += 1
+        self._call(missed)
+
+    def _set_stopped(self) -> None:
+        self._handle = None
+        if self._stats is not None:
+            self._stats.active -= 1
+
+    def _call(self, missed: int = 0) -> None:
+        if self._tasks:
+            match self._overlap:
+                case OverlapPolicy.SKIP:
+                    return
+                case OverlapPolicy.QUEUE:
+                    if self._queued < self._max_queued:
+                        self._queued += 1
+                    return
+                case OverlapPolicy.CANCEL:
+                    for task in self._tasks:
+                        task.cancel()
+        self._create_task(missed)
+
+    def _create_task(self, missed: int = 0) -> None:
+        kwargs = {}
+        if self._catch_up == CatchUpPolicy.COALESCE:
+            kwargs["missed"] = missed
+        task = self._loop.create_task(self._execute(**kwargs))
+        self._tasks.add(task)
+        self._last_task = task
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: Task) -> None:
+        self._tasks.discard(task)
+        if self._queued:
+            self._queued -= 1
+            self._create_task()
+
+    async def _execute(self, **kwargs) -> None:
+        if self._semaphore is None:
+            await self._execute_func(**kwargs)
         else:
-            self._handle = self._loop.call_later(delay, self._run, times_iter)
-
-    def _get_run_delay(self, times_iter: TimesIterator) -> float | None:
+            async with self._semaphore:
+                await self._execute_func(**kwargs)
+
+    async def _execute_func(self, **kwargs) -> None:
+        if self._stats is None:
+            await self._func(**kwargs)
+            return
+
+        stats = self._stats
+        stats.running += 1
+        start = self._loop.time()
+        try:
+            await self._func(**kwargs)
+        except Exception as e:
+            stats.errors += 1
+            stats.last_error = e
+            raise
+        finally:
+            stats.running -= 1
+            stats.duration.add(self._loop.time() - start)
+
+    def _schedule_next_run(self, times_iter: TimesIterator) -> int:
+        """Schedule the next run, returning the number of missed times."""
         now = self._loop.time()
-        next_time: float | int = -1
-        while next_time < now:
+        missed = 0
+        while True:
             try:
                 next_time = next(times_iter)
             except StopIteration:
-                return None
-        return float(next_time - now)
-
-    def _wrap_func(self, func: Callable, *args, **kwargs) -> Callable:
+                self._set_stopped()
+                return missed
+            if next_time >= now:
+                self._bursts = 0
+                break
+            if (
+                self._catch_up == CatchUpPolicy.BURST
+                and self._bursts < self._max_burst
+            ):
+                self._bursts += 1
+                break
+            missed += 1
+
+        if self._scheduler is not None and next_time > now:
+            self._handle = self._scheduler.call_at(
+                next_time, self._run, times_iter, next_time
+            )
+        else:
+            self._handle = self._loop.call_at(
+                next_time, self._run, times_iter, next_time
+            )
+        return missed
+
+    def _wrap_func(
+        self, func: Callable, executor: Executor | None, *args, **kwargs
+    ) -> Callable:
         if iscoroutinefunction(func):
+            if executor is not None:
+                raise ValueError(
+                    "Executor can only be used with synchronous functions"
+                )
             return cast(Callable, partial(func, *args, **kwargs))
+        elif executor is None:
+
+            async def f(**extra_kwargs):
+                return func(*args, **kwargs, **extra_kwargs)
+
+            return f
         else:
 
-            async def f():
-                return func(*args, **kwargs)
+            async def f(**extra_kwargs):
+                return await self._loop.run_in_executor(
+                    executor, partial(func, *args, **kwargs, **extra_kwargs)
+                )
 
             return f
 
@@ -121,20 +325,81 @@ class TimedCall:
 class PeriodicCall(TimedCall):
     """A TimedCall called at a fixed time intervals."""
 
-    def start(self, interval: int | float, now: bool = True):  # type: ignore
+    def start(  # type: ignore
+        self,
+        interval: int | float,
+        now: bool = True,
+        jitter: int | float = 0,
+        phase_key: str | None = None,
+        state: ScheduleState | None = None,
+        name: str | None = None,
+    ):
         """Start calling the function periodically.
 
         :param interval: the time interval in seconds between calls.
         :param now: whether to make the first call immediately.
+        :param jitter: if set, each call is delayed by a random amount of
+          seconds up to this value. The delay doesn't accumulate across calls.
+        :param phase_key: if set, calls are made at a fixed offset within the
+          interval, computed from the key.  This spreads calls with different
+          keys evenly across the interval.  The first call is made at the
+          first time matching the offset, regardless of ``now``.
+        :param state: an optional :class:`ScheduleState` to store call times
+          in.  If it contains times for the call, the schedule is resumed
+          from the stored next call time, regardless of ``now``.  If that's
+          already past, the call is made at the next time matching
+          ``phase_key`` if set, or immediately otherwise (still delayed by
+          ``jitter``), so that many overdue calls are not all made at once.
+        :param name: the name to store call times under.  It's required if
+          ``state`` is passed.
 
         """
+        if not 0 <= jitter <= interval:
+            raise ValueError("Jitter must be between zero and the interval")
+        if state is not None and name is None:
+            raise ValueError("A name is required to store schedule state")
+
+        def next_phase_time(time):
+            phase_time = (
+                time - time % interval + _phase_offset(phase_key, interval)
+            )
+            return phase_time if phase_time >= time else phase_time + interval
 
         def times():
             time = self._loop.time()
-            if not now:
+            entry = None if state is None else state.get(name)
+            last = None
+            if entry is not None:
+                last, next_time = entry
+                resume_time = time + next_time - wall_time()
+                if resume_time >= time:
+                    time = resume_time
+                elif phase_key is not None:
+                    time = next_phase_time(time)
+            elif phase_key is not None:
+                time = next_phase_time(time)
+            elif not now:
                 time += interval
+            first = True
             while True:
-                yield time
+                call_time = time + uniform(0, jitter) if jitter else time
+                if state is not None:
+                    current_time = wall_time()
+                    if not first:
+                        last = current_time
+                    state.set(
+                        name,
+                        last,
+                        current_time + call_time - self._loop.time(),
+                    )
+                    first = False
+                yield call_time
                 time += interval
 
         super().start(times())
+
+
+def _phase_offset(key: str, interval: int | float) -> float:
+    """Return a stable offset within the interval for a key."""
+    digest = blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest) / 2**64 * interval
@@ -0,0 +1,231 @@
+"""Run many processes with a concurrency limit.
+
+A :class:`ProcessPool` runs commands using a :class:`ProcessParserProtocol`,
+limiting how many processes run at the same time::
+
+  pool = ProcessPool(concurrency=8, timeout=30)
+  async for result in pool.run_all(commands):
+      print(result.command, result.returncode)
+
+Processes that exceed the timeout are terminated, and killed if they don't
+exit within ``kill_timeout``.  If their output pipes are still open after
+another ``kill_timeout``, for instance because they're held by child
+processes, they're closed and the output collected so far is returned.
+
+"""
+
+from asyncio import (
+    FIRST_COMPLETED,
+    Future,
+    Semaphore,
+    Task,
+    create_task,
+    gather,
+    get_running_loop,
+    shield,
+    wait,
+    wait_for,
+)
+from collections.abc import (
+    AsyncIterator,
+    Iterable,
+    Sequence,
+)
+import os
+from subprocess import DEVNULL
+from typing import Any
+
+from .process import (
+    ProcessParserProtocol,
+    ProcessUsage,
+)
+
+
+class ProcessResult:
+    """The result of a process run.
+
+    :param command: the command that was run.
+    :param returncode: the process exit code.
+    :param stdout: the process standard output.
+    :param stderr: the process standard error.
+    :param timed_out: whether the process was stopped because of a timeout.
+    :param usage: the :class:`ProcessUsage` for the process, if collected.
+
+    """
+
+    def __init__(
+        self,
+        command: tuple[str, ...],
+        returncode: int | None,
+        stdout: Any,
+        stderr: Any,
+        timed_out: bool = False,
+        usage: ProcessUsage | None = None,
+    ):
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.usage = usage
+
+    def __repr__(self) -> str:
+        return (
+            f"ProcessResult(command={self.command!r}, "
+            f"returncode={self.returncode!r}, timed_out={self.timed_out!r})"
+        )
+
+
+class ProcessPool:
+    """Run processes, limiting how many run concurrently.
+
+    Process output is collected with a :class:`ProcessParserProtocol`, which
+    is created with ``protocol_kwargs``.  Process standard input is
+    :data:`subprocess.DEVNULL` unless otherwise specified.
+
+    :param concurrency: the maximum number of processes running at the same
+      time.  It defaults to the number of CPUs.
+    :param timeout: the default timeout for processes, in seconds.
+    :param kill_timeout: how long to wait for a process to exit after it's
+      terminated because of a timeout, before killing it.
+    :param protocol_kwargs: keyword arguments for the
+      :class:`ProcessParserProtocol`.  If ``usage`` is true, results include
+      the process resource usage.  Wall time and output sizes are always
+      reported, but CPU times and maximum resident set size can only be
+      attributed to a process if no other process ran at the same time, so
+      they're :data:`None` for processes overlapping with others, which is
+      usually the case with a ``concurrency`` higher than 1.  See
+      :class:`ProcessUsage` for details.
+
+    """
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        kill_timeout: float = 5.0,
+        **protocol_kwargs,
+    ):
+        if concurrency is None:
+            concurrency = os.cpu_count() or 1
+        elif concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.kill_timeout = kill_timeout
+        self._protocol_kwargs = protocol_kwargs
+        self._semaphore = Semaphore(concurrency)
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        """The number of processes currently running."""
+        return self._running
+
+    async def run(
+        self,
+        *command: str,
+        timeout: float | None = None,
+        **kwargs,
+    ) -> ProcessResult:
+        """Run a command, waiting for a free slot in the pool.
+
+        :param command: the command and its arguments.
+        :param timeout: the timeout for the process, in seconds.  If not
+          specified, the pool timeout is used.
+        :param kwargs: additional keyword arguments for
+          :meth:`asyncio.loop.subprocess_exec`.
+        :return: a :class:`ProcessResult`.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+        kwargs.setdefault("stdin", DEVNULL)
+        async with self._semaphore:
+            self._running += 1
+            try:
+                return await self._run(command, timeout, kwargs)
+            finally:
+                self._running -= 1
+
+    async def run_all(
+        self, commands: Iterable[Sequence[str]], **kwargs
+    ) -> AsyncIterator[ProcessResult]:
+        """Run commands, yielding results in completion order.
+
+        At most ``concurrency`` commands are started at a time, so commands
+        can be a lazy iterable.  If a command fails to run, the exception is
+        raised and pending commands are cancelled.
+
+        :param commands: an iterable of commands, each a sequence of the
+          command and its arguments.
+        :param kwargs: additional keyword arguments for :meth:`run`.
+
+        """
+        commands = iter(commands)
+        pending: set[Task] = set()
+        try:
+            while True:
+                for command in commands:
+                    pending.add(create_task(self.run(*command, **kwargs)))
+                    if len(pending) == self.concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await wait(
+                    pending, return_when=FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await gather(*pending, return_exceptions=True)
+
+    async def _run(
+        self,
+        command: tuple[str, ...],
+        timeout: float | None,
+        kwargs: dict[str, Any],
+    ) -> ProcessResult:
+        loop = get_running_loop()
+        transport, protocol = await loop.subprocess_exec(
+            lambda: ProcessParserProtocol(**self._protocol_kwargs),
+            *command,
+            **kwargs,
+        )
+        timed_out = False
+        try:
+            if not await self._wait(protocol.done, timeout):
+                timed_out = True
+                transport.terminate()
+                if not await self._wait(protocol.done, self.kill_timeout):
+                    transport.kill()
+                    if not await self._wait(protocol.done, self.kill_timeout):
+                        # child processes of the killed one can keep pipes
+                        # open, stop reading from them
+                        for fd in (1, 2):
+                            pipe = transport.get_pipe_transport(fd)
+                            if pipe is not None:
+                                pipe.close()
+            stdout, stderr, *usage = await protocol.done
+        finally:
+            # this also kills the process if it's still running
+            transport.close()
+        return ProcessResult(
+            command,
+            transport.get_returncode(),
+            stdout,
+            stderr,
+            timed_out=timed_out,
+            usage=usage[0] if usage else None,
+        )
+
+    async def _wait(self, future: Future, timeout: float | None) -> bool:
+        """Wait for a future without cancelling it, return if it's done."""
+        try:
+            await wait_for(shield(future), timeout)
+        except TimeoutError:
+            return False
+        return True
@@ -1,13 +1,41 @@
 """Protocol class for collecting a process stdout/stderr."""
 
+from array import array
 from asyncio import (
+    BaseTransport,
     Future,
+    Queue,
     SubprocessProtocol,
-    get_event_loop,
+    SubprocessTransport,
+    TimerHandle,
+    get_running_loop,
+)
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Iterator,
+)
+from copy import deepcopy
+from enum import StrEnum
+from functools import partial
+import re
+from tempfile import SpooledTemporaryFile
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    cast,
+)
+from weakref import WeakSet
+
+from .framing import (
+    Framer,
+    RegexFramer,
+    SeparatorFramer,
 )
-from collections.abc import Callable
-from io import StringIO
-from typing import cast
+
+if TYPE_CHECKING:
+    import resource
 
 
 class ProcessParserProtocol(SubprocessProtocol):
@@ -21,27 +49,162 @@ class ProcessParserProtocol(SubprocessProtocol):
     tuple with the full stdout and stderr. Each tuple element is ``None`` if a
     parser is passed for that stream.
 
+    Output is decoded with the specified ``encoding``.  If it's
+    :data:`None`, parsers are passed lines as :class:`bytes`, and full output
+    is returned as :class:`bytes`.
+
+    The ``done`` :class:`Future` is created on first access, on the running
+    event loop, so the protocol can be created before the loop is running.
+
+    Reading from process pipes can be paused with :meth:`pause_reading` and
+    resumed with :meth:`resume_reading`, so that a slow consumer can apply
+    backpressure on the process.
+
+    If ``queue_size`` is set, lines from streams without a parser are put in
+    queues instead of being collected, and can be consumed with
+    :meth:`stdout_lines` and :meth:`stderr_lines`::
+
+      transport, protocol = await loop.subprocess_exec(
+          lambda: ProcessParserProtocol(queue_size=100), "command"
+      )
+      async for line in protocol.stdout_lines():
+          ...
+
+    Once the iterator for a stream is requested, reading from the stream is
+    paused when its queue holds ``queue_size`` items, and resumed once the
+    consumer drains it below that.  Since a single chunk of output can
+    contain multiple lines, the queue can temporarily exceed the size.
+    Lines from streams whose iterator is not requested are queued without
+    limit, so that the process is not blocked on them, and ``done`` can be
+    awaited after consuming only some of the streams.
+
+    If ``usage`` is true, the ``done`` result has a third element with a
+    :class:`ProcessUsage` for the process.  CPU and memory usage are only
+    reported if they can be attributed to the process, see
+    :class:`ProcessUsage`.
+
+    If an :class:`OutputLog` is passed as ``log``, lines from both streams
+    are recorded in it in the order they're received, along with the event
+    loop time.  Lines are still passed to parsers or queues, but full output
+    is not collected for streams without a parser.  Records that are not
+    text or binary, such as objects from a :class:`JSONLinesFramer`, are
+    logged as their :func:`repr`.
+
     :param out_parser: an optional parser for the process standard output.
     :param err_parser: an optional parser for the process standard error.
+    :param queue_size: the size of queues for streams without a parser.
+    :param usage: whether to collect resource usage for the process.
+    :param log: an optional :class:`OutputLog` to record lines from both
+        streams.
+    :param stream_kwargs: additional keyword arguments passed to the
+        :class:`StreamHelper` for both streams, such as ``encoding`` or
+        ``batch``.  If a ``framer`` is passed, each stream uses a copy of
+        it.
 
     """
 
-    done: Future
+    def __init__(
+        self,
+        out_parser=None,
+        err_parser=None,
+        queue_size: int | None = None,
+        usage: bool = False,
+        log: "OutputLog | None" = None,
+        **stream_kwargs,
+    ) -> None:
+        if queue_size is not None and queue_size < 1:
+            raise ValueError("Queue size must be at least 1")
 
-    def __init__(self, out_parser=None, err_parser=None):
-        self.done = get_event_loop().create_future()
-        self._streams = {
-            1: StreamHelper(callback=out_parser),
-            2: StreamHelper(callback=err_parser),
-        }
+        self._done: Future | None = None
+        self._queue_size = queue_size
+        self._queues: dict[int, Queue] = {}
+        self._queue_paused: set[int] = set()
+        self._queue_consumed: set[int] = set()
+        self._streams = {}
+        for fd, parser in ((1, out_parser), (2, err_parser)):
+            if parser is None and queue_size is not None:
+                self._queues[fd] = Queue()
+                parser = partial(self._enqueue, fd)
+            if log is not None:
+                parser = partial(self._log_line, log, fd, parser)
+            if "framer" in stream_kwargs:
+                # framers keep partial data, so streams can't share one
+                stream_kwargs["framer"] = deepcopy(stream_kwargs["framer"])
+            self._streams[fd] = StreamHelper(callback=parser, **stream_kwargs)
         self._data = [None, None]  # hold stdout/stderr data
         self._exception = None
         self._process_exited = False
+        self._transport: SubprocessTransport | None = None
+        self._usage = ProcessUsage() if usage else None
+        self._start_time = 0.0
+        self._start_rusage: resource.struct_rusage | None = None
+        # whether no other process ran at the same time, so that child
+        # processes resource usage can be attributed to this one
+        self._exclusive = True
+
+    @property
+    def done(self) -> Future:
+        """Future for the process result."""
+        if self._done is None:
+            self._done = get_running_loop().create_future()
+        return self._done
+
+    def connection_made(self, transport: BaseTransport) -> None:
+        self._transport = cast(SubprocessTransport, transport)
+        if _running_protocols:
+            self._exclusive = False
+            for protocol in _running_protocols:
+                protocol._exclusive = False
+        _running_protocols.add(self)
+        if self._usage:
+            self._start_time = get_running_loop().time()
+            self._start_rusage = _children_rusage()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        _running_protocols.discard(self)
+
+    def pause_reading(self, fd: int | None = None) -> None:
+        """Pause reading process output.
+
+        :param fd: the file descriptor to pause reading from. If not
+            specified, both stdout and stderr are paused.
+
+        """
+        for pipe in self._get_pipes(fd):
+            pipe.pause_reading()
+
+    def resume_reading(self, fd: int | None = None) -> None:
+        """Resume reading process output.
+
+        :param fd: the file descriptor to resume reading from. If not
+            specified, both stdout and stderr are resumed.
+
+        """
+        for pipe in self._get_pipes(fd):
+            pipe.resume_reading()
+
+    def stdout_lines(self) -> AsyncIterator:
+        """Return an async iterator of lines from the process stdout.
+
+        This requires ``queue_size`` to be set and no stdout parser.
+
+        """
+        return self._lines(1)
+
+    def stderr_lines(self) -> AsyncIterator:
+        """Return an async iterator of lines from the process stderr.
+
+        This requires ``queue_size`` to be set and no stderr parser.
+
+        """
+        return self._lines(2)
 
     def pipe_data_received(self, fd, data):
+        if self._usage:
+            self._usage.add_bytes(fd, len(data))
         stream = self._streams.get(fd)
         if stream:
-            stream.receive_data(data.decode())
+            stream.receive_data(data)
 
     def pipe_connection_lost(self, fd, exc):
         stream = self._streams.pop(fd, None)
@@ -50,24 +213,300 @@ class ProcessParserProtocol(SubprocessProtocol):
 
         stream.flush_partial()
         self._data[fd - 1] = stream.get_data()
+        queue = self._queues.get(fd)
+        if queue is not None:
+            queue.put_nowait(_QueueEnd(exc))
         if exc:
             self._exception = exc
         self._maybe_done()
 
     def process_exited(self):
         self._process_exited = True
+        _running_protocols.discard(self)
+        if self._usage and self._transport:
+            self._usage.returncode = self._transport.get_returncode()
+            self._usage.wall_time = (
+                get_running_loop().time() - self._start_time
+            )
+            end_rusage = _children_rusage()
+            if self._exclusive and self._start_rusage and end_rusage:
+                self._usage.set_rusage(self._start_rusage, end_rusage)
         self._maybe_done()
 
+    def _log_line(
+        self,
+        log: "OutputLog",
+        fd: int,
+        callback: Callable[[Any], None] | None,
+        line: Any,
+    ) -> None:
+        """Record a line, or a batch of lines, and pass it to the callback."""
+        time = get_running_loop().time()
+        for entry in line if isinstance(line, list) else (line,):
+            if not isinstance(entry, (str, bytes, bytearray, memoryview)):
+                entry = repr(entry)
+            log.add(fd, entry, time=time)
+        if callback:
+            callback(line)
+
+    def _enqueue(self, fd: int, item: Any) -> None:
+        """Put an item in a stream queue, pausing reading if it's full."""
+        queue = self._queues[fd]
+        queue.put_nowait(item)
+        if (
+            fd in self._queue_consumed
+            and fd not in self._queue_paused
+            and queue.qsize() >= cast(int, self._queue_size)
+        ):
+            self._queue_paused.add(fd)
+            self.pause_reading(fd)
+
+    def _lines(self, fd: int) -> AsyncIterator:
+        """Return an iterator for a stream queue, enabling backpressure."""
+        if fd not in self._queues:
+            raise RuntimeError("Stream is not queued")
+        self._queue_consumed.add(fd)
+        return self._iter_queue(fd)
+
+    async def _iter_queue(self, fd: int) -> AsyncIterator:
+        """Yield items from a stream queue, resuming reading as it drains."""
+        queue = self._queues[fd]
+        while True:
+            item = await queue.get()
+            if fd in self._queue_paused and queue.qsize() < cast(
+                int, self._queue_size
+            ):
+                self._queue_paused.discard(fd)
+                self.resume_reading(fd)
+            if isinstance(item, _QueueEnd):
+                # keep the marker so further iterations end too
+                queue.put_nowait(item)
+                if item.exception:
+                    raise item.exception
+                return
+            yield item
+
+    def _get_pipes(self, fd: int | None) -> list[Any]:
+        if self._transport is None:
+            return []
+        fds = (1, 2) if fd is None else (fd,)
+        pipes = (self._transport.get_pipe_transport(fd) for fd in fds)
+        return [pipe for pipe in pipes if pipe is not None]
+
     def _maybe_done(self):
         if not self._process_exited or self._streams:
             return
 
         if self._exception:
             self.done.set_exception(self._exception)
+        elif self._usage:
+            self.done.set_result((*self._data, self._usage))
         else:
             self.done.set_result(tuple(self._data))
 
 
+class ProcessUsage:
+    """Resource usage for a process.
+
+    CPU times and maximum resident set size are based on the resource usage
+    of terminated child processes, as reported by
+    :func:`resource.getrusage`, since child processes are waited for by the
+    event loop.  These can only be attributed to the process if no other
+    process was running at the same time, so they're :data:`None` if other
+    processes run by a :class:`ProcessParserProtocol` overlapped with it,
+    and on platforms where :mod:`resource` is not available.  Processes
+    started by other means are not accounted for.
+
+    The maximum resident set size is the largest among all terminated child
+    processes, so it's only reported if the process raised it.
+
+    """
+
+    def __init__(self) -> None:
+        #: The process exit code.
+        self.returncode: int | None = None
+        #: Time between the process start and exit, in seconds.
+        self.wall_time = 0.0
+        #: CPU time spent in user mode, in seconds.
+        self.user_time: float | None = None
+        #: CPU time spent in system mode, in seconds.
+        self.system_time: float | None = None
+        #: The maximum resident set size, as reported by the platform.  This
+        #: is in kilobytes on Linux, and bytes on macOS.
+        self.max_rss: int | None = None
+        #: Number of bytes the process wrote to stdout.
+        self.stdout_bytes = 0
+        #: Number of bytes the process wrote to stderr.
+        self.stderr_bytes = 0
+
+    def add_bytes(self, fd: int, size: int) -> None:
+        """Account for bytes written by the process to stdout or stderr."""
+        if fd == 1:
+            self.stdout_bytes += size
+        elif fd == 2:
+            self.stderr_bytes += size
+
+    def set_rusage(
+        self, start: "resource.struct_rusage", end: "resource.struct_rusage"
+    ) -> None:
+        """Set CPU and memory usage from child processes resource usage."""
+        self.user_time = end.ru_utime - start.ru_utime
+        self.system_time = end.ru_stime - start.ru_stime
+        if end.ru_maxrss > start.ru_maxrss:
+            self.max_rss = end.ru_maxrss
+
+    def __repr__(self) -> str:
+        return (
+            f"ProcessUsage(returncode={self.returncode!r}, "
+            f"wall_time={self.wall_time:.3f}, "
+            f"user_time={_format_seconds(self.user_time)}, "
+            f"system_time={_format_seconds(self.system_time)}, "
+            f"max_rss={self.max_rss!r}, "
+            f"stdout_bytes={self.stdout_bytes!r}, "
+            f"stderr_bytes={self.stderr_bytes!r})"
+        )
+
+
+def _format_seconds(value: float | None) -> str:
+    return "None" if value is None else f"{value:.3f}"
+
+
+def _children_rusage() -> "resource.struct_rusage | None":
+    """Return resource usage of terminated children, if supported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+# protocols for currently running processes
+_running_protocols: WeakSet[ProcessParserProtocol] = WeakSet()
+
+
+class OutputLog:
+    """A compact log of lines from process output streams.
+
+    Each entry has the event loop time, the stream file descriptor and the
+    line.  Lines are stored as bytes in a single buffer, and times,
+    descriptors and offsets in arrays, so that many entries use little
+    memory::
+
+      log = OutputLog()
+      transport, protocol = await loop.subprocess_exec(
+          lambda: ProcessParserProtocol(log=log), "command"
+      )
+      await protocol.done
+      for time, fd, line in log:
+          ...
+
+    :param encoding: the encoding for lines.  If :data:`None`, lines are
+        stored and returned as :class:`bytes`.
+
+    """
+
+    def __init__(self, encoding: str | None = "utf-8"):
+        self.encoding = encoding
+        self._times = array("d")
+        self._fds = array("B")
+        self._ends = array("Q")
+        self._data = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def __iter__(self) -> Iterator[tuple[float, int, str | bytes]]:
+        """Iterate over entries, as tuples of time, descriptor and line."""
+        for time, fd, line in self._entries():
+            yield time, fd, self._decode(line)
+
+    @property
+    def times(self) -> memoryview:
+        """A read-only view of entries times."""
+        return memoryview(self._times).toreadonly()
+
+    @property
+    def fds(self) -> memoryview:
+        """A read-only view of entries file descriptors."""
+        return memoryview(self._fds).toreadonly()
+
+    def add(self, fd: int, line: str | bytes, time: float | None = None):
+        """Add an entry to the log.
+
+        :param fd: the file descriptor of the stream.
+        :param line: the line.
+        :param time: the event loop time for the line.  If not specified,
+            the current time is used.
+
+        """
+        if isinstance(line, str):
+            line = line.encode(self.encoding or "utf-8")
+        elif not isinstance(line, (bytes, bytearray, memoryview)):
+            raise TypeError("Only text or binary lines can be logged")
+        if time is None:
+            time = get_running_loop().time()
+        self._data += line
+        self._times.append(time)
+        self._fds.append(fd)
+        self._ends.append(len(self._data))
+
+    def write(self, file: IO) -> None:
+        """Write entries to a file, one per line.
+
+        Each line contains the time, the file descriptor and the line,
+        separated by tabs.  The file must be binary if ``encoding`` is
+        :data:`None`.
+
+        """
+        encoding = self.encoding
+        if encoding is None:
+            file.writelines(
+                b"%.6f\t%d\t%b\n" % (time, fd, line)  # type: ignore[str-format]
+                for time, fd, line in self._entries()
+            )
+        else:
+            file.writelines(
+                f"{time:.6f}\t{fd}\t{str(line, encoding)}\n"
+                for time, fd, line in self._entries()
+            )
+
+    def _entries(self) -> Iterator[tuple[float, int, bytes]]:
+        """Yield entries with a copy of the line.
+
+        Lines are copied rather than viewed, so that entries can be added
+        while iterating.
+
+        """
+        start = 0
+        data = self._data
+        for time, fd, end in zip(self._times, self._fds, self._ends):
+            yield time, fd, bytes(data[start:end])
+            start = end
+
+    def _decode(self, data: bytes) -> str | bytes:
+        if self.encoding is None:
+            return data
+        return str(data, self.encoding)
+
+
+class _QueueEnd:
+    """Marker for the end of a stream queue."""
+
+    def __init__(self, exception: BaseException | None):
+        self.exception = exception
+
+
+class BufferRetention(StrEnum):
+    """Which part of data to keep when a :class:`StreamHelper` is full."""
+
+    #: Keep the beginning of the data.
+    HEAD = "head"
+    #: Keep the end of the data.
+    TAIL = "tail"
+    #: Keep the beginning and the end of the data, in equal parts.
+    BOTH = "both"
+
+
 class StreamHelper:
     """Helper to cache data until full lines of text are received.
 
@@ -82,61 +521,223 @@ class StreamHelper:
     would call ``callback`` twice, one with ``'line one'`` and one with
     ``'line two continues here'``
 
+    Data are handled as bytes internally, and lines are only decoded once
+    they're complete, so multi-byte characters split across chunks of data
+    are decoded correctly.  If ``encoding`` is :data:`None`, lines are passed
+    to the callback as :class:`bytes`.
+
+    Records other than lines can be parsed by passing a :class:`Framer`, such
+    as a :class:`JSONLinesFramer`, in which case ``separator`` is ignored.
+    Binary frames are decoded as lines, while other objects are passed to the
+    callback as they are.
+
+    If ``batch`` is true, the callback is called with a list of lines instead
+    of a single line, once for each chunk of received data.  If
+    ``batch_interval`` is set, lines are collected across chunks, and passed
+    to the callback at most after the interval from the first one.  In both
+    cases, lists are split if longer than ``batch_size``.
+
+    If no callback is passed, all data are kept in memory by default.  If
+    ``max_size`` is set, at most that many bytes are kept, based on
+    ``retention``, and :attr:`truncated` reports how many bytes were dropped.
+    Since truncated data can contain partial characters, they're decoded
+    replacing invalid characters, unless a different error handling scheme
+    than ``strict`` is specified.  If ``spool_size`` is set instead, data are
+    stored in a temporary file once they exceed the size, and
+    :meth:`get_data` returns the binary file object.
+
     :param callable callback: an optional function which is called with full
         lines of text from the stream.
-    :param str separator: the line separator
+    :param separator: the line separator, or a compiled regular expression
+        matching it, see :class:`RegexFramer`.
+    :param framer: an optional :class:`Framer` to split data into records.
+    :param encoding: the encoding of the stream data.
+    :param errors: the error handling scheme for decoding data.
+    :param batch: whether to pass lists of lines to the callback.
+    :param batch_size: the maximum number of lines in a batch.
+    :param batch_interval: the maximum time in seconds to collect lines for
+        a batch.
+    :param max_size: the maximum number of bytes to keep if no callback is
+        passed.
+    :param retention: the :class:`BufferRetention` for data when
+        ``max_size`` is set.
+    :param spool_size: the number of bytes after which data are stored in a
+        temporary file, if no callback is passed.
 
     """
 
     def __init__(
         self,
-        callback: Callable[[str], None] | None = None,
-        separator: str = "\n",
+        callback: Callable[[Any], None] | None = None,
+        separator: str | bytes | re.Pattern = "\n",
+        framer: Framer | None = None,
+        encoding: str | None = "utf-8",
+        errors: str = "strict",
+        batch: bool = False,
+        batch_size: int | None = None,
+        batch_interval: float | None = None,
+        max_size: int | None = None,
+        retention: BufferRetention | str = BufferRetention.TAIL,
+        spool_size: int | None = None,
     ):
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        if max_size is not None and spool_size is not None:
+            raise ValueError("Only one of max size and spool size can be set")
+
         self.separator = separator
+        self.encoding = encoding
+        self.errors = errors
         self._callback = callback
-        self._buffer = StringIO()
-        self._partial = StringIO()
+        if framer is None:
+            if isinstance(separator, re.Pattern):
+                framer = RegexFramer(
+                    separator, encoding=self.encoding or "utf-8"
+                )
+            else:
+                framer = SeparatorFramer(self._encode(separator))
+        self._framer = framer
+        self._buffer = bytearray()
+        self._batch = batch
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._lines: list[Any] = []
+        self._batch_handle: TimerHandle | None = None
+        self._max_size = max_size
+        self._head_size = 0
+        self._tail_size = 0
+        if max_size is not None:
+            match BufferRetention(retention):
+                case BufferRetention.HEAD:
+                    self._head_size = max_size
+                case BufferRetention.TAIL:
+                    self._tail_size = max_size
+                case BufferRetention.BOTH:
+                    self._head_size = max_size // 2
+                    self._tail_size = max_size - self._head_size
+        self._head = bytearray()
+        self._dropped = 0
+        self._file: IO[bytes] | None = None
+        if spool_size is not None:
+            self._file = cast(
+                IO[bytes], SpooledTemporaryFile(max_size=spool_size)
+            )
+
+    @property
+    def truncated(self) -> int:
+        """The number of bytes dropped because of ``max_size``."""
+        if self._max_size is None:
+            return 0
+        return self._dropped + max(len(self._buffer) - self._tail_size, 0)
 
-    def receive_data(self, data: str):
+    def receive_data(self, data: str | bytes):
         """Receive data and process them.
 
         If a ``callback`` has been passed to the class, it's called for each
         full line of text.
 
         """
+        if isinstance(data, str):
+            data = self._encode(data)
         if self._callback:
             self._parse_data(data)
+        elif self._file is not None:
+            self._file.write(data)
+        elif self._max_size is None:
+            self._buffer += data
         else:
-            self._buffer.write(data)
+            self._store_bounded(data)
 
-    def get_data(self) -> str | None:
+    def get_data(self) -> str | bytes | IO[bytes] | None:
         """Return the full content of the stream if no callback is defined."""
         if self._callback:
             return None
-        return self._buffer.getvalue() + self._partial.getvalue()
+        if self._file is not None:
+            self._file.seek(0)
+            return self._file
+        if self._max_size is None:
+            return self._decode(self._buffer)
+
+        data = self._head + self._buffer[len(self._buffer) - self._tail_size :]
+        if self.truncated and self.errors == "strict":
+            return self._decode(data, errors="replace")
+        return self._decode(data)
 
     def flush_partial(self):
-        """Flush and process pending data from a partial line."""
+        """Flush and process pending data from a partial line.
+
+        Pending lines for a batch are also passed to the callback.
+
+        """
         if not self._callback:
             return
-        partial = self._partial.getvalue()
-        if partial:
-            self._callback(partial)
+        for frame in self._framer.flush():
+            self._emit(frame)
+        if self._batch:
+            self._flush_batch()
 
-    def _parse_data(self, data: str):
+    def _parse_data(self, data: bytes):
         """Process data parsing full lines."""
-        lines = data.split(self.separator)
-        if len(lines) > 1:  # at least one full line
-            lines[0] = self._pop_partial() + lines[0]
-        # might be empty if data ended with separator
-        self._partial.write(lines.pop())
-        # call the callback on full lines
-        for line in lines:
+        for frame in self._framer.feed(data):
+            self._emit(frame)
+
+        if self._lines:
+            if self._batch_interval is None:
+                self._flush_batch()
+            elif self._batch_handle is None:
+                self._batch_handle = get_running_loop().call_later(
+                    self._batch_interval, self._flush_batch
+                )
+
+    def _emit(self, line: Any):
+        """Call the callback with a line, or add it to the batch."""
+        if isinstance(line, (bytes, bytearray, memoryview)):
+            line = self._decode(line)
+        if not self._batch:
             cast(Callable, self._callback)(line)
+            return
+
+        self._lines.append(line)
+        if len(self._lines) == self._batch_size:
+            self._flush_batch()
 
-    def _pop_partial(self):
-        """Return the current partial line and reset it."""
-        line = self._partial.getvalue()
-        self._partial.truncate(0)
-        return line
+    def _flush_batch(self):
+        """Call the callback with pending lines."""
+        if self._batch_handle is not None:
+            self._batch_handle.cancel()
+            self._batch_handle = None
+        if self._lines:
+            lines, self._lines = self._lines, []
+            cast(Callable, self._callback)(lines)
+
+    def _store_bounded(self, data: bytes):
+        """Store data, keeping at most max_size bytes."""
+        if len(self._head) < self._head_size:
+            size = self._head_size - len(self._head)
+            self._head += data[:size]
+            data = data[size:]
+        if not self._tail_size:
+            self._dropped += len(data)
+            return
+
+        self._buffer += data
+        # drop data only when the buffer is twice the size, to avoid moving
+        # memory for every chunk
+        if len(self._buffer) > 2 * self._tail_size:
+            excess = len(self._buffer) - self._tail_size
+            del self._buffer[:excess]
+            self._dropped += excess
+
+    def _encode(self, data: str | bytes) -> bytes:
+        if isinstance(data, str):
+            return data.encode(self.encoding or "utf-8")
+        return data
+
+    def _decode(
+        self,
+        data: bytes | bytearray | memoryview,
+        errors: str | None = None,
+    ) -> str | bytes:
+        if self.encoding is None:
+            return bytes(data)
+        return str(data, self.encoding, errors or self.errors)
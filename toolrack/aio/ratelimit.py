@@ -0,0 +1,214 @@
+"""Rate limiters based on the event loop clock.
+
+The :class:`TokenBucket` allows bursts up to its capacity, while the
+:class:`LeakyBucket` spaces out operations at a constant rate::
+
+  bucket = TokenBucket(rate=100, capacity=200)
+
+  async def send(items):
+      await bucket.acquire(len(items))
+      ...
+
+Both use the event loop clock, and wait using :func:`asyncio.sleep`, so they
+work with the ``advance_time`` fixture in tests.  Each limiter is bound to
+the running event loop on first use.
+
+"""
+
+from asyncio import (
+    AbstractEventLoop,
+    CancelledError,
+    Lock,
+    get_running_loop,
+    sleep,
+)
+
+
+class TokenBucket:
+    """A token bucket rate limiter.
+
+    Tokens are added at a constant rate, up to the bucket capacity. The
+    bucket is initially full.
+
+    Waiting callers are served in order.
+
+    :param rate: the number of tokens added per second.
+    :param capacity: the maximum number of tokens in the bucket.  It defaults
+      to ``rate``, or 1 if lower.
+
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        if capacity is None:
+            capacity = max(rate, 1)
+        elif capacity <= 0:
+            raise ValueError("Capacity must be positive")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._loop: AbstractEventLoop | None = None
+        self._last = 0.0
+        self._lock = Lock()
+
+    @property
+    def tokens(self) -> float:
+        """The number of currently available tokens."""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, n: float = 1) -> bool:
+        """Acquire tokens if available, without waiting.
+
+        :param n: the number of tokens to acquire.
+        :return: whether tokens were acquired.
+
+        """
+        self._check_amount(n)
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self._tokens < n:
+            return False
+        self._tokens -= n
+        return True
+
+    async def acquire(self, n: float = 1) -> None:
+        """Acquire tokens, waiting until they're available.
+
+        :param n: the number of tokens to acquire.
+
+        """
+        if self.try_acquire(n):
+            return
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                await sleep((n - self._tokens) / self.rate)
+
+    def _check_amount(self, n: float) -> None:
+        if not 0 < n <= self.capacity:
+            raise ValueError("Amount must be positive and within capacity")
+
+    def _refill(self) -> None:
+        if self._loop is None:
+            self._loop = get_running_loop()
+            self._last = self._loop.time()
+            return
+
+        now = self._loop.time()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last) * self.rate
+        )
+        self._last = now
+
+
+class LeakyBucket:
+    """A leaky bucket rate limiter.
+
+    Operations are spaced out at a constant rate, with no bursts. Each
+    acquired unit is scheduled right after the previous ones, so callers are
+    served in order.
+
+    :param rate: the number of units allowed per second.
+    :param capacity: the maximum number of units that can be waiting.  If
+      not specified, there is no limit.
+
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        if capacity is not None and capacity <= 0:
+            raise ValueError("Capacity must be positive")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._loop: AbstractEventLoop | None = None
+        self._next_free = 0.0
+        # start of released reservations, by their end
+        self._released: dict[float, float] = {}
+
+    @property
+    def level(self) -> float:
+        """The number of units currently waiting to leak out."""
+        now = self._get_loop().time()
+        return max(self._next_free - now, 0.0) * self.rate
+
+    def try_acquire(self, n: float = 1) -> bool:
+        """Acquire units if they can leak immediately, without waiting.
+
+        Units are not acquired if that would exceed the capacity.
+
+        :param n: the number of units to acquire.
+        :return: whether units were acquired.
+
+        """
+        self._check_amount(n)
+        now = self._get_loop().time()
+        if self._next_free > now:
+            return False
+        if self.capacity is not None and n > self.capacity:
+            return False
+        self._released.clear()
+        self._next_free = now + n / self.rate
+        return True
+
+    async def acquire(self, n: float = 1) -> None:
+        """Acquire units, waiting until they can leak.
+
+        If the call is cancelled while waiting, the reserved time is
+        released, as soon as no caller after it is waiting.
+
+        :param n: the number of units to acquire.
+        :raises OverflowError: if the bucket capacity would be exceeded.
+
+        """
+        self._check_amount(n)
+        now = self._get_loop().time()
+        start = max(self._next_free, now)
+        if (
+            self.capacity is not None
+            and (start - now) * self.rate + n > self.capacity
+        ):
+            raise OverflowError("Bucket capacity exceeded")
+        if start == now:
+            # all previous reservations are past
+            self._released.clear()
+        self._next_free = start + n / self.rate
+        if start > now:
+            try:
+                await sleep(start - now)
+            except CancelledError:
+                self._release(start, start + n / self.rate)
+                raise
+
+    def _check_amount(self, n: float) -> None:
+        if n <= 0:
+            raise ValueError("Amount must be positive")
+
+    def _release(self, start: float, end: float) -> None:
+        """Release time reserved by a cancelled caller.
+
+        Time can only be given back if no later caller reserved time after
+        it, otherwise it would overlap.  Reservations released before the
+        last one are kept, so they're given back along with it.
+
+        """
+        if self._next_free != end:
+            self._released[end] = start
+            return
+        while start in self._released:
+            start = self._released.pop(start)
+        self._next_free = max(start, self._get_loop().time())
+
+    def _get_loop(self) -> AbstractEventLoop:
+        if self._loop is None:
+            self._loop = get_running_loop()
+        return self._loop
@@ -0,0 +1,170 @@
+"""Persistent state for periodic calls schedules.
+
+A :class:`ScheduleState` stores the last and next call times for named
+:class:`PeriodicCall` instances, so that schedules can be resumed after the
+process is restarted::
+
+  state = SQLiteScheduleState("schedule.db")
+  PeriodicCall(func).start(3600, state=state, name="cleanup")
+
+Times are stored as wall clock timestamps, since event loop times are not
+preserved across restarts.
+
+When an event loop is running, changes are kept in memory and written in a
+single batch after ``flush_delay`` seconds, so that many calls updating
+their state don't each write to storage.  :func:`ScheduleState.flush` can be
+called to write pending changes right away, for instance before exiting.
+
+"""
+
+from asyncio import (
+    TimerHandle,
+    get_running_loop,
+)
+import json
+import os
+from pathlib import Path
+import sqlite3
+from tempfile import NamedTemporaryFile
+from typing import cast
+
+ScheduleEntry = tuple[float | None, float]
+
+
+class ScheduleState:
+    """Base class for schedule state backends.
+
+    Subclasses must implement :func:`_load` and :func:`_store`.
+
+    :param flush_delay: how long to wait before writing changes, in seconds.
+
+    """
+
+    def __init__(self, flush_delay: float = 1.0):
+        self.flush_delay = flush_delay
+        self._pending: dict[str, ScheduleEntry] = {}
+        self._flush_handle: TimerHandle | None = None
+
+    def get(self, name: str) -> ScheduleEntry | None:
+        """Return a tuple with the last and next call times for a name.
+
+        The last time is :data:`None` if no call was made yet.
+        :data:`None` is returned if there is no state for the name.
+
+        """
+        entry = self._pending.get(name)
+        if entry is not None:
+            return entry
+        return self._load(name)
+
+    def set(self, name: str, last: float | None, next: float) -> None:
+        """Store the last and next call times for a name.
+
+        If an event loop is running, the change is written after
+        ``flush_delay``, otherwise it's written immediately.
+
+        """
+        self._pending[name] = (last, next)
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            self.flush()
+        else:
+            self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self) -> None:
+        """Write pending changes."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            self._store(pending)
+
+    def _load(self, name: str) -> ScheduleEntry | None:
+        """Return stored times for a name, or :data:`None`."""
+        raise NotImplementedError()
+
+    def _store(self, entries: dict[str, ScheduleEntry]) -> None:
+        """Write times for multiple names."""
+        raise NotImplementedError()
+
+
+class FileScheduleState(ScheduleState):
+    """Store schedule state in a JSON file.
+
+    The whole file is rewritten atomically on each flush.
+
+    :param path: the path of the file.
+    :param flush_delay: how long to wait before writing changes, in seconds.
+
+    """
+
+    def __init__(self, path: str | Path, flush_delay: float = 1.0):
+        super().__init__(flush_delay=flush_delay)
+        self.path = Path(path)
+        self._entries: dict[str, list[float | None]] = {}
+        if self.path.exists():
+            self._entries = json.loads(self.path.read_text())
+
+    def _load(self, name: str) -> ScheduleEntry | None:
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        last, next = entry
+        return last, cast(float, next)
+
+    def _store(self, entries: dict[str, ScheduleEntry]) -> None:
+        self._entries.update(
+            (name, [last, next]) for name, (last, next) in entries.items()
+        )
+        with NamedTemporaryFile(
+            "w", dir=self.path.parent, prefix=self.path.name, delete=False
+        ) as fd:
+            json.dump(self._entries, fd)
+        os.replace(fd.name, self.path)
+
+
+class SQLiteScheduleState(ScheduleState):
+    """Store schedule state in a SQLite database.
+
+    Pending changes are written in a single transaction.
+
+    :param path: the path of the database file.
+    :param flush_delay: how long to wait before writing changes, in seconds.
+
+    """
+
+    def __init__(self, path: str | Path, flush_delay: float = 1.0):
+        super().__init__(flush_delay=flush_delay)
+        self.path = Path(path)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS schedule "
+            "(name TEXT PRIMARY KEY, last REAL, next REAL NOT NULL)"
+        )
+
+    def _load(self, name: str) -> ScheduleEntry | None:
+        row = self._db.execute(
+            "SELECT last, next FROM schedule WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        last, next = row
+        return last, next
+
+    def _store(self, entries: dict[str, ScheduleEntry]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO schedule (name, last, next) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET last = excluded.last, "
+                "next = excluded.next",
+                [(name, last, next) for name, (last, next) in entries.items()],
+            )
+
+    def close(self) -> None:
+        """Write pending changes and close the database."""
+        self.flush()
+        self._db.close()
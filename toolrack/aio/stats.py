@@ -0,0 +1,81 @@
+"""Statistics collection for timed calls.
+
+A :class:`CallStats` can be passed to :class:`TimedCall` and
+:class:`PeriodicCall` instances to collect counters and histograms about
+calls.  The same instance can be shared among multiple calls to collect
+aggregated statistics::
+
+  stats = CallStats()
+  for target in targets:
+      PeriodicCall(check, target, stats=stats).start(60)
+
+"""
+
+from bisect import bisect_left
+from collections.abc import Sequence
+
+#: Default histogram bucket bounds, in seconds.
+DEFAULT_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Histogram:
+    """Collect values into buckets with fixed upper bounds.
+
+    Values greater than the last bound are counted in an extra bucket.
+
+    :param bounds: upper bounds for buckets, inclusive.
+
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Add a value to the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        """The mean of values in the histogram."""
+        return self.sum / self.count if self.count else 0.0
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """Return a list of tuples with bucket upper bound and count."""
+        return list(zip((*self.bounds, float("inf")), self.counts))
+
+
+class CallStats:
+    """Statistics for timed calls.
+
+    :param bounds: upper bounds for the ``lag`` and ``duration`` histograms
+      buckets.
+
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        #: Number of timed calls currently started.
+        self.active = 0
+        #: Number of function calls currently running.
+        self.running = 0
+        #: Number of times the function was due.
+        self.calls = 0
+        #: Number of times the function was due while still running.
+        self.overlaps = 0
+        #: Number of missed calls, see :class:`CatchUpPolicy`.
+        self.missed = 0
+        #: Number of calls that raised an exception.
+        self.errors = 0
+        #: The last exception raised by a call.
+        self.last_error: BaseException | None = None
+        #: Histogram of how late calls were, in seconds.
+        self.lag = Histogram(bounds)
+        #: Histogram of how long calls took, in seconds.
+        self.duration = Histogram(bounds)
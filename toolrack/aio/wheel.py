@@ -0,0 +1,268 @@
+"""Hierarchical timing wheel for scheduling many timed callbacks.
+
+The :class:`TimerWheel` keeps a single event loop timer for all the callbacks
+scheduled through it, and runs callbacks that are due in the same tick as a
+batch.  Scheduling and cancelling a callback are O(1) operations, regardless
+of the number of pending callbacks.
+
+This is useful when running a large number of :class:`TimedCall` or
+:class:`PeriodicCall` instances in the same process::
+
+  wheel = TimerWheel(resolution=0.5)
+  for target in targets:
+      PeriodicCall(check, target, scheduler=wheel).start(60)
+
+"""
+
+from asyncio import (
+    AbstractEventLoop,
+    TimerHandle,
+    get_running_loop,
+)
+from collections.abc import Callable
+from math import (
+    ceil,
+    floor,
+)
+from typing import Any
+
+
+class WheelHandle:
+    """Handle for a callback scheduled in a :class:`TimerWheel`."""
+
+    __slots__ = (
+        "_args",
+        "_callback",
+        "_cancelled",
+        "_tick",
+        "_wheel",
+        "_when",
+    )
+
+    def __init__(
+        self,
+        wheel: "TimerWheel",
+        when: float,
+        tick: int,
+        callback: Callable[..., Any],
+        args: tuple[Any, ...],
+    ):
+        self._wheel: TimerWheel | None = wheel
+        self._when = when
+        self._tick = tick
+        self._callback = callback
+        self._args = args
+        self._cancelled = False
+
+    def when(self) -> float:
+        """Return the scheduled time for the callback."""
+        return self._when
+
+    def cancelled(self) -> bool:
+        """Whether the callback has been cancelled."""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Cancel the callback.
+
+        Calling this on a handle that has already run or has been cancelled
+        has no effect.
+
+        """
+        if self._wheel is None:
+            return
+        self._cancelled = True
+        wheel, self._wheel = self._wheel, None
+        wheel._discard()
+
+
+class TimerWheel:
+    """A hierarchical timing wheel.
+
+    Time is split in ticks of ``resolution`` seconds.  Each level of the
+    wheel has ``2 ** slot_bits`` slots, with each slot spanning all the slots
+    of the level below it, so that the wheel covers ``resolution * 2 **
+    (slot_bits * levels)`` seconds.  Callbacks scheduled farther in the future
+    are kept aside until the wheel completes a full turn.
+
+    Callbacks are run at the first tick at or after their scheduled time, so
+    they can be up to ``resolution`` seconds late.
+
+    The wheel is bound to the running event loop the first time a callback is
+    scheduled.
+
+    :param resolution: the duration of a tick, in seconds.
+    :param slot_bits: the number of bits for the slots count of each level.
+    :param levels: the number of levels of the wheel.
+
+    """
+
+    def __init__(
+        self, resolution: float = 0.1, slot_bits: int = 6, levels: int = 4
+    ):
+        if resolution <= 0:
+            raise ValueError("Resolution must be positive")
+        if slot_bits < 1 or levels < 1:
+            raise ValueError("Slot bits and levels must be at least 1")
+
+        self.resolution = resolution
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels: list[list[list[WheelHandle]]] = [
+            [[] for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._overflow: list[WheelHandle] = []
+        self._loop: AbstractEventLoop | None = None
+        self._origin = 0.0
+        self._tick = 0  # last processed tick
+        self._count = 0  # live callbacks
+        self._dead = 0  # cancelled callbacks still in slots
+        self._timer: TimerHandle | None = None
+        self._processing = False
+
+    def __len__(self) -> int:
+        """Return the number of pending callbacks."""
+        return self._count
+
+    def time(self) -> float:
+        """Return the current time, according to the wheel event loop."""
+        return self._get_loop().time()
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> WheelHandle:
+        """Schedule a callback to be called after ``delay`` seconds."""
+        return self.call_at(self.time() + delay, callback, *args)
+
+    def call_at(
+        self, when: float, callback: Callable[..., Any], *args: Any
+    ) -> WheelHandle:
+        """Schedule a callback to be called at the specified loop time."""
+        loop = self._get_loop()
+        if not self._count:
+            self._realign(loop.time())
+
+        tick = max(
+            ceil((when - self._origin) / self.resolution), self._tick + 1
+        )
+        handle = WheelHandle(self, when, tick, callback, args)
+        self._insert(handle)
+        self._count += 1
+        if self._timer is None and not self._processing:
+            self._schedule_tick()
+        return handle
+
+    def _get_loop(self) -> AbstractEventLoop:
+        if self._loop is None:
+            self._loop = get_running_loop()
+            self._origin = self._loop.time()
+        return self._loop
+
+    def _realign(self, now: float) -> None:
+        """Move the wheel to the current time, when it has no callbacks."""
+        if self._dead:
+            # all handles left in slots are cancelled, but some might not be
+            # in slots if this is called while a tick is being processed
+            for slots in self._levels:
+                for slot in slots:
+                    self._dead -= len(slot)
+                    slot.clear()
+            self._dead -= len(self._overflow)
+            self._overflow.clear()
+        self._tick = max(
+            self._tick, floor((now - self._origin) / self.resolution)
+        )
+
+    def _insert(self, handle: WheelHandle) -> None:
+        tick = handle._tick
+        current = self._tick
+        for level, slots in enumerate(self._levels):
+            shift = self._bits * level
+            if tick >> (shift + self._bits) == current >> (shift + self._bits):
+                slots[(tick >> shift) & self._mask].append(handle)
+                return
+        self._overflow.append(handle)
+
+    def _discard(self) -> None:
+        self._count -= 1
+        self._dead += 1
+        if not self._count and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_tick(self) -> None:
+        loop = self._get_loop()
+        self._timer = loop.call_at(
+            self._origin + (self._tick + 1) * self.resolution, self._on_tick
+        )
+
+    def _on_tick(self) -> None:
+        self._timer = None
+        loop = self._get_loop()
+        # the timer is always set for the next tick, so at least that one is
+        # due, regardless of rounding
+        target = max(
+            floor((loop.time() - self._origin) / self.resolution),
+            self._tick + 1,
+        )
+        self._processing = True
+        try:
+            while self._count and self._tick < target:
+                self._tick += 1
+                self._process_tick()
+        finally:
+            self._processing = False
+        if self._count:
+            self._schedule_tick()
+
+    def _process_tick(self) -> None:
+        current = self._tick
+        levels = len(self._levels)
+        if self._overflow and not current & ((1 << (self._bits * levels)) - 1):
+            overflow, self._overflow = self._overflow, []
+            self._reinsert(overflow)
+        # cascade callbacks from higher levels, starting from the top one so
+        # that callbacks can move down more than one level in the same tick
+        for level in range(levels - 1, 0, -1):
+            shift = self._bits * level
+            if current & ((1 << shift) - 1):
+                continue
+            slots = self._levels[level]
+            index = (current >> shift) & self._mask
+            if slots[index]:
+                entries, slots[index] = slots[index], []
+                self._reinsert(entries)
+
+        slots = self._levels[0]
+        index = current & self._mask
+        if not slots[index]:
+            return
+        due, slots[index] = slots[index], []
+        for handle in due:
+            if handle._wheel is None:
+                self._dead -= 1
+                continue
+            handle._wheel = None
+            self._count -= 1
+            self._run(handle)
+
+    def _reinsert(self, handles: list[WheelHandle]) -> None:
+        for handle in handles:
+            if handle._wheel is None:
+                self._dead -= 1
+            else:
+                self._insert(handle)
+
+    def _run(self, handle: WheelHandle) -> None:
+        try:
+            handle._callback(*handle._args)
+        except Exception as e:
+            self._get_loop().call_exception_handler(
+                {
+                    "message": (
+                        f"Exception in wheel callback {handle._callback!r}"
+                    ),
+                    "exception": e,
+                    "handle": handle,
+                }
+            )
@@ -14,12 +14,101 @@ As an example::
 
 returns ``{'option1': 4, 'option2': True}``.
 
+Besides basic types, keys can be durations (such as ``'1h30m'``, converted
+to seconds) and byte sizes (such as ``'512MiB'``, converted to bytes).  An
+:class:`~enum.Enum` subclass can be used as type to convert values to enum
+members, and a :class:`Config` to parse nested configurations::
+
+  Config(
+      ConfigKey('timeout', 'duration', default=30.0),
+      ConfigKey('mode', Mode),
+      ConfigKey('database', Config(ConfigKey('host', 'str'))))
+
+Many configurations can be parsed at once with :meth:`Config.parse_many`, or
+:meth:`Config.parse_columns` for column-oriented data.  These convert all
+values for a key together, and collect errors for each record instead of
+failing on the first one.
+
+Configurations can also be read from layered sources with
+:meth:`Config.layered`, which returns a :class:`LayeredConfig` that looks up
+and converts each key only when it's accessed::
+
+  layered = config.layered(EnvironSource(prefix='APP_'), file_options)
+  layered['option1']
+
+Configuration files in JSON, TOML, INI and dotenv formats can be parsed with
+:meth:`Config.parse_file`.  A :class:`ConfigFileCache` can be used to avoid
+parsing files again if they haven't changed::
+
+  cache = ConfigFileCache('~/.cache/myapp')
+  config.parse_file('config.toml', cache=cache)
+
+A :class:`ConfigWatcher` reloads a configuration file when it changes, and
+notifies subscribers about changed keys.
+
+Converters and validators for keys are resolved once, when the
+configuration is first parsed, so that parsing many configuration dicts with
+the same :class:`Config` is fast.  Keys should not be modified after that.
+
 """
 
-from collections.abc import Callable
-from functools import partial
+from collections import ChainMap
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from configparser import ConfigParser
+from enum import Enum
+from functools import (
+    lru_cache,
+    partial,
+)
+import hashlib
+import json
 from operator import attrgetter
-from typing import Any
+import os
+from pathlib import Path
+import pickle
+import re
+from tempfile import NamedTemporaryFile
+import tomllib
+from typing import (
+    Any,
+    cast,
+)
+
+from .convert import convert_bbyte
+
+# marker for keys not present in a configuration
+_MISSING = object()
+
+# name, whether it's required, default value and parse function for a key
+ParsePlanStep = tuple[str, bool, Any, Callable[[Any], Any]]
+
+# changed keys, with old and new values
+ConfigChanges = dict[str, tuple[Any, Any]]
+
+# seconds for each duration unit
+_DURATION_UNITS = {
+    "us": 1e-6,
+    "ms": 1e-3,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+_NUMBER = r"(\d+(?:\.\d*)?|\.\d+)"
+_DURATION_PART = re.compile(rf"{_NUMBER}\s*(us|ms|s|m|h|d|w)\s*")
+_DURATION = re.compile(rf"\s*(?:{_DURATION_PART.pattern})+")
+_SECONDS = re.compile(rf"\s*{_NUMBER}\s*")
+_BYTE_SIZE = re.compile(
+    rf"\s*{_NUMBER}\s*([kmgtpezy]ib|b)?\s*", flags=re.IGNORECASE
+)
 
 
 class MissingConfigKey(Exception):
@@ -34,19 +123,93 @@ class InvalidConfigValue(Exception):
         self.key = key
 
 
+class ParseResults:
+    """Results from parsing multiple configurations.
+
+    :param values: the parsed values.
+    :param errors: a dict mapping indexes of invalid records to the list of
+      their errors.
+
+    """
+
+    def __init__(
+        self,
+        values: Any,
+        errors: dict[int, list[MissingConfigKey | InvalidConfigValue]],
+    ):
+        #: Parsed values.  For invalid records, :data:`None` is returned in
+        #: place of the record or of its values.
+        self.values = values
+        #: Errors for invalid records, by record index.
+        self.errors = errors
+
+
+@lru_cache(maxsize=1024)
+def _parse_duration(value: str) -> float:
+    """Parse a duration string, returning seconds."""
+    if _SECONDS.fullmatch(value):
+        return float(value)
+    if not _DURATION.fullmatch(value):
+        raise ValueError(f"Invalid duration: {value!r}")
+    return sum(
+        float(number) * _DURATION_UNITS[unit]
+        for number, unit in _DURATION_PART.findall(value)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _parse_byte_size(value: str) -> int:
+    """Parse a byte size string, returning bytes."""
+    match = _BYTE_SIZE.fullmatch(value)
+    if not match:
+        raise ValueError(f"Invalid byte size: {value!r}")
+    number, suffix = match.groups()
+    if suffix and suffix.lower() == "b":
+        suffix = None
+    return int(float(number) * convert_bbyte(1, suffix=suffix))
+
+
 class ConfigKeyTypes:
-    """Collection of type converters for ConfigKeys."""
+    """Collection of type converters for ConfigKeys.
+
+    Besides type names, :class:`~enum.Enum` subclasses and :class:`Config`
+    instances can be used as types, to convert values to enum members and
+    to parse nested configurations.
+
+    """
 
     # Base types
     _type_int = int
     _type_float = float
     _type_str = str
 
-    def get_converter(self, _type: str) -> Callable[[Any], Any]:
-        """Return the converter method for the specified type."""
+    def __init__(self) -> None:
+        self._converters: dict[str, Callable[[Any], Any]] = {}
+
+    def get_converter(
+        self, _type: "str | type[Enum] | Config"
+    ) -> Callable[[Any], Any]:
+        """Return the converter method for the specified type.
+
+        Converters for type names are cached, so they're only resolved once
+        per type.  Converters for enums and nested configurations are not,
+        so that the cache, which is shared by all keys, doesn't keep them
+        alive.
+
+        """
+        if isinstance(_type, Config):
+            return partial(self._type_config, _type)
+        if isinstance(_type, type) and issubclass(_type, Enum):
+            return partial(self._type_enum, _type)
+        if not isinstance(_type, str):
+            raise TypeError(_type)
+
+        converter = self._converters.get(_type)
+        if converter is not None:
+            return converter
+
         if _type.endswith("[]"):
-            _type = _type.strip("[]")
-            elem_converter = self.get_converter(_type)
+            elem_converter = self.get_converter(_type.strip("[]"))
             converter = partial(self._type_list, elem_converter)
         else:
             try:
@@ -54,6 +217,7 @@ class ConfigKeyTypes:
             except AttributeError:
                 raise TypeError(_type)
 
+        self._converters[_type] = converter
         return converter
 
     def _type_bool(self, value: Any) -> bool:
@@ -73,14 +237,58 @@ class ConfigKeyTypes:
             value = value.split()
         return [converter(item) for item in value]
 
+    def _type_duration(self, value: Any) -> float:
+        """Convert to a duration in seconds.
+
+        Strings are a sequence of numbers with a unit among 'us', 'ms', 's',
+        'm', 'h', 'd' and 'w', such as '1h30m'.  Numbers, and strings with
+        just a number, are seconds.
+        """
+        if isinstance(value, str):
+            return _parse_duration(value)
+        return float(value)
+
+    def _type_bytesize(self, value: Any) -> int:
+        """Convert to a size in bytes.
+
+        Strings are a number with an optional binary suffix (such as 'KiB',
+        'MiB' or 'GiB') or 'B', case insensitive.  Numbers are bytes.
+        """
+        if isinstance(value, str):
+            return _parse_byte_size(value)
+        return int(value)
+
+    def _type_enum(self, enum: type[Enum], value: Any) -> Enum:
+        """Convert to an enum member, by value or by name."""
+        try:
+            return enum(value)
+        except ValueError:
+            pass
+        try:
+            return enum[value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid value for {enum.__name__}: {value!r}")
+
+    def _type_config(self, config: "Config", value: Any) -> dict[str, Any]:
+        """Parse a nested configuration."""
+        if value is not None and not isinstance(value, Mapping):
+            raise ValueError("Nested configuration must be a mapping")
+        try:
+            return config.parse(cast(dict[str, Any] | None, value))
+        except (MissingConfigKey, InvalidConfigValue) as error:
+            raise ValueError(str(error))
+
 
 class ConfigKey:
     """A key in the Configuration."""
 
+    # type converters, shared among keys
+    _config_types = ConfigKeyTypes()
+
     def __init__(
         self,
         name: str,
-        _type: str,
+        _type: "str | type[Enum] | Config",
         description: str = "",
         required: bool = False,
         default: Any | None = None,
@@ -92,17 +300,63 @@ class ConfigKey:
         self.required = required
         self.default = default
         self.validator = validator
-        self.description
-        self._config_types = ConfigKeyTypes()
+        self._parser: Callable[[Any], Any] | None = None
 
     def parse(self, value: Any) -> Any:
         """Convert and validate a value."""
-        try:
-            value = self._convert(value)
-            self._validate(value)
-        except ValueError:
-            raise InvalidConfigValue(self.name)
-        return value
+        parser = self._parser or self._compile_parser()
+        return parser(value)
+
+    def compile(self) -> Callable[[Any], Any]:
+        """Return a function to convert and validate values for the key.
+
+        The converter and validators are resolved once, and the function
+        raises :class:`InvalidConfigValue` if a value is invalid, that is if
+        converting or validating it raises :class:`ValueError` or
+        :class:`TypeError` (such as for :data:`None` values of numeric
+        types).  It's computed automatically on the first :meth:`parse`
+        call.
+
+        If a subclass overrides :meth:`parse`, that's returned instead, so
+        that it's used when parsing configurations.
+
+        """
+        if type(self).parse is not ConfigKey.parse:
+            return self.parse
+        return self._compile_parser()
+
+    def _compile_parser(self) -> Callable[[Any], Any]:
+        """Build and cache the function used by :meth:`parse`."""
+        name = self.name
+        converter = self._config_types.get_converter(self.type)
+        validators: list[Callable[[Any], None]] = []
+        if type(self).validate is not ConfigKey.validate:
+            validators.append(self.validate)
+        if self.validator is not None:
+            validators.append(self.validator)
+
+        if not validators:
+
+            def parse(value: Any) -> Any:
+                try:
+                    return converter(value)
+                except (TypeError, ValueError):
+                    raise InvalidConfigValue(name)
+
+            self._parser = parse
+            return parse
+
+        def parse_and_validate(value: Any) -> Any:
+            try:
+                value = converter(value)
+                for validator in validators:
+                    validator(value)
+            except (TypeError, ValueError):
+                raise InvalidConfigValue(name)
+            return value
+
+        self._parser = parse_and_validate
+        return parse_and_validate
 
     def validate(self, value: Any) -> None:
         """Validate a value based for the key.
@@ -111,17 +365,6 @@ class ConfigKey:
         value is invalid.
         """
 
-    def _validate(self, value: Any) -> None:
-        """Call the type validator."""
-        self.validate(value)
-        if self.validator is not None:
-            self.validator(value)
-
-    def _convert(self, value: Any) -> Any:
-        """Convert the value to the proper type."""
-        converter = self._config_types.get_converter(self.type)
-        return converter(value)
-
 
 class Config:
     """Parse a configuration dictionary.
@@ -131,6 +374,7 @@ class Config:
 
     def __init__(self, *keys: ConfigKey):
         self._config_keys = {key.name: key for key in keys}
+        self._plan: list[ParsePlanStep] | None = None
 
     def keys(self) -> list[ConfigKey]:
         """Return ConfigKeys sorted by name alphabetically."""
@@ -142,6 +386,30 @@ class Config:
         all_keys.update((key.name, key) for key in keys)
         return Config(*all_keys.values())
 
+    def layered(self, *sources: Mapping[str, Any]) -> "LayeredConfig":
+        """Return a :class:`LayeredConfig` reading from the sources.
+
+        Sources are looked up in order, so earlier ones take precedence.
+        """
+        return LayeredConfig(ChainMap(self._config_keys), sources)
+
+    def parse_file(
+        self,
+        path: str | Path,
+        loader: Callable[[bytes], dict[str, Any]] | None = None,
+        cache: "ConfigFileCache | None" = None,
+        loader_key: str | None = None,
+    ) -> dict[str, Any]:
+        """Parse a configuration file.
+
+        See :func:`load_config_file` for details on parameters.
+        """
+        return self.parse(
+            load_config_file(
+                path, loader=loader, cache=cache, loader_key=loader_key
+            )
+        )
+
     def parse(self, config: dict[str, Any] | None) -> dict[str, Any]:
         """Parse the provided configuration dict.
 
@@ -153,14 +421,553 @@ class Config:
             config = {}
 
         parsed_config = {}
-        for name, config_key in self._config_keys.items():
-            if config_key.required and name not in config:
-                raise MissingConfigKey(name)
-
-            if name in config:
-                value = config_key.parse(config[name])
+        for name, required, default, parse in self._get_plan():
+            value = config.get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    raise MissingConfigKey(name)
+                parsed_config[name] = default
             else:
-                value = config_key.default
-            parsed_config[name] = value
+                parsed_config[name] = parse(value)
 
         return parsed_config
+
+    def parse_many(
+        self, configs: Iterable[dict[str, Any] | None]
+    ) -> ParseResults:
+        """Parse multiple configuration dicts.
+
+        Values for each key are converted together for all configurations.
+
+        Returns a :class:`ParseResults` with a list of parsed dicts as
+        ``values``, with :data:`None` for invalid configurations.
+        """
+        records = [config or {} for config in configs]
+        columns = {
+            name: [record.get(name, _MISSING) for record in records]
+            for name, *_ in self._get_plan()
+        }
+        parsed_columns, errors = self._parse_columns(columns, len(records))
+        names = list(parsed_columns)
+        rows = zip(*parsed_columns.values()) if names else ((),) * len(records)
+        values = [
+            None if index in errors else dict(zip(names, row))
+            for index, row in enumerate(rows)
+        ]
+        return ParseResults(values, errors)
+
+    def parse_columns(self, columns: Mapping[str, Sequence]) -> ParseResults:
+        """Parse configurations in column-oriented format.
+
+        Columns are passed as a dict mapping keys to the sequence of their
+        values for all records, and must all have the same length.  If a
+        column is missing, the default value is used for all records.
+
+        Returns a :class:`ParseResults` with a dict of columns of parsed
+        values as ``values``, with :data:`None` for invalid values.
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Columns must have the same length")
+        size = lengths.pop() if lengths else 0
+        parsed_columns, errors = self._parse_columns(columns, size)
+        return ParseResults(parsed_columns, errors)
+
+    def compile(self) -> list[ParsePlanStep]:
+        """Return the plan for parsing configurations.
+
+        This is a list of tuples with the name, whether it's required, the
+        default value and the parse function for each key.  It's computed
+        automatically on the first :meth:`parse` call.
+
+        """
+        return [
+            (key.name, key.required, key.default, key.compile())
+            for key in self._config_keys.values()
+        ]
+
+    def _get_plan(self) -> list[ParsePlanStep]:
+        if self._plan is None:
+            self._plan = self.compile()
+        return self._plan
+
+    def _parse_columns(
+        self, columns: Mapping[str, Sequence], size: int
+    ) -> tuple[
+        dict[str, list[Any]],
+        dict[int, list[MissingConfigKey | InvalidConfigValue]],
+    ]:
+        """Parse columns of values, which can contain missing markers."""
+        parsed_columns: dict[str, list[Any]] = {}
+        errors: dict[int, list[MissingConfigKey | InvalidConfigValue]] = {}
+        for name, required, default, parse in self._get_plan():
+            column = columns.get(name)
+            if column is None:
+                column = [_MISSING] * size
+            try:
+                # fast path, converting the whole column at once
+                if not required:
+                    parsed = [
+                        default if value is _MISSING else parse(value)
+                        for value in column
+                    ]
+                elif _MISSING in column:
+                    raise MissingConfigKey(name)
+                else:
+                    parsed = list(map(parse, column))
+            except (MissingConfigKey, InvalidConfigValue):
+                parsed = []
+                for index, value in enumerate(column):
+                    try:
+                        if value is not _MISSING:
+                            parsed.append(parse(value))
+                        elif required:
+                            raise MissingConfigKey(name)
+                        else:
+                            parsed.append(default)
+                    except (MissingConfigKey, InvalidConfigValue) as error:
+                        errors.setdefault(index, []).append(error)
+                        parsed.append(None)
+            parsed_columns[name] = parsed
+        return parsed_columns, errors
+
+
+class LayeredConfig(Mapping[str, Any]):
+    """A configuration with values read lazily from layered sources.
+
+    Sources are mappings of option names to values, such as dicts, or
+    :class:`EnvironSource`, and are looked up in order, so earlier ones take
+    precedence.  Values are only looked up in sources and converted when a
+    key is accessed, and are cached afterwards.
+
+    Instances are created via :meth:`Config.layered`.
+
+    Accessing a key which is not defined raises :class:`KeyError`, while
+    accessing a required key which is not present in any source raises
+    :class:`MissingConfigKey`.  Checking whether a key is in the
+    configuration only checks that it's defined, without looking it up in
+    sources, and :meth:`get` returns the default for missing keys.
+
+    :param keys: a :class:`collections.ChainMap` mapping key names to
+      :class:`ConfigKey`.
+    :param sources: a sequence of sources for values.
+
+    """
+
+    def __init__(
+        self,
+        keys: ChainMap[str, ConfigKey],
+        sources: Sequence[Mapping[str, Any]],
+    ):
+        self._keys = keys
+        self._sources = tuple(sources)
+        self._values: dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        key = self._keys[name]
+        value = self._lookup(name)
+        if value is _MISSING:
+            if key.required:
+                raise MissingConfigKey(name)
+            value = key.default
+        else:
+            value = key.parse(value)
+        self._values[name] = value
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return the value for a key, or a default.
+
+        The default is returned if the key is not defined, or if it's
+        required and not present in any source.  Invalid values still raise
+        :class:`InvalidConfigValue`.
+        """
+        if name not in self._keys:
+            return default
+        try:
+            return self[name]
+        except MissingConfigKey:
+            return default
+
+    def overlay(self, *sources: Mapping[str, Any]) -> "LayeredConfig":
+        """Return a new configuration with additional sources.
+
+        The new sources take precedence over existing ones.
+        """
+        return LayeredConfig(self._keys, sources + self._sources)
+
+    def extend(self, *keys: ConfigKey) -> "LayeredConfig":
+        """Return a new configuration with additional keys.
+
+        Keys with the same name as existing ones replace them.  Existing
+        keys are not copied.
+        """
+        new_keys = self._keys.new_child({key.name: key for key in keys})
+        return LayeredConfig(new_keys, self._sources)
+
+    def _lookup(self, name: str) -> Any:
+        for source in self._sources:
+            try:
+                return source[name]
+            except KeyError:
+                pass
+        return _MISSING
+
+
+class EnvironSource(Mapping[str, str]):
+    """A configuration source reading from environment variables.
+
+    Option names are converted to variable names by upper-casing them,
+    replacing dashes and dots with underscores, and adding the prefix.
+
+    :param prefix: the prefix for variable names.
+    :param environ: the environment to read from.  It defaults to
+      :data:`os.environ`.
+
+    """
+
+    def __init__(
+        self, prefix: str = "", environ: Mapping[str, str] | None = None
+    ):
+        self.prefix = prefix
+        self.environ = os.environ if environ is None else environ
+
+    def __getitem__(self, name: str) -> str:
+        return self.environ[self._variable(name)]
+
+    def __iter__(self) -> Iterator[str]:
+        prefix_length = len(self.prefix)
+        for variable in self.environ:
+            if variable.startswith(self.prefix):
+                yield variable[prefix_length:].lower()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _variable(self, name: str) -> str:
+        name = name.upper().replace("-", "_").replace(".", "_")
+        return self.prefix + name
+
+
+class ConfigWatcher:
+    """Reload a configuration file when it changes.
+
+    The file is loaded and parsed when the watcher is created.  Each call to
+    :meth:`check` only reads the file if its modification time, size or
+    inode changed, and only parses it if its content hash changed.  When
+    parsed values change, subscribers are called with the changes to the
+    keys they're interested in.
+
+    Checks can be run periodically in asyncio via :class:`PeriodicCall`::
+
+      watcher = ConfigWatcher(config, 'config.json')
+      watcher.subscribe(on_change, keys=['option1'])
+      PeriodicCall(watcher.check).start(5)
+
+    If loading or parsing the file fails, :meth:`check` raises the error, and
+    the current values are kept.
+
+    :param config: the :class:`Config` to parse the file with.
+    :param path: the path of the configuration file.
+    :param loader: a function returning a configuration dict from the file
+      content, as bytes.  By default, it's based on the file extension, see
+      :func:`get_loader`.
+
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        path: str | Path,
+        loader: Callable[[bytes], dict[str, Any]] | None = None,
+    ):
+        self.config = config
+        self.path = Path(path)
+        self.loader = loader or get_loader(self.path)
+        self._subscribers: list[
+            tuple[Callable[[ConfigChanges], None], frozenset | None]
+        ] = []
+        self._stat: tuple[int, int, int] | None = None
+        self._hash = b""
+        self.values: dict[str, Any] = {}
+        self.check()
+
+    def subscribe(
+        self,
+        callback: Callable[[ConfigChanges], None],
+        keys: Iterable[str] | None = None,
+    ) -> None:
+        """Subscribe to configuration changes.
+
+        :param callback: a function called with a dict mapping changed keys
+          to a tuple with their old and new values.
+        :param keys: if specified, only changes to these keys are notified.
+
+        """
+        self._subscribers.append(
+            (callback, None if keys is None else frozenset(keys))
+        )
+
+    def unsubscribe(self, callback: Callable[[ConfigChanges], None]) -> None:
+        """Remove a subscription for a callback."""
+        self._subscribers = [
+            (subscriber, keys)
+            for subscriber, keys in self._subscribers
+            if subscriber != callback
+        ]
+
+    def check(self) -> ConfigChanges:
+        """Reload the configuration if the file changed.
+
+        Returns a dict mapping changed keys to a tuple with their old and new
+        values.
+        """
+        stat = self.path.stat()
+        file_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if file_stat == self._stat:
+            return {}
+
+        content = self.path.read_bytes()
+        content_hash = hashlib.blake2b(content).digest()
+        if content_hash == self._hash:
+            self._stat = file_stat
+            return {}
+
+        values = self.config.parse(self.loader(content))
+        initial = not self._hash
+        self._stat, self._hash = file_stat, content_hash
+        old_values, self.values = self.values, values
+        if initial:
+            return {}
+
+        changes = {
+            name: (old_values[name], value)
+            for name, value in values.items()
+            if value != old_values[name]
+        }
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def _notify(self, changes: ConfigChanges) -> None:
+        for callback, keys in self._subscribers:
+            if keys is None:
+                callback(changes)
+            elif subscriber_changes := {
+                name: change
+                for name, change in changes.items()
+                if name in keys
+            }:
+                callback(subscriber_changes)
+
+
+def load_json(content: bytes) -> dict[str, Any]:
+    """Load a configuration from JSON content."""
+    return cast(dict[str, Any], json.loads(content))
+
+
+def load_toml(content: bytes) -> dict[str, Any]:
+    """Load a configuration from TOML content."""
+    return tomllib.loads(content.decode())
+
+
+def load_ini(content: bytes) -> dict[str, Any]:
+    """Load a configuration from INI content.
+
+    Options in the ``DEFAULT`` section are returned as top-level keys, while
+    other sections are returned as dicts of their options.  Values are not
+    interpolated.
+    """
+    parser = ConfigParser(interpolation=None)
+    parser.optionxform = str  # type: ignore[assignment,method-assign]
+    parser.read_string(content.decode())
+    config: dict[str, Any] = dict(parser.defaults())
+    for section in parser.sections():
+        config[section] = dict(parser.items(section))
+    return config
+
+
+_DOTENV_LINE = re.compile(
+    r"(?:export\s+)?(?P<name>[A-Za-z_][\w.-]*)\s*=\s*(?P<value>.*)"
+)
+_DOTENV_ESCAPES = re.compile(r"\\(.)")
+_DOTENV_ESCAPED_CHARS = {"n": "\n", "r": "\r", "t": "\t"}
+
+
+def load_dotenv(content: bytes) -> dict[str, Any]:
+    """Load a configuration from dotenv content.
+
+    Each line contains a ``NAME=value`` assignment, optionally prefixed by
+    ``export``.  Values can be single-quoted, in which case they're taken
+    literally, or double-quoted, in which case backslash escapes are
+    expanded.  Unquoted values end at a `` #`` comment.  Empty lines and
+    comments are ignored.
+
+    :raises ValueError: if a line is not valid.
+    """
+    config = {}
+    for number, line in enumerate(content.decode().splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _DOTENV_LINE.fullmatch(line)
+        if not match:
+            raise ValueError(f"Invalid dotenv line {number}: {line}")
+        value = match["value"]
+        if len(value) > 1 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif len(value) > 1 and value[0] == value[-1] == '"':
+            value = _DOTENV_ESCAPES.sub(
+                lambda match: _DOTENV_ESCAPED_CHARS.get(match[1], match[1]),
+                value[1:-1],
+            )
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+        config[match["name"]] = value
+    return config
+
+
+#: Configuration loaders by file extension.
+FILE_LOADERS: dict[str, Callable[[bytes], dict[str, Any]]] = {
+    ".cfg": load_ini,
+    ".env": load_dotenv,
+    ".ini": load_ini,
+    ".json": load_json,
+    ".toml": load_toml,
+}
+
+
+def get_loader(path: str | Path) -> Callable[[bytes], dict[str, Any]]:
+    """Return the configuration loader for a file, based on its extension.
+
+    Files named ``.env`` are loaded as dotenv.
+
+    :raises ValueError: if the file format is not known.
+    """
+    path = Path(path)
+    suffix = path.suffix or path.name
+    try:
+        return FILE_LOADERS[suffix]
+    except KeyError:
+        raise ValueError(f"Unknown configuration file format: {path}")
+
+
+def load_config_file(
+    path: str | Path,
+    loader: Callable[[bytes], dict[str, Any]] | None = None,
+    cache: "ConfigFileCache | None" = None,
+    loader_key: str | None = None,
+) -> dict[str, Any]:
+    """Load a configuration dict from a file.
+
+    :param path: the path of the configuration file.
+    :param loader: a function returning a configuration dict from the file
+      content, as bytes.  By default, it's based on the file extension, see
+      :func:`get_loader`.
+    :param cache: an optional :class:`ConfigFileCache` for loaded
+      configurations.
+    :param loader_key: a key identifying the loader in the cache, see
+      :meth:`ConfigFileCache.load`.
+
+    """
+    path = Path(path)
+    if loader is None:
+        loader = get_loader(path)
+    if cache is None:
+        return loader(path.read_bytes())
+    return cache.load(path, loader, loader_key=loader_key)
+
+
+class ConfigFileCache:
+    """An on-disk cache for loaded configuration files.
+
+    The cache keeps an entry for each configuration file, with the hash of
+    its content and the loaded configuration.  Files are read and hashed on
+    each load, but only parsed if their content changed.
+
+    Entries are stored with :mod:`pickle`, so the cache directory must only
+    be writable by trusted users.
+
+    Entries also record the loader, so that a file is loaded again if a
+    different loader is used.  Loaders are identified by their qualified
+    name, or by an explicit key.  Loaders without a stable name, such as
+    lambdas, local functions or :func:`functools.partial` objects, can't be
+    told apart, so their results are only cached if a key is passed.
+
+    :param directory: the cache directory.  It's created if it doesn't
+      exist.
+
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def load(
+        self,
+        path: str | Path,
+        loader: Callable[[bytes], dict[str, Any]],
+        loader_key: str | None = None,
+    ) -> dict[str, Any]:
+        """Load a configuration file, using the cached result if valid.
+
+        :param path: the path of the configuration file.
+        :param loader: a function returning a configuration dict from the
+          file content.
+        :param loader_key: a key identifying the loader.  By default, the
+          loader qualified name is used, if it has a stable one.
+
+        """
+        path = Path(path).resolve()
+        content = path.read_bytes()
+        loader_name = loader_key or _loader_name(loader)
+        if loader_name is None:
+            return loader(content)
+        content_hash = hashlib.blake2b(content).hexdigest()
+        entry_path = self._entry_path(path)
+        try:
+            entry = pickle.loads(entry_path.read_bytes())
+            if (
+                entry["hash"] == content_hash
+                and entry["loader"] == loader_name
+            ):
+                return cast(dict[str, Any], entry["config"])
+        except Exception:
+            # missing or invalid entry, the file is loaded again
+            pass
+
+        config = loader(content)
+        entry = {"hash": content_hash, "loader": loader_name, "config": config}
+        with NamedTemporaryFile(
+            "wb", dir=self.directory, prefix=entry_path.name, delete=False
+        ) as fd:
+            pickle.dump(entry, fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(fd.name, entry_path)
+        return config
+
+    def _entry_path(self, path: Path) -> Path:
+        name = hashlib.blake2b(str(path).encode(), digest_size=16).hexdigest()
+        return self.directory / f"{name}.pickle"
+
+
+def _loader_name(loader: Callable[..., Any]) -> str | None:
+    """Return the qualified name of a loader, if it's stable."""
+    qualname = getattr(loader, "__qualname__", None)
+    if qualname is None or "<" in qualname:
+        # lambdas, local functions and other callables
+        return None
+    return f"{loader.__module__}.{qualname}"